@@ -1,21 +1,22 @@
     @app.route('/api/messages/recent', methods=['GET'])
     def get_recent_messages():
-        """Buscar mensagens recentes para overlay"""
+        """Buscar mensagens recentes para overlay (cache em memória + ETag)"""
         try:
             limit = request.args.get('limit', 10, type=int)
-            limit = min(limit, 50)  # Máximo 50 mensagens
+            limit = max(1, min(limit, 50))  # Máximo 50 mensagens
             
-            # Buscar mensagens mais recentes
-            messages = Message.query.order_by(Message.created_at.desc()).limit(limit).all()
+            # Responder do ring buffer, sem consultar o banco
+            version, body = recent_messages_cache.get_json(limit)
+            etag = f"{version}-{limit}"
             
-            # Converter para dict e inverter ordem (mais antigas primeiro)
-            messages_data = [msg.to_dict() for msg in reversed(messages)]
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = Response(body, mimetype='application/json')
             
-            return jsonify({
-                'success': True,
-                'messages': messages_data,
-                'count': len(messages_data)
-            })
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
             
         except Exception as e:
             print(f"❌ Erro ao buscar mensagens recentes: {e}")
@@ -58,6 +58,10 @@ class LiveSession(db.Model):
 
 class Message(db.Model):
     __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('ix_messages_created_at_id', 'created_at', 'id'),  # Paginação por cursor
+        db.Index('ix_messages_displayed_created_at', 'displayed', 'created_at', 'id'),  # Pendentes de exibição
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
     content = db.Column(db.String(250), nullable=False)
@@ -145,11 +149,19 @@ class Screenshot(db.Model):
 # Variáveis globais para serviços
 whisper_service = None
 event_queue = None
+message_writer = None
+recent_messages_cache = None
+message_history = None
+rate_limiter = None
+duplicate_filter = None
+moderation_filter = None
+display_scheduler = None
+retention_service = None
 connected_users = set()
 
 def create_app():
     """Factory function para criar a aplicação Flask - VERSÃO FINAL"""
-    global whisper_service, event_queue
+    global whisper_service, event_queue, message_writer, recent_messages_cache, message_history, rate_limiter, duplicate_filter, moderation_filter, display_scheduler, retention_service
     
     app = Flask(__name__, 
                 template_folder='templates',
@@ -206,9 +218,26 @@ def create_app():
     # Inicializar serviços
     from src.services.whisper_service import init_whisper_service
     from src.services.event_queue import init_event_queue
+    from src.services.message_writer import init_message_writer, WriterBacklogFullError
+    from src.services.recent_messages_cache import init_recent_messages_cache
+    from src.services.message_history import init_message_history, InvalidCursorError
+    from src.services.rate_limiter import init_rate_limiter, get_client_ip
+    from src.services.duplicate_filter import init_duplicate_filter
+    from src.services.moderation_filter import init_moderation_filter
+    from src.services.display_scheduler import init_display_scheduler
+    from src.services.retention_service import init_retention_service
     
     whisper_service = init_whisper_service(app, socketio)
     event_queue = init_event_queue(socketio)
+    message_writer = init_message_writer(app, db, Message)
+    recent_messages_cache = init_recent_messages_cache(app, Message)
+    message_history = init_message_history(app, db, Message)
+    rate_limiter = init_rate_limiter()
+    duplicate_filter = init_duplicate_filter()
+    moderation_filter = init_moderation_filter()
+    display_scheduler = init_display_scheduler(app, db, Message, message_writer)
+    event_queue.message_displayed_callback = display_scheduler.mark_displayed
+    retention_service = init_retention_service(app, db)
     
     print("✅ Serviços inicializados: Whisper e Event Queue")
     
@@ -306,58 +335,169 @@ def create_app():
                 'error': str(e)
             }), 500
     
+    def accept_message(data, ip, sid):
+        """Validar, moderar e aceitar mensagem - caminho único para HTTP e Socket.IO
+        
+        Retorna (resposta, status HTTP, retry_after em segundos)
+        """
+        # Limitar taxa por IP e por sid do Socket.IO
+        allowed, retry_after = rate_limiter.check('send_message', ip=ip, sid=sid)
+        if not allowed:
+            return {
+                'success': False,
+                'error': 'Muitas mensagens em pouco tempo, aguarde alguns segundos'
+            }, 429, retry_after
+        
+        name = str(data.get('name') or '').strip()
+        content = str(data.get('content') or '').strip()
+        
+        # Validações
+        if not name or len(name) > 50:
+            return {
+                'success': False,
+                'error': 'Nome inválido (máximo 50 caracteres)'
+            }, 400, 0
+        
+        if not content or len(content) > 250:
+            return {
+                'success': False,
+                'error': 'Mensagem inválida (máximo 250 caracteres)'
+            }, 400, 0
+        
+        # Moderação: blocklist e dados pessoais em uma única passada
+        verdict = moderation_filter.check(name, content)
+        if not verdict['allowed']:
+            print(f"🚫 Mensagem bloqueada pela moderação ({verdict['category']}): {name}")
+            return {
+                'success': False,
+                'error': 'Mensagem bloqueada pela moderação'
+            }, 400, 0
+        
+        # Suprimir cópias quase idênticas de mensagens recentes
+        original = duplicate_filter.find(content)
+        if original:
+            if duplicate_filter.policy == 'reject':
+                return {
+                    'success': False,
+                    'error': 'Essa mensagem já foi enviada, tente algo diferente'
+                }, 409, 0
+            
+            count = duplicate_filter.merge(original)
+            if not recent_messages_cache.update(original['message_id'], merged_count=count):
+                # Fora do cache recente, mas talvez ainda na fila do overlay (mesmo dict)
+                original['message']['merged_count'] = count
+            socketio.emit('message_merged', {
+                'message_id': original['message_id'],
+                'count': count
+            }, room='overlay_messages')
+            
+            return {
+                'success': True,
+                'message': 'Mensagem somada a uma mensagem igual',
+                'merged': True,
+                'data': original['message']
+            }, 200, 0
+        
+        print(f"💬 Nova mensagem de {name}: {content}")
+        
+        # Aceitar no pipeline de escrita em lote: rajadas viram uma única transação
+        try:
+            message_data = message_writer.submit(name, content)
+        except WriterBacklogFullError as e:
+            print(f"⚠️ Mensagem recusada, banco atrasado: {e}")
+            return {
+                'success': False,
+                'error': 'Chat sobrecarregado, tente novamente em instantes'
+            }, 503, 1
+        recent_messages_cache.add(message_data)
+        duplicate_filter.register(content, message_data)
+        display_scheduler.push(message_data)
+        
+        # Adicionar à fila de eventos
+        if event_queue:
+            event_queue.add_event('message', message_data)
+        
+        return {
+            'success': True,
+            'message': 'Mensagem enviada com sucesso',
+            'data': message_data
+        }, 200, 0
+    
     @app.route('/api/messages/send', methods=['POST'])
     def send_message():
         """Enviar mensagem - COM FILA DE EVENTOS"""
         try:
-            data = request.get_json()
-            name = data.get('name', '').strip()
-            content = data.get('content', '').strip()
+            payload, status, retry_after = accept_message(
+                request.get_json(silent=True) or {},
+                ip=get_client_ip(request),
+                sid=request.headers.get('X-Socket-Id')
+            )
             
-            # Validações
-            if not name or len(name) > 50:
-                return jsonify({
-                    'success': False,
-                    'error': 'Nome inválido (máximo 50 caracteres)'
-                }), 400
+            response = jsonify(payload)
+            if retry_after:
+                response.headers['Retry-After'] = str(retry_after)
+            return response, status
             
-            if not content or len(content) > 250:
-                return jsonify({
-                    'success': False,
-                    'error': 'Mensagem inválida (máximo 250 caracteres)'
-                }), 400
+        except Exception as e:
+            print(f"❌ Erro ao enviar mensagem: {e}")
+            import traceback
+            traceback.print_exc()
+            return jsonify({
+                'success': False,
+                'error': 'Erro interno do servidor'
+            }), 500
+    
+    @app.route('/api/messages/recent', methods=['GET'])
+    def get_recent_messages():
+        """Buscar mensagens recentes para overlay (cache em memória + ETag)"""
+        try:
+            limit = request.args.get('limit', 10, type=int)
+            limit = max(1, min(limit, 50))  # Máximo 50 mensagens
             
-            print(f"💬 Nova mensagem de {name}: {content}")
+            # Responder do ring buffer, sem consultar o banco
+            version, body = recent_messages_cache.get_json(limit)
+            etag = f"{version}-{limit}"
             
-            # Criar mensagem no banco
-            message = Message(
-                name=name,
-                content=content
-            )
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = Response(body, mimetype='application/json')
             
-            db.session.add(message)
-            db.session.commit()
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
             
-            print("✅ Mensagem salva no banco de dados")
+        except Exception as e:
+            print(f"❌ Erro ao buscar mensagens recentes: {e}")
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+    
+    @app.route('/api/messages/history', methods=['GET'])
+    def get_message_history():
+        """Histórico de mensagens paginado por cursor (mais novas primeiro)"""
+        try:
+            cursor = request.args.get('cursor')
+            limit = request.args.get('limit', 50, type=int)
             
-            # Adicionar à fila de eventos
-            if event_queue:
-                event_queue.add_event('message', message.to_dict())
+            page = message_history.get_page(cursor=cursor, limit=limit)
             
             return jsonify({
                 'success': True,
-                'message': 'Mensagem enviada com sucesso',
-                'data': message.to_dict()
+                **page
             })
             
+        except InvalidCursorError:
+            return jsonify({
+                'success': False,
+                'error': 'Cursor inválido'
+            }), 400
         except Exception as e:
-            print(f"❌ Erro ao enviar mensagem: {e}")
-            import traceback
-            traceback.print_exc()
-            db.session.rollback()
+            print(f"❌ Erro ao buscar histórico de mensagens: {e}")
             return jsonify({
                 'success': False,
-                'error': 'Erro interno do servidor'
+                'error': str(e)
             }), 500
     
     @app.route('/api/whisper/generate-song', methods=['POST'])
@@ -443,7 +583,13 @@ def create_app():
                     Screenshot.created_at >= datetime.now().replace(hour=0, minute=0, second=0)
                 ).count(),
                 'whisper_status': whisper_service.get_status() if whisper_service else None,
-                'queue_status': event_queue.get_status() if event_queue else None
+                'queue_status': event_queue.get_status() if event_queue else None,
+                'message_writer_status': message_writer.get_status() if message_writer else None,
+                'rate_limiter_status': rate_limiter.get_status() if rate_limiter else None,
+                'duplicate_filter_status': duplicate_filter.get_status() if duplicate_filter else None,
+                'moderation_status': moderation_filter.get_status() if moderation_filter else None,
+                'display_scheduler_status': display_scheduler.get_status() if display_scheduler else None,
+                'retention_status': retention_service.get_status() if retention_service else None
             }
             
             return jsonify({
@@ -457,6 +603,35 @@ def create_app():
                 'error': str(e)
             }), 500
     
+    @app.route('/api/queue/priorities', methods=['GET', 'POST'])
+    def queue_priorities():
+        """Consultar ou alterar prioridades da fila de eventos (menor = mais urgente)"""
+        try:
+            if request.method == 'POST':
+                data = request.get_json() or {}
+                priorities = data.get('priorities', {})
+                
+                for event_type, priority in priorities.items():
+                    event_queue.set_priority(event_type, int(priority))
+                    
+                print(f"⚙️ Prioridades da fila atualizadas: {priorities}")
+            
+            return jsonify({
+                'success': True,
+                'priorities': event_queue.get_priorities()
+            })
+            
+        except (TypeError, ValueError, AttributeError):
+            return jsonify({
+                'success': False,
+                'error': 'Prioridades inválidas'
+            }), 400
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+    
     @app.route('/api/health')
     def health_check():
         """Health check para monitoramento"""
@@ -470,7 +645,7 @@ def create_app():
                 'database': 'connected',
                 'services': {
                     'whisper': whisper_service.is_running if whisper_service else False,
-                    'event_queue': event_queue.worker_thread.is_alive() if event_queue and event_queue.worker_thread else False
+                    'event_queue': event_queue.is_alive() if event_queue else False
                 }
             })
         except Exception as e:
@@ -480,6 +655,25 @@ def create_app():
             }), 500
     
     # Overlays para OBS
+    @app.route('/overlay/api/next-message')
+    def overlay_next_message():
+        """Próxima mensagem pendente para overlays em modo polling"""
+        try:
+            message = display_scheduler.pop_next()
+            
+            return jsonify({
+                'success': True,
+                'has_message': message is not None,
+                'message': message
+            })
+            
+        except Exception as e:
+            print(f"❌ Erro ao buscar próxima mensagem: {e}")
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+    
     @app.route('/overlay')
     def overlay_index():
         """Página de overlays"""
@@ -515,11 +709,48 @@ def create_app():
         # Emitir estatísticas atualizadas
         socketio.emit('stats_update', {'online_users': len(connected_users)})
     
+    @socketio.on('send_message')
+    def handle_send_message(data):
+        """Enviar mensagem pelo Socket.IO - resultado volta no ack, sem requisição HTTP"""
+        try:
+            payload, status, retry_after = accept_message(
+                data if isinstance(data, dict) else {},
+                ip=get_client_ip(request),
+                sid=request.sid
+            )
+            
+            payload['status'] = status
+            if retry_after:
+                payload['retry_after'] = retry_after
+            return payload
+            
+        except Exception as e:
+            print(f"❌ Erro ao enviar mensagem via Socket.IO: {e}")
+            return {
+                'success': False,
+                'status': 500,
+                'error': 'Erro interno do servidor'
+            }
+    
     @socketio.on('join_room')
     def handle_join_room(data):
-        room = data.get('room', 'general')
+        # Overlays enviam o nome da sala como string
+        if isinstance(data, str):
+            room = data
+        elif isinstance(data, dict):
+            room = data.get('room', 'general')
+        else:
+            room = 'general'
+        
         join_room(room)
         print(f"🏠 Usuário {request.sid} entrou na sala: {room}")
+        
+        # Overlay que recarregou no meio de uma exibição redesenha na hora
+        if event_queue and room in event_queue.now_showing:
+            emit('overlay_snapshot', {
+                'room': room,
+                'showing': event_queue.get_now_showing(room)
+            })
     
     @socketio.on('leave_room')
     def handle_leave_room(data):
@@ -544,6 +775,12 @@ def setup_signal_handlers(socketio):
             whisper_service.stop_transcription()
         if event_queue:
             event_queue.stop()
+        if retention_service:
+            retention_service.stop()
+        if display_scheduler:
+            display_scheduler.stop()
+        if message_writer:
+            message_writer.stop()
             
         socketio.stop()
         sys.exit(0)
@@ -6,6 +6,7 @@ VERSÃO FINAL - Sistema de Duas Lives + Estabilidade + Filas de Eventos
 import os
 import sys
 import logging
+import json
 from datetime import datetime
 import threading
 import time
@@ -58,6 +59,10 @@ class LiveSession(db.Model):
 
 class Message(db.Model):
     __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('ix_messages_created_at_id', 'created_at', 'id'),  # Paginação por cursor
+        db.Index('ix_messages_displayed_created_at', 'displayed', 'created_at', 'id'),  # Pendentes de exibição
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
     content = db.Column(db.String(250), nullable=False)
@@ -106,33 +111,44 @@ class Poll(db.Model):
     votes_d = db.Column(db.Integer, default=0)
     active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    option_rows = db.relationship('PollOption', order_by='PollOption.id', lazy=True)
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'question': self.question,
-            'options': {
+        if self.option_rows:
+            options = {row.option_key: row.option_text for row in self.option_rows}
+            votes = {row.option_key: row.votes or 0 for row in self.option_rows}
+        else:
+            # Enquete antiga, anterior às opções normalizadas
+            options = {
                 'a': self.option_a,
                 'b': self.option_b,
                 'c': self.option_c,
                 'd': self.option_d
-            },
-            'votes': {
-                'a': self.votes_a,
-                'b': self.votes_b,
-                'c': self.votes_c,
-                'd': self.votes_d
-            },
-            'total_votes': self.votes_a + self.votes_b + self.votes_c + self.votes_d,
+            }
+            votes = {
+                'a': self.votes_a or 0,
+                'b': self.votes_b or 0,
+                'c': self.votes_c or 0,
+                'd': self.votes_d or 0
+            }
+        return {
+            'id': self.id,
+            'question': self.question,
+            'options': options,
+            'votes': votes,
+            'total_votes': sum(votes.values()),
             'active': self.active,
             'created_at': self.created_at.isoformat()
         }
 
 class PollOption(db.Model):
     __tablename__ = 'poll_options'
+    __table_args__ = (
+        db.Index('ix_poll_options_poll_key', 'poll_id', 'option_key', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     poll_id = db.Column(db.Integer, db.ForeignKey('polls.id'), nullable=False)
-    option_key = db.Column(db.String(1), nullable=False)  # 'a', 'b', 'c', 'd'
+    option_key = db.Column(db.String(10), nullable=False)  # 'a', 'b', ..., 'z', 'aa', ...
     option_text = db.Column(db.String(100), nullable=False)
     votes = db.Column(db.Integer, default=0)
     
@@ -145,6 +161,39 @@ class PollOption(db.Model):
             'votes': self.votes
         }
 
+class PollSchedule(db.Model):
+    __tablename__ = 'poll_schedule'
+    id = db.Column(db.Integer, primary_key=True)
+    question = db.Column(db.String(200), nullable=False)
+    options = db.Column(db.Text, nullable=False)  # Lista JSON de textos das opções
+    open_seconds = db.Column(db.Integer, nullable=False)    # Votação antes de revelar
+    reveal_seconds = db.Column(db.Integer, nullable=False)  # Resultado na tela antes de encerrar
+    status = db.Column(db.String(20), default='queued', index=True)  # queued, open, revealed, closed, cancelled
+    source = db.Column(db.String(20), default='admin')  # admin, auto
+    poll_id = db.Column(db.Integer, db.ForeignKey('polls.id'), nullable=True)
+    opened_at = db.Column(db.DateTime, nullable=True)
+    reveal_at = db.Column(db.DateTime, nullable=True)
+    closes_at = db.Column(db.DateTime, nullable=True)
+    closed_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'question': self.question,
+            'options': json.loads(self.options),
+            'open_seconds': self.open_seconds,
+            'reveal_seconds': self.reveal_seconds,
+            'status': self.status,
+            'source': self.source,
+            'poll_id': self.poll_id,
+            'opened_at': self.opened_at.isoformat() if self.opened_at else None,
+            'reveal_at': self.reveal_at.isoformat() if self.reveal_at else None,
+            'closes_at': self.closes_at.isoformat() if self.closes_at else None,
+            'closed_at': self.closed_at.isoformat() if self.closed_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
 class Screenshot(db.Model):
     __tablename__ = 'screenshots'
     id = db.Column(db.Integer, primary_key=True)
@@ -170,11 +219,26 @@ class Screenshot(db.Model):
 whisper_service = None
 event_queue = None
 screenshot_service = None
+message_writer = None
+recent_messages_cache = None
+message_history = None
+rate_limiter = None
+duplicate_filter = None
+moderation_filter = None
+display_scheduler = None
+retention_service = None
+poll_engine = None
+vote_counter = None
+voter_registry = None
+poll_broadcaster = None
+vote_timeseries = None
+active_poll_cache = None
+poll_scheduler = None
 connected_users = set()
 
 def create_app():
     """Factory function para criar a aplicação Flask - VERSÃO FINAL"""
-    global whisper_service, event_queue, screenshot_service
+    global whisper_service, event_queue, screenshot_service, message_writer, recent_messages_cache, message_history, rate_limiter, duplicate_filter, moderation_filter, display_scheduler, retention_service, poll_engine, vote_counter, voter_registry, poll_broadcaster, vote_timeseries, active_poll_cache, poll_scheduler
     
     app = Flask(__name__, 
                 template_folder='templates',
@@ -234,11 +298,51 @@ def create_app():
     from services.event_queue import init_event_queue
     from services.youtube_screenshot_service import init_youtube_screenshot_service, get_youtube_screenshot_service
     from services.intelligent_poll_service import init_intelligent_poll_service, get_intelligent_poll_service
+    from services.message_writer import init_message_writer, WriterBacklogFullError
+    from services.recent_messages_cache import init_recent_messages_cache
+    from services.message_history import init_message_history, InvalidCursorError
+    from services.rate_limiter import init_rate_limiter, get_client_ip
+    from services.duplicate_filter import init_duplicate_filter
+    from services.moderation_filter import init_moderation_filter
+    from services.display_scheduler import init_display_scheduler
+    from services.retention_service import init_retention_service
+    from services.poll_engine import init_poll_engine
+    from services.vote_counter import init_vote_counter, PollNotFoundError, InvalidOptionError
+    from services.voter_registry import init_voter_registry, get_voter_keys, set_voter_cookie, issue_voter_cookie
+    from services.poll_broadcaster import init_poll_broadcaster
+    from services.active_poll_cache import init_active_poll_cache
+    from services.poll_scheduler import init_poll_scheduler
+    from services.vote_timeseries import init_vote_timeseries
     
     whisper_service = init_simple_whisper_service(app, db, socketio)
     event_queue = init_event_queue(socketio)
+    message_writer = init_message_writer(app, db, Message)
+    recent_messages_cache = init_recent_messages_cache(app, Message)
+    message_history = init_message_history(app, db, Message)
+    rate_limiter = init_rate_limiter()
+    duplicate_filter = init_duplicate_filter()
+    moderation_filter = init_moderation_filter()
+    display_scheduler = init_display_scheduler(app, db, Message, message_writer)
+    event_queue.message_displayed_callback = display_scheduler.mark_displayed
+    retention_service = init_retention_service(app, db)
+    poll_engine = init_poll_engine(app, db, Poll, PollOption)
+    vote_counter = init_vote_counter(poll_engine)
+    voter_registry = init_voter_registry()
+    active_poll_cache = init_active_poll_cache(socketio)
+    poll_broadcaster = init_poll_broadcaster(socketio, vote_counter)
+    vote_timeseries = init_vote_timeseries()
+    with app.app_context():
+        active_poll = Poll.query.filter_by(active=True).order_by(Poll.created_at.desc()).first()
+        if active_poll:
+            poll_broadcaster.set_poll(active_poll.id)
+            active_poll_cache.publish(vote_counter.get_poll_dict(active_poll.id))
     screenshot_service = init_youtube_screenshot_service(app, db, socketio)
-    auto_poll_service = init_intelligent_poll_service(app, db, socketio)
+    auto_poll_service = init_intelligent_poll_service(app, db, socketio, whisper_service)
+    poll_scheduler = init_poll_scheduler(
+        app, db, socketio, PollSchedule, poll_engine, vote_counter,
+        event_queue=event_queue,
+        poll_source=auto_poll_service.generate_next_poll if auto_poll_service else None
+    )
     
     print("✅ Serviços inicializados: Whisper Simplificado, Event Queue, Screenshots e Enquetes Inteligentes")
     
@@ -255,6 +359,13 @@ def create_app():
         screenshot_service.start()
         print("📸 Serviço de screenshots das lives do YouTube iniciado")
     
+    @app.after_request
+    def assign_voter_cookie(response):
+        """Cookie de eleitor já na página e na enquete ativa: o primeiro voto chega com ele"""
+        if request.endpoint in ('index', 'get_active_polls'):
+            issue_voter_cookie(request, response)
+        return response
+    
     # Rotas principais
     @app.route('/')
     def index():
@@ -375,55 +486,113 @@ def create_app():
                 'error': str(e)
             }), 500
     
+    def accept_message(data, ip, sid):
+        """Validar, moderar e aceitar mensagem - caminho único para HTTP e Socket.IO
+        
+        Retorna (resposta, status HTTP, retry_after em segundos)
+        """
+        # Limitar taxa por IP e por sid do Socket.IO
+        allowed, retry_after = rate_limiter.check('send_message', ip=ip, sid=sid)
+        if not allowed:
+            return {
+                'success': False,
+                'error': 'Muitas mensagens em pouco tempo, aguarde alguns segundos'
+            }, 429, retry_after
+        
+        name = str(data.get('name') or '').strip()
+        content = str(data.get('content') or '').strip()
+        
+        # Validações
+        if not name or len(name) > 50:
+            return {
+                'success': False,
+                'error': 'Nome inválido (máximo 50 caracteres)'
+            }, 400, 0
+        
+        if not content or len(content) > 250:
+            return {
+                'success': False,
+                'error': 'Mensagem inválida (máximo 250 caracteres)'
+            }, 400, 0
+        
+        # Moderação: blocklist e dados pessoais em uma única passada
+        verdict = moderation_filter.check(name, content)
+        if not verdict['allowed']:
+            print(f"🚫 Mensagem bloqueada pela moderação ({verdict['category']}): {name}")
+            return {
+                'success': False,
+                'error': 'Mensagem bloqueada pela moderação'
+            }, 400, 0
+        
+        # Suprimir cópias quase idênticas de mensagens recentes
+        original = duplicate_filter.find(content)
+        if original:
+            if duplicate_filter.policy == 'reject':
+                return {
+                    'success': False,
+                    'error': 'Essa mensagem já foi enviada, tente algo diferente'
+                }, 409, 0
+            
+            count = duplicate_filter.merge(original)
+            if not recent_messages_cache.update(original['message_id'], merged_count=count):
+                # Fora do cache recente, mas talvez ainda na fila do overlay (mesmo dict)
+                original['message']['merged_count'] = count
+            socketio.emit('message_merged', {
+                'message_id': original['message_id'],
+                'count': count
+            }, room='overlay_messages')
+            
+            return {
+                'success': True,
+                'message': 'Mensagem somada a uma mensagem igual',
+                'merged': True,
+                'data': original['message']
+            }, 200, 0
+        
+        print(f"💬 Nova mensagem de {name}: {content}")
+        
+        # Aceitar no pipeline de escrita em lote: rajadas viram uma única transação
+        try:
+            message_data = message_writer.submit(name, content)
+        except WriterBacklogFullError as e:
+            print(f"⚠️ Mensagem recusada, banco atrasado: {e}")
+            return {
+                'success': False,
+                'error': 'Chat sobrecarregado, tente novamente em instantes'
+            }, 503, 1
+        recent_messages_cache.add(message_data)
+        duplicate_filter.register(content, message_data)
+        display_scheduler.push(message_data)
+        
+        # Adicionar à fila de eventos
+        if event_queue:
+            event_queue.add_event('message', message_data)
+        
+        return {
+            'success': True,
+            'message': 'Mensagem enviada com sucesso',
+            'data': message_data
+        }, 200, 0
+    
     @app.route('/api/messages/send', methods=['POST'])
     def send_message():
         """Enviar mensagem - COM FILA DE EVENTOS"""
         try:
-            data = request.get_json()
-            name = data.get('name', '').strip()
-            content = data.get('content', '').strip()
-            
-            # Validações
-            if not name or len(name) > 50:
-                return jsonify({
-                    'success': False,
-                    'error': 'Nome inválido (máximo 50 caracteres)'
-                }), 400
-            
-            if not content or len(content) > 250:
-                return jsonify({
-                    'success': False,
-                    'error': 'Mensagem inválida (máximo 250 caracteres)'
-                }), 400
-            
-            print(f"💬 Nova mensagem de {name}: {content}")
-            
-            # Criar mensagem no banco
-            message = Message(
-                name=name,
-                content=content
+            payload, status, retry_after = accept_message(
+                request.get_json(silent=True) or {},
+                ip=get_client_ip(request),
+                sid=request.headers.get('X-Socket-Id')
             )
             
-            db.session.add(message)
-            db.session.commit()
-            
-            print("✅ Mensagem salva no banco de dados")
-            
-            # Adicionar à fila de eventos
-            if event_queue:
-                event_queue.add_event('message', message.to_dict())
-            
-            return jsonify({
-                'success': True,
-                'message': 'Mensagem enviada com sucesso',
-                'data': message.to_dict()
-            })
+            response = jsonify(payload)
+            if retry_after:
+                response.headers['Retry-After'] = str(retry_after)
+            return response, status
             
         except Exception as e:
             print(f"❌ Erro ao enviar mensagem: {e}")
             import traceback
             traceback.print_exc()
-            db.session.rollback()
             return jsonify({
                 'success': False,
                 'error': 'Erro interno do servidor'
@@ -431,25 +600,52 @@ def create_app():
     
     @app.route('/api/messages/recent', methods=['GET'])
     def get_recent_messages():
-        """Buscar mensagens recentes para overlay"""
+        """Buscar mensagens recentes para overlay (cache em memória + ETag)"""
         try:
             limit = request.args.get('limit', 10, type=int)
-            limit = min(limit, 50)  # Máximo 50 mensagens
+            limit = max(1, min(limit, 50))  # Máximo 50 mensagens
+            
+            # Responder do ring buffer, sem consultar o banco
+            version, body = recent_messages_cache.get_json(limit)
+            etag = f"{version}-{limit}"
             
-            # Buscar mensagens mais recentes
-            messages = Message.query.order_by(Message.created_at.desc()).limit(limit).all()
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = Response(body, mimetype='application/json')
+            
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+            
+        except Exception as e:
+            print(f"❌ Erro ao buscar mensagens recentes: {e}")
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+    
+    @app.route('/api/messages/history', methods=['GET'])
+    def get_message_history():
+        """Histórico de mensagens paginado por cursor (mais novas primeiro)"""
+        try:
+            cursor = request.args.get('cursor')
+            limit = request.args.get('limit', 50, type=int)
             
-            # Converter para dict e inverter ordem (mais antigas primeiro)
-            messages_data = [msg.to_dict() for msg in reversed(messages)]
+            page = message_history.get_page(cursor=cursor, limit=limit)
             
             return jsonify({
                 'success': True,
-                'messages': messages_data,
-                'count': len(messages_data)
+                **page
             })
             
+        except InvalidCursorError:
+            return jsonify({
+                'success': False,
+                'error': 'Cursor inválido'
+            }), 400
         except Exception as e:
-            print(f"❌ Erro ao buscar mensagens recentes: {e}")
+            print(f"❌ Erro ao buscar histórico de mensagens: {e}")
             return jsonify({
                 'success': False,
                 'error': str(e)
@@ -457,22 +653,25 @@ def create_app():
     
     @app.route('/api/polls/active', methods=['GET'])
     def get_active_polls():
-        """Buscar enquetes ativas para interface do usuário"""
+        """Buscar enquete ativa (cache em memória + ETag; ?since=<versão> espera mudar)"""
         try:
-            # Buscar enquete ativa mais recente
-            poll = Poll.query.filter_by(active=True).order_by(Poll.created_at.desc()).first()
+            since = request.args.get('since', type=int)
+            if since is not None:
+                active_poll_cache.wait(since)
             
-            if poll:
-                return jsonify({
-                    'success': True,
-                    'poll': poll.to_dict()
-                })
+            # Responder do snapshot já serializado, sem consultar o banco
+            version, body, status = active_poll_cache.get_json()
+            etag = str(version)
+            
+            if status == 200 and request.if_none_match.contains(etag):
+                response = Response(status=304)
             else:
-                return jsonify({
-                    'success': False,
-                    'message': 'Nenhuma enquete ativa'
-                }), 404
-                
+                response = Response(body, status=status, mimetype='application/json')
+            
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+            
         except Exception as e:
             print(f"❌ Erro ao buscar enquete ativa: {e}")
             return jsonify({
@@ -506,10 +705,50 @@ def create_app():
                 'error': str(e)
             }), 500
     
+    @app.route('/api/polls/<int:poll_id>/series', methods=['GET'])
+    def get_poll_series(poll_id):
+        """Votos por segundo da enquete, reamostrados (para animar a disputa)"""
+        try:
+            points = min(max(request.args.get('points', 60, type=int), 1), 600)
+            seconds = request.args.get('seconds', type=int)
+            
+            series = vote_timeseries.query(poll_id, points=points, seconds=seconds)
+            if series is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Nenhum voto registrado para esta enquete'
+                }), 404
+            
+            return jsonify({
+                'success': True,
+                'series': series
+            })
+            
+        except Exception as e:
+            print(f"❌ Erro ao buscar série de votos: {e}")
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+    
     @app.route('/api/polls/vote', methods=['POST'])
     def vote_poll():
         """Votar em enquete"""
         try:
+            # Limitar taxa por IP e por sid do Socket.IO
+            allowed, retry_after = rate_limiter.check(
+                'vote_poll',
+                ip=get_client_ip(request),
+                sid=request.headers.get('X-Socket-Id')
+            )
+            if not allowed:
+                response = jsonify({
+                    'success': False,
+                    'error': 'Muitos votos em pouco tempo, aguarde alguns segundos'
+                })
+                response.headers['Retry-After'] = str(retry_after)
+                return response, 429
+            
             data = request.get_json()
             poll_id = data.get('poll_id')
             option = data.get('option')  # 'a', 'b', 'c', 'd'
@@ -520,40 +759,47 @@ def create_app():
                     'error': 'ID da enquete e opção são obrigatórios'
                 }), 400
             
-            # Buscar enquete
-            poll = Poll.query.get(poll_id)
-            if not poll or not poll.active:
-                return jsonify({
-                    'success': False,
-                    'error': 'Enquete não encontrada ou inativa'
-                }), 404
-            
-            # Registrar voto
-            if option == 'a':
-                poll.votes_a += 1
-            elif option == 'b':
-                poll.votes_b += 1
-            elif option == 'c' and poll.option_c:
-                poll.votes_c += 1
-            elif option == 'd' and poll.option_d:
-                poll.votes_d += 1
-            else:
+            # Registrar voto no contador em memória (gravado em lote), um por espectador
+            voter_keys, new_voter_cookie = get_voter_keys(request)
+            try:
+                poll_id = int(poll_id)
+                vote_counter.validate(poll_id, option)
+                if not voter_registry.register(poll_id, voter_keys):
+                    return jsonify({
+                        'success': False,
+                        'error': 'Você já votou nesta enquete'
+                    }), 409
+                try:
+                    vote_counter.vote(poll_id, option)
+                except Exception:
+                    # Voto recusado (ex.: enquete encerrou agora): liberar o espectador
+                    voter_registry.unregister(poll_id, voter_keys)
+                    raise
+            except InvalidOptionError:
                 return jsonify({
                     'success': False,
                     'error': 'Opção inválida'
                 }), 400
+            except (PollNotFoundError, TypeError, ValueError):
+                return jsonify({
+                    'success': False,
+                    'error': 'Enquete não encontrada ou inativa'
+                }), 404
             
-            db.session.commit()
+            poll_data = vote_counter.get_poll_dict(poll_id)
             
-            # Emitir atualização via WebSocket
-            if socketio:
-                socketio.emit('poll_update', poll.to_dict())
+            # Resultados saem agregados no próximo tick do transmissor
+            poll_broadcaster.mark_dirty(poll_id)
+            vote_timeseries.record(poll_id, option)
             
-            return jsonify({
+            response = jsonify({
                 'success': True,
                 'message': 'Voto registrado com sucesso',
-                'poll': poll.to_dict()
+                'poll': poll_data
             })
+            if new_voter_cookie:
+                set_voter_cookie(response, new_voter_cookie)
+            return response
             
         except Exception as e:
             print(f"❌ Erro ao votar: {e}")
@@ -568,65 +814,96 @@ def create_app():
         """Criar nova enquete"""
         try:
             data = request.get_json()
-            question = data.get('question', '').strip()
-            option_a = data.get('option_a', '').strip()
-            option_b = data.get('option_b', '').strip()
-            option_c = data.get('option_c', '').strip()
-            option_d = data.get('option_d', '').strip()
-            
-            # Validações
-            if not question or len(question) > 200:
-                return jsonify({
-                    'success': False,
-                    'error': 'Pergunta inválida (máximo 200 caracteres)'
-                }), 400
+            question = data.get('question', '')
+            options = data.get('options')
+            if not isinstance(options, list):
+                options = [data.get(f'option_{key}', '') for key in ('a', 'b', 'c', 'd')]
             
-            if not option_a or not option_b:
+            # Encerrar enquete no ar e abrir a nova já na agenda (emite new_poll e poll_created)
+            try:
+                poll_data = poll_scheduler.open_now(
+                    question,
+                    options,
+                    open_seconds=data.get('open_seconds'),
+                    reveal_seconds=data.get('reveal_seconds')
+                )
+            except (TypeError, ValueError) as e:
                 return jsonify({
                     'success': False,
-                    'error': 'Pelo menos duas opções são obrigatórias'
+                    'error': str(e)
                 }), 400
             
-            # Desativar enquetes antigas
-            Poll.query.update({'active': False})
+            print(f"📊 Nova enquete criada: {poll_data['question']}")
             
-            # Criar nova enquete
-            poll = Poll(
-                question=question,
-                option_a=option_a,
-                option_b=option_b,
-                option_c=option_c if option_c else None,
-                option_d=option_d if option_d else None,
-                active=True
-            )
-            
-            db.session.add(poll)
-            db.session.commit()
+            return jsonify({
+                'success': True,
+                'message': 'Enquete criada com sucesso',
+                'poll': poll_data
+            })
             
-            print(f"📊 Nova enquete criada: {question}")
+        except Exception as e:
+            print(f"❌ Erro ao criar enquete: {e}")
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+    
+    @app.route('/api/polls/schedule', methods=['GET', 'POST'])
+    def poll_schedule():
+        """Agenda de enquetes: consultar linha do tempo ou colocar enquete na fila"""
+        try:
+            if request.method == 'GET':
+                return jsonify({
+                    'success': True,
+                    'schedule': poll_scheduler.get_status()
+                })
             
-            # Emitir via WebSocket
-            if socketio:
-                socketio.emit('new_poll', poll.to_dict())
+            data = request.get_json() or {}
+            options = data.get('options')
+            if not isinstance(options, list):
+                options = [data.get(f'option_{key}', '') for key in ('a', 'b', 'c', 'd')]
             
-            # Adicionar à fila de eventos
-            if event_queue:
-                event_queue.add_event('poll_created', poll.to_dict())
+            try:
+                entry = poll_scheduler.enqueue(
+                    data.get('question', ''),
+                    options,
+                    open_seconds=data.get('open_seconds'),
+                    reveal_seconds=data.get('reveal_seconds')
+                )
+            except (TypeError, ValueError) as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
             
             return jsonify({
                 'success': True,
-                'message': 'Enquete criada com sucesso',
-                'poll': poll.to_dict()
+                'message': 'Enquete adicionada à agenda',
+                'entry': entry
             })
             
         except Exception as e:
-            print(f"❌ Erro ao criar enquete: {e}")
-            db.session.rollback()
+            print(f"❌ Erro na agenda de enquetes: {e}")
             return jsonify({
                 'success': False,
                 'error': str(e)
             }), 500
     
+    @app.route('/api/polls/schedule/<int:entry_id>', methods=['DELETE'])
+    def cancel_scheduled_poll(entry_id):
+        """Tirar enquete da fila da agenda"""
+        if not poll_scheduler.cancel(entry_id):
+            return jsonify({
+                'success': False,
+                'error': 'Enquete não está na fila'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'message': 'Enquete removida da agenda'
+        })
+    
     @app.route('/api/whisper/generate-song', methods=['POST'])
     def generate_song():
         """Gerar letra da música do dia"""
@@ -710,7 +987,19 @@ def create_app():
                     Screenshot.created_at >= datetime.now().replace(hour=0, minute=0, second=0)
                 ).count(),
                 'whisper_status': whisper_service.get_status() if whisper_service else None,
-                'queue_status': event_queue.get_status() if event_queue else None
+                'queue_status': event_queue.get_status() if event_queue else None,
+                'message_writer_status': message_writer.get_status() if message_writer else None,
+                'rate_limiter_status': rate_limiter.get_status() if rate_limiter else None,
+                'duplicate_filter_status': duplicate_filter.get_status() if duplicate_filter else None,
+                'moderation_status': moderation_filter.get_status() if moderation_filter else None,
+                'display_scheduler_status': display_scheduler.get_status() if display_scheduler else None,
+                'retention_status': retention_service.get_status() if retention_service else None,
+                'poll_engine_status': poll_engine.get_status() if poll_engine else None,
+                'vote_counter_status': vote_counter.get_status() if vote_counter else None,
+                'voter_registry_status': voter_registry.get_status() if voter_registry else None,
+                'poll_broadcaster_status': poll_broadcaster.get_status() if poll_broadcaster else None,
+                'vote_timeseries_status': vote_timeseries.get_status() if vote_timeseries else None,
+                'active_poll_cache_status': active_poll_cache.get_status() if active_poll_cache else None
             }
             
             return jsonify({
@@ -724,6 +1013,35 @@ def create_app():
                 'error': str(e)
             }), 500
     
+    @app.route('/api/queue/priorities', methods=['GET', 'POST'])
+    def queue_priorities():
+        """Consultar ou alterar prioridades da fila de eventos (menor = mais urgente)"""
+        try:
+            if request.method == 'POST':
+                data = request.get_json() or {}
+                priorities = data.get('priorities', {})
+                
+                for event_type, priority in priorities.items():
+                    event_queue.set_priority(event_type, int(priority))
+                    
+                print(f"⚙️ Prioridades da fila atualizadas: {priorities}")
+            
+            return jsonify({
+                'success': True,
+                'priorities': event_queue.get_priorities()
+            })
+            
+        except (TypeError, ValueError, AttributeError):
+            return jsonify({
+                'success': False,
+                'error': 'Prioridades inválidas'
+            }), 400
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+    
     @app.route('/api/health')
     def health_check():
         """Health check para monitoramento"""
@@ -737,7 +1055,7 @@ def create_app():
                 'database': 'connected',
                 'services': {
                     'whisper': whisper_service.is_running if whisper_service else False,
-                    'event_queue': event_queue.worker_thread.is_alive() if event_queue and event_queue.worker_thread else False
+                    'event_queue': event_queue.is_alive() if event_queue else False
                 }
             })
         except Exception as e:
@@ -747,6 +1065,25 @@ def create_app():
             }), 500
     
     # Overlays para OBS
+    @app.route('/overlay/api/next-message')
+    def overlay_next_message():
+        """Próxima mensagem pendente para overlays em modo polling"""
+        try:
+            message = display_scheduler.pop_next()
+            
+            return jsonify({
+                'success': True,
+                'has_message': message is not None,
+                'message': message
+            })
+            
+        except Exception as e:
+            print(f"❌ Erro ao buscar próxima mensagem: {e}")
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+    
     @app.route('/overlay')
     def overlay_index():
         """Página de overlays"""
@@ -782,6 +1119,29 @@ def create_app():
         # Emitir estatísticas atualizadas
         socketio.emit('stats_update', {'online_users': len(connected_users)})
     
+    @socketio.on('send_message')
+    def handle_send_message(data):
+        """Enviar mensagem pelo Socket.IO - resultado volta no ack, sem requisição HTTP"""
+        try:
+            payload, status, retry_after = accept_message(
+                data if isinstance(data, dict) else {},
+                ip=get_client_ip(request),
+                sid=request.sid
+            )
+            
+            payload['status'] = status
+            if retry_after:
+                payload['retry_after'] = retry_after
+            return payload
+            
+        except Exception as e:
+            print(f"❌ Erro ao enviar mensagem via Socket.IO: {e}")
+            return {
+                'success': False,
+                'status': 500,
+                'error': 'Erro interno do servidor'
+            }
+    
     @socketio.on('join_room')
     def handle_join_room(data):
         # Verificar se data é string ou dict
@@ -794,6 +1154,19 @@ def create_app():
         
         join_room(room)
         print(f"🏠 Usuário {request.sid} entrou na sala: {room}")
+        
+        # Overlay que recarregou no meio de uma exibição redesenha na hora
+        if event_queue and room in event_queue.now_showing:
+            emit('overlay_snapshot', {
+                'room': room,
+                'showing': event_queue.get_now_showing(room)
+            })
+        
+        # Telas de enquete recebem o placar completo; depois só deltas
+        if poll_broadcaster and room in poll_broadcaster.rooms:
+            poll_snapshot = poll_broadcaster.snapshot()
+            if poll_snapshot:
+                emit('poll_update', poll_snapshot)
     
     @socketio.on('leave_room')
     def handle_leave_room(data):
@@ -824,6 +1197,18 @@ def setup_signal_handlers(socketio):
             whisper_service.stop()  # Usar método correto 'stop' ao invés de 'stop_transcription'
         if event_queue:
             event_queue.stop()
+        if retention_service:
+            retention_service.stop()
+        if poll_scheduler:
+            poll_scheduler.stop()
+        if poll_broadcaster:
+            poll_broadcaster.stop()
+        if vote_counter:
+            vote_counter.stop()
+        if display_scheduler:
+            display_scheduler.stop()
+        if message_writer:
+            message_writer.stop()
             
         socketio.stop()
         sys.exit(0)
@@ -0,0 +1,111 @@
+"""
+Cache em memória da enquete ativa
+Responde /api/polls/active sem tocar no banco, com ETag e long-poll por versão
+"""
+
+import os
+import json
+import time
+import threading
+import logging
+
+from .async_backend import select_backend
+
+class ActivePollCache:
+    """Corpo JSON da enquete ativa montado uma vez por versão.
+
+    Cada mudança publicada (enquete nova, votos, fim da enquete) incrementa
+    `version`, que vira o ETag do endpoint. `wait(since)` segura a
+    requisição até a versão passar de `since` ou o tempo acabar, esperando
+    no sinal do backend do Socket.IO: cada versão tem seu próprio sinal,
+    disparado uma vez por `publish` e trocado por um novo, o que acorda
+    todas as requisições em espera sem prender o hub.
+    """
+
+    def __init__(self, socketio=None):
+        self.backend = select_backend(socketio)
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        # Configurações
+        self.max_wait = float(os.getenv('ACTIVE_POLL_LONGPOLL_TIMEOUT', 25))
+
+        # Base em milissegundos para o ETag continuar crescente após reinício
+        self.version = int(time.time() * 1000)
+        self.poll_data = None
+        self.body = None
+        self.status = 404
+        self.changed = self.backend.make_wakeup()  # Sinal da versão atual
+        self._render()
+
+    def publish(self, poll_data):
+        """Publicar o dict da enquete ativa (None = nenhuma); ignora se nada mudou"""
+        with self.lock:
+            if poll_data == self.poll_data and self.body is not None:
+                return self.version
+            self.poll_data = poll_data
+            self.version += 1
+            self._render()
+            version = self.version
+            changed, self.changed = self.changed, self.backend.make_wakeup()
+
+        changed.set()
+        return version
+
+    def get_json(self):
+        """Obter (versão, corpo JSON, status HTTP)"""
+        with self.lock:
+            return self.version, self.body, self.status
+
+    def wait(self, since, timeout=None):
+        """Esperar a versão passar de `since`; retorna True se mudou"""
+        timeout = self.max_wait if timeout is None else min(timeout, self.max_wait)
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                if self.version > since:
+                    return True
+                changed = self.changed
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            changed.wait(remaining)
+
+    def get_status(self):
+        """Obter status do cache"""
+        return {
+            'version': self.version,
+            'poll_id': self.poll_data['id'] if self.poll_data else None,
+            'max_wait_seconds': self.max_wait
+        }
+
+    def _render(self):
+        """Serializar a versão atual (chamado sob self.lock ou no __init__)"""
+        if self.poll_data is None:
+            self.status = 404
+            self.body = json.dumps({
+                'success': False,
+                'message': 'Nenhuma enquete ativa',
+                'version': self.version
+            }, ensure_ascii=False, separators=(',', ':'))
+        else:
+            self.status = 200
+            self.body = json.dumps({
+                'success': True,
+                'poll': self.poll_data,
+                'version': self.version
+            }, ensure_ascii=False, separators=(',', ':'))
+
+# Instância global do cache
+active_poll_cache = None
+
+def init_active_poll_cache(socketio=None):
+    """Inicializar cache da enquete ativa"""
+    global active_poll_cache
+    active_poll_cache = ActivePollCache(socketio)
+    return active_poll_cache
+
+def get_active_poll_cache():
+    """Obter instância do cache da enquete ativa"""
+    return active_poll_cache
@@ -0,0 +1,235 @@
+"""
+Backends de concorrência para os workers dos serviços
+Escolhe threads do sistema ou green threads conforme o async_mode do Socket.IO
+"""
+
+import os
+import threading
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+class ThreadingBackend:
+    """Workers em threads do sistema (sem Socket.IO ou async_mode='threading')"""
+
+    name = 'threading'
+
+    def __init__(self, socketio=None):
+        self.socketio = socketio
+
+    def start(self, target, *args):
+        """Iniciar worker em segundo plano"""
+        if self.socketio is not None:
+            return self.socketio.start_background_task(target, *args)
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        return thread
+
+    def sleep(self, seconds):
+        """Dormir sem prender outros workers"""
+        time.sleep(seconds)
+
+    def make_wakeup(self):
+        """Sinal para acordar um worker adormecido (set/clear/wait)"""
+        return threading.Event()
+
+    def make_lock(self):
+        """Trava de exclusão mútua entre workers deste backend"""
+        return threading.Lock()
+
+    def call_blocking(self, target, *args):
+        """Executar chamada bloqueante (rede, CPU) sem travar outros workers"""
+        return target(*args)
+
+    @staticmethod
+    def is_alive(task):
+        """Se o worker ainda está rodando"""
+        if task is None:
+            return False
+        if hasattr(task, 'is_alive'):
+            return task.is_alive()
+        # engineio embrulha a green thread do eventlet em `.g`
+        task = getattr(task, 'g', task)
+        return task is not None and not getattr(task, 'dead', True)
+
+class GreenBackend(ThreadingBackend):
+    """Workers em green threads do hub do Socket.IO (eventlet ou gevent).
+
+    Tarefas são criadas com `socketio.start_background_task` e dormem com
+    `socketio.sleep`, que cedem a vez ao hub em vez de bloqueá-lo; a espera
+    por trabalho usa a fila/evento nativo da biblioteca.
+
+    Sem monkey patching, serviços com thread própria (Whisper, screenshots)
+    continuam em threads do sistema. As primitivas do hub não podem ser
+    tocadas dessas threads: `set()` dos sinais é repassado ao hub por
+    `call_on_hub`, e as travas de `make_lock` são só para green threads.
+    """
+
+    def __init__(self, socketio, async_mode):
+        super().__init__(socketio)
+        self.name = async_mode
+        self.relay = HubRelay.for_backend(self)
+
+    def start(self, target, *args):
+        """Iniciar green thread no hub do Socket.IO"""
+        return self.socketio.start_background_task(target, *args)
+
+    def sleep(self, seconds):
+        """Ceder ao hub pelo tempo pedido"""
+        self.socketio.sleep(seconds)
+
+    def make_wakeup(self):
+        """Sinal nativo do hub; `set()` pode vir de qualquer thread"""
+        if self.name == 'eventlet':
+            native = EventletWakeup()
+        else:
+            from gevent.event import Event
+            native = Event()
+        return GreenWakeup(native, self.relay)
+
+    def call_on_hub(self, callback, *args):
+        """Executar callback(*args) numa green thread do hub, de qualquer thread"""
+        self.relay.call(callback, *args)
+
+    def make_lock(self):
+        """Semáforo do hub: exclui green threads mesmo com a trava segura durante uma espera
+
+        Só para green threads do hub: uma thread do sistema que esperasse por
+        ele bloquearia num hub que nunca recebe a liberação. Threads do
+        sistema entram por `call_on_hub` ou `start`.
+        """
+        if self.name == 'eventlet':
+            from eventlet.semaphore import Semaphore
+        else:
+            from gevent.lock import Semaphore
+        return Semaphore(1)
+
+    def call_blocking(self, target, *args):
+        """Executar numa thread do sistema e esperar cedendo ao hub"""
+        if self.name == 'eventlet':
+            from eventlet import tpool
+            return tpool.execute(target, *args)
+        import gevent
+        return gevent.get_hub().threadpool.apply(target, args)
+
+class HubRelay:
+    """Ponte de threads do sistema para o hub por um pipe.
+
+    A thread do sistema enfileira a chamada e escreve um byte no pipe; uma
+    green thread do hub espera o pipe ficar legível (sem prender o hub) e
+    executa as chamadas enfileiradas. Na própria thread do hub a chamada é
+    direta. Uma ponte por biblioteca, criada com o primeiro backend.
+    """
+
+    relays = {}
+    relays_lock = threading.Lock()
+
+    def __init__(self, backend):
+        self.name = backend.name
+        self.hub_thread = threading.get_ident()
+        self.pending = deque()
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+        os.set_blocking(self.write_fd, False)
+        backend.start(self._run)
+
+    @classmethod
+    def for_backend(cls, backend):
+        """Ponte compartilhada da biblioteca do backend"""
+        with cls.relays_lock:
+            relay = cls.relays.get(backend.name)
+            if relay is None:
+                relay = cls.relays[backend.name] = cls(backend)
+            return relay
+
+    def call(self, callback, *args):
+        """Executar no hub: direto se já estiver nele, senão pelo pipe"""
+        if threading.get_ident() == self.hub_thread:
+            callback(*args)
+            return
+        self.pending.append((callback, args))
+        try:
+            os.write(self.write_fd, b'\0')
+        except BlockingIOError:
+            pass  # Pipe cheio: o hub já tem bytes para acordar e esvaziar a fila
+
+    def _run(self):
+        """Green thread do hub: esvaziar a fila a cada byte recebido"""
+        if self.name == 'eventlet':
+            from eventlet.hubs import trampoline
+            wait_readable = lambda: trampoline(self.read_fd, read=True)
+        else:
+            from gevent.socket import wait_read
+            wait_readable = lambda: wait_read(self.read_fd)
+
+        while True:
+            wait_readable()
+            try:
+                os.read(self.read_fd, 4096)
+            except BlockingIOError:
+                pass
+            while self.pending:
+                callback, args = self.pending.popleft()
+                try:
+                    callback(*args)
+                except Exception as e:
+                    logger.error(f"Erro em chamada repassada ao hub: {e}")
+
+class GreenWakeup:
+    """Sinal do hub cujo `set()` é seguro de qualquer thread (`clear`/`wait` só no hub)"""
+
+    def __init__(self, native, relay):
+        self.native = native
+        self.relay = relay
+
+    def set(self):
+        """Acordar quem está esperando (idempotente)"""
+        self.relay.call(self.native.set)
+
+    def clear(self):
+        """Descartar sinal pendente"""
+        self.native.clear()
+
+    def wait(self, timeout=None):
+        """Esperar sinal ou timeout, cedendo ao hub"""
+        return self.native.wait(timeout)
+
+class EventletWakeup:
+    """Sinal set/clear/wait sobre uma fila do eventlet (Event do eventlet não reinicia)"""
+
+    def __init__(self):
+        from eventlet.queue import LightQueue
+        self.queue = LightQueue(maxsize=1)
+
+    def set(self):
+        """Acordar quem está esperando (idempotente)"""
+        if self.queue.empty():
+            self.queue.put_nowait(True)
+
+    def clear(self):
+        """Descartar sinal pendente"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    def wait(self, timeout=None):
+        """Esperar sinal ou timeout, cedendo ao hub; mantém o sinal como Event.wait"""
+        from eventlet.queue import Empty
+        try:
+            self.queue.put_nowait(self.queue.get(timeout=timeout))
+            return True
+        except Empty:
+            return False
+
+def select_backend(socketio=None):
+    """Backend compatível com o async_mode do Socket.IO"""
+    async_mode = getattr(socketio, 'async_mode', None) if socketio is not None else None
+
+    if async_mode in ('eventlet', 'gevent', 'gevent_uwsgi'):
+        backend = GreenBackend(socketio, 'gevent' if async_mode.startswith('gevent') else async_mode)
+    else:
+        backend = ThreadingBackend(socketio)
+
+    logger.info(f"Backend de concorrência dos workers: {backend.name}")
+    return backend
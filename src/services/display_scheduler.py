@@ -0,0 +1,201 @@
+"""
+Agendador em memória das mensagens pendentes de exibição no overlay
+Substitui a consulta por `displayed=False` e o commit por mensagem
+"""
+
+import os
+import heapq
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
+
+class DisplayScheduler:
+    """Heap de mensagens pendentes ordenado por (created_at, id).
+
+    Reconstruído do banco na inicialização; depois disso escolher a próxima
+    mensagem é O(log n), independente do tamanho da tabela. Marcações de
+    exibida são acumuladas e gravadas em lote por uma thread.
+    """
+
+    def __init__(self, app, db, model, writer=None):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.writer = writer  # MessageWriter: linhas precisam existir antes do UPDATE
+        self.heap = []
+        self.pending = {}  # id -> dict da mensagem ainda não exibida
+        self.displayed_ids = []
+        self.lock = threading.Lock()
+        self.is_running = False
+        self.worker_thread = None
+        self.flush_interval = 1.0
+        self.update_chunk_size = 500
+        self.compact_slack = 64  # Entradas mortas toleradas no heap antes de compactar
+        self.rebuild_hours = float(os.getenv('DISPLAY_REBUILD_HOURS', 6))  # Mais antigas não voltam ao overlay
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """Reconstruir pendentes e iniciar thread de gravação em lote"""
+        if self.is_running:
+            return
+
+        self.rebuild()
+        self.is_running = True
+        self.worker_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.worker_thread.start()
+
+    def stop(self):
+        """Parar thread e gravar marcações pendentes"""
+        self.is_running = False
+        if self.worker_thread:
+            self.worker_thread.join(timeout=5)
+        self.flush()
+
+    def rebuild(self):
+        """Carregar mensagens não exibidas do banco"""
+        table = self.model.__table__
+        cutoff = datetime.utcnow() - timedelta(hours=self.rebuild_hours)
+        with self.app.app_context():
+            rows = self.db.session.execute(
+                self.db.select(table)
+                .where(table.c.displayed == False, table.c.created_at >= cutoff)  # noqa: E712
+                .order_by(table.c.created_at, table.c.id)
+            ).mappings().all()
+
+        with self.lock:
+            self.pending = {}
+            for row in rows:
+                self.pending[row['id']] = {
+                    'id': row['id'],
+                    'name': row['name'],
+                    'content': row['content'],
+                    'created_at': row['created_at'].isoformat() if row['created_at'] else None,
+                    'displayed': False
+                }
+            # Já vem ordenado do índice: uma lista ordenada é um heap válido
+            self.heap = [(message['created_at'] or '', message_id) for message_id, message in self.pending.items()]
+
+        self.logger.info(f"Agendador de exibição reconstruído: {len(rows)} mensagens pendentes")
+
+    def push(self, message_data):
+        """Adicionar mensagem recém-aceita"""
+        with self.lock:
+            self.pending[message_data['id']] = message_data
+            heapq.heappush(self.heap, (message_data.get('created_at') or '', message_data['id']))
+
+    def get_next(self):
+        """Próxima mensagem pendente sem removê-la, ou None"""
+        with self.lock:
+            self._discard_stale()
+            if not self.heap:
+                return None
+            return self.pending[self.heap[0][1]]
+
+    def pop_next(self):
+        """Retirar a próxima mensagem pendente já marcando como exibida"""
+        with self.lock:
+            self._discard_stale()
+            if not self.heap:
+                return None
+            _, message_id = heapq.heappop(self.heap)
+            message = self.pending.pop(message_id)
+            self.displayed_ids.append(message_id)
+            return message
+
+    def mark_displayed(self, message_id):
+        """Marcar como exibida; a gravação no banco acontece no próximo lote"""
+        with self.lock:
+            if self.pending.pop(message_id, None) is None:
+                return False
+            # A entrada no heap é descartada de forma preguiçosa; se as mortas
+            # passam a dominar, o heap é refeito só com as pendentes
+            self.displayed_ids.append(message_id)
+            if len(self.heap) > 2 * len(self.pending) + self.compact_slack:
+                self._compact()
+            return True
+
+    def flush(self):
+        """Gravar marcações de exibida em lote
+
+        IDs cuja linha ainda não existe (lote do MessageWriter não gravado)
+        ficam para o próximo flush enquanto o writer os tiver pendentes.
+        """
+        with self.lock:
+            if not self.displayed_ids:
+                return 0
+            ids = self.displayed_ids
+            self.displayed_ids = []
+
+        if self.writer:
+            self.writer.flush()
+
+        table = self.model.__table__
+        marked = set()
+        try:
+            with self.app.app_context():
+                for start in range(0, len(ids), self.update_chunk_size):
+                    chunk = ids[start:start + self.update_chunk_size]
+                    marked.update(self.db.session.execute(
+                        self.db.select(table.c.id).where(table.c.id.in_(chunk))
+                    ).scalars())
+                    self.db.session.execute(
+                        table.update().where(table.c.id.in_(chunk)).values(displayed=True)
+                    )
+                self.db.session.commit()
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar {len(ids)} marcações de exibição: {e}")
+            with self.lock:
+                self.displayed_ids = ids + self.displayed_ids
+            return 0
+
+        missing = [message_id for message_id in ids if message_id not in marked]
+        if missing:
+            waiting = self.writer.pending_ids() if self.writer else set()
+            retry = [message_id for message_id in missing if message_id in waiting]
+            if len(retry) < len(missing):
+                self.logger.warning(f"{len(missing) - len(retry)} marcações de exibição sem mensagem no banco descartadas")
+            with self.lock:
+                self.displayed_ids = retry + self.displayed_ids
+
+        return len(marked)
+
+    def get_status(self):
+        """Obter status do agendador"""
+        return {
+            'pending': len(self.pending),
+            'unflushed_displayed': len(self.displayed_ids)
+        }
+
+    def _compact(self):
+        """Refazer o heap só com as mensagens pendentes (chamado sob self.lock)"""
+        self.heap = [entry for entry in self.heap if entry[1] in self.pending]
+        heapq.heapify(self.heap)
+
+    def _discard_stale(self):
+        """Remover do topo do heap entradas já exibidas (chamado sob self.lock)"""
+        while self.heap and self.heap[0][1] not in self.pending:
+            heapq.heappop(self.heap)
+
+    def _flush_loop(self):
+        """Loop de gravação periódica"""
+        while self.is_running:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error(f"Erro no loop do agendador de exibição: {e}")
+
+# Instância global do agendador
+display_scheduler = None
+
+def init_display_scheduler(app, db, model, writer=None):
+    """Inicializar agendador de exibição a partir do banco"""
+    global display_scheduler
+    display_scheduler = DisplayScheduler(app, db, model, writer)
+    display_scheduler.start()
+    return display_scheduler
+
+def get_display_scheduler():
+    """Obter instância do agendador de exibição"""
+    return display_scheduler
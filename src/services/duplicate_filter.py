@@ -0,0 +1,203 @@
+"""
+Supressão de mensagens quase duplicadas (flood de hype)
+Índice SimHash em janela deslizante, consultado antes de gravar a mensagem
+"""
+
+import os
+import re
+import hashlib
+import threading
+import time
+import logging
+import unicodedata
+from collections import deque
+from functools import lru_cache
+
+SIMHASH_BITS = 64
+BAND_BITS = 16
+BAND_COUNT = SIMHASH_BITS // BAND_BITS
+LANE_BITS = 10  # Contador de 10 bits por posição: até 1023 trigramas por texto
+LANE_MASK = (1 << LANE_BITS) - 1
+
+_REPEATED_CHARS = re.compile(r'(.)\1{2,}')
+_NON_WORD = re.compile(r'[^\w]+')
+
+def normalize_text(text):
+    """Minúsculas, sem acentos, sem pontuação e sem letras repetidas ("kkkkk" -> "kk")"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = _NON_WORD.sub(' ', text).strip()
+    return _REPEATED_CHARS.sub(r'\1\1', text)
+
+# Cada byte possível já espalhado em 8 contadores
+_BYTE_SPREAD = [
+    sum(1 << (bit * LANE_BITS) for bit in range(8) if byte >> bit & 1)
+    for byte in range(256)
+]
+
+@lru_cache(maxsize=65536)
+def _spread_trigram(trigram):
+    """Hash do trigrama espalhado em 64 contadores de LANE_BITS dentro de um único int"""
+    digest = hashlib.blake2b(trigram.encode('utf-8'), digest_size=8).digest()
+    spread = 0
+    for index, byte in enumerate(digest):
+        spread |= _BYTE_SPREAD[byte] << (index * 8 * LANE_BITS)
+    return spread
+
+def simhash(normalized):
+    """SimHash de 64 bits sobre trigramas de caracteres"""
+    trigrams = [normalized[i:i + 3] for i in range(max(1, len(normalized) - 2))]
+    trigrams = trigrams[:LANE_MASK]
+
+    # Somar todos os vetores de bits de uma vez usando aritmética de inteiros
+    lanes = sum(_spread_trigram(trigram) for trigram in trigrams)
+    half = len(trigrams) / 2
+
+    fingerprint = 0
+    for bit in range(SIMHASH_BITS):
+        if (lanes >> (bit * LANE_BITS)) & LANE_MASK > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+@lru_cache(maxsize=1024)
+def _signature(content, min_simhash_length):
+    """(texto normalizado, SimHash ou None); find() seguido de register() calcula uma vez só"""
+    normalized = normalize_text(content)
+    fingerprint = simhash(normalized) if len(normalized) >= min_simhash_length else None
+    return normalized, fingerprint
+
+class DuplicateFilter:
+    """Janela das últimas mensagens indexadas por SimHash.
+
+    O hash de 64 bits é dividido em 4 faixas de 16 bits; duas mensagens a
+    até 3 bits de distância compartilham pelo menos uma faixa, então a busca
+    só compara com os poucos candidatos dessas faixas. Textos curtos usam
+    apenas igualdade exata após normalização.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.window = deque()  # (expira_em, entrada) em ordem de chegada
+        self.exact = {}
+        self.bands = [{} for _ in range(BAND_COUNT)]
+        self.logger = logging.getLogger(__name__)
+
+        # Configurações
+        self.policy = os.getenv('DUPLICATE_POLICY', 'merge')  # 'merge' ou 'reject'
+        self.window_seconds = float(os.getenv('DUPLICATE_WINDOW_SECONDS', 120))
+        self.max_entries = int(os.getenv('DUPLICATE_WINDOW_SIZE', 5000))
+        self.max_distance = int(os.getenv('DUPLICATE_MAX_DISTANCE', 3))
+        self.min_simhash_length = 12
+
+        # Contadores
+        self.total_checked = 0
+        self.total_duplicates = 0
+
+    def find(self, content):
+        """Encontrar mensagem original equivalente na janela, ou None"""
+        normalized, fingerprint = _signature(content, self.min_simhash_length)
+
+        with self.lock:
+            self._expire(time.monotonic())
+            self.total_checked += 1
+
+            entry = self.exact.get(normalized)
+            if entry is None and fingerprint is not None:
+                entry = self._nearest(fingerprint)
+
+            if entry is not None:
+                self.total_duplicates += 1
+            return entry
+
+    def register(self, content, message_data):
+        """Registrar mensagem aceita como original na janela"""
+        normalized, fingerprint = _signature(content, self.min_simhash_length)
+        now = time.monotonic()
+
+        entry = {
+            'message_id': message_data['id'],
+            'message': message_data,
+            'normalized': normalized,
+            'simhash': fingerprint,
+            'count': 1
+        }
+
+        with self.lock:
+            self.window.append((now + self.window_seconds, entry))
+            self.exact[normalized] = entry
+            if fingerprint is not None:
+                for band, value in enumerate(self._bands(fingerprint)):
+                    self.bands[band].setdefault(value, []).append(entry)
+
+            while len(self.window) > self.max_entries:
+                self._evict(self.window.popleft()[1])
+
+        return entry
+
+    def merge(self, entry):
+        """Somar uma cópia à mensagem original; retorna o total de cópias"""
+        with self.lock:
+            entry['count'] += 1
+            return entry['count']
+
+    def get_status(self):
+        """Obter status do filtro"""
+        return {
+            'policy': self.policy,
+            'window_size': len(self.window),
+            'total_checked': self.total_checked,
+            'total_duplicates': self.total_duplicates
+        }
+
+    def _nearest(self, fingerprint):
+        """Melhor candidato dentro da distância máxima (chamado sob self.lock)"""
+        best = None
+        best_distance = self.max_distance + 1
+
+        for band, value in enumerate(self._bands(fingerprint)):
+            for candidate in self.bands[band].get(value, ()):
+                distance = bin(candidate['simhash'] ^ fingerprint).count('1')
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+
+        return best
+
+    def _expire(self, now):
+        """Remover entradas vencidas do início da janela (chamado sob self.lock)"""
+        while self.window and self.window[0][0] <= now:
+            self._evict(self.window.popleft()[1])
+
+    def _evict(self, entry):
+        """Tirar entrada dos índices (chamado sob self.lock)"""
+        if self.exact.get(entry['normalized']) is entry:
+            del self.exact[entry['normalized']]
+
+        if entry['simhash'] is not None:
+            for band, value in enumerate(self._bands(entry['simhash'])):
+                bucket = self.bands[band].get(value)
+                if bucket is None:
+                    continue
+                bucket = [candidate for candidate in bucket if candidate is not entry]
+                if bucket:
+                    self.bands[band][value] = bucket
+                else:
+                    del self.bands[band][value]
+
+    @staticmethod
+    def _bands(fingerprint):
+        """Dividir o SimHash em faixas de BAND_BITS"""
+        mask = (1 << BAND_BITS) - 1
+        return [(fingerprint >> (band * BAND_BITS)) & mask for band in range(BAND_COUNT)]
+
+# Instância global do filtro
+duplicate_filter = DuplicateFilter()
+
+def init_duplicate_filter():
+    """Inicializar filtro de duplicatas com as configurações do .env"""
+    global duplicate_filter
+    duplicate_filter = DuplicateFilter()
+    return duplicate_filter
+
+def get_duplicate_filter():
+    """Obter instância do filtro de duplicatas"""
+    return duplicate_filter
@@ -0,0 +1,184 @@
+"""
+Journal durável da fila de eventos
+Registra as transições de cada evento num SQLite (WAL) separado, gravando em lote
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import logging
+
+# Estados finais: o evento não volta para a fila na recuperação
+FINAL_STATES = ('complete', 'dropped', 'cleared')
+
+class EventJournal:
+    """Log append-only de transições enqueue -> dispatch -> complete.
+
+    `record()` só acumula a transição em memória; uma thread grava o
+    acumulado a cada `flush_interval` segundos numa única transação
+    (um fsync por lote com synchronous=FULL), então a durabilidade não
+    limita a taxa de enfileiramento. Na inicialização, eventos sem estado
+    final são devolvidos para a fila (pelo menos uma vez).
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('EVENT_JOURNAL_PATH', 'instance/event_journal.db')
+        self.flush_interval = float(os.getenv('EVENT_JOURNAL_FLUSH_MS', 20)) / 1000.0
+        self.compact_every = 500  # Lotes entre compactações
+        self.connection = None
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.flush_event = threading.Event()
+        self.is_running = False
+        self.worker_thread = None
+        self.logger = logging.getLogger(__name__)
+
+        # Contadores
+        self.total_records = 0
+        self.total_batches = 0
+
+    def start(self):
+        """Abrir o banco do journal e iniciar thread de gravação"""
+        if self.is_running:
+            return
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=FULL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS event_journal ('
+            'seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'event_id TEXT NOT NULL, '
+            'state TEXT NOT NULL, '
+            'event_type TEXT, '
+            'priority INTEGER, '
+            'data TEXT, '
+            'created_at TEXT)'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS ix_event_journal_event_id ON event_journal (event_id)'
+        )
+        self.connection.commit()
+
+        self.is_running = True
+        self.worker_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.worker_thread.start()
+        self.logger.info(f"Journal da fila de eventos aberto em {self.path}")
+
+    def stop(self):
+        """Gravar o que estiver pendente e fechar o banco"""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        self.flush_event.set()
+        if self.worker_thread:
+            self.worker_thread.join(timeout=5)
+
+        self.flush()
+        self.connection.close()
+        self.connection = None
+
+    def record(self, event_id, state, event=None):
+        """Anotar transição (o evento completo só no enqueue)"""
+        row = (event_id, state, None, None, None, None)
+        if event is not None:
+            row = (
+                event_id,
+                state,
+                event['type'],
+                event['priority'],
+                json.dumps(event['data'], ensure_ascii=False, default=str),
+                event['timestamp'].isoformat()
+            )
+
+        with self.lock:
+            self.buffer.append(row)
+
+    def flush(self):
+        """Gravar transições acumuladas numa transação"""
+        with self.flush_lock:
+            with self.lock:
+                if not self.buffer or self.connection is None:
+                    return 0
+                rows = self.buffer
+                self.buffer = []
+
+            try:
+                self.connection.executemany(
+                    'INSERT INTO event_journal (event_id, state, event_type, priority, data, created_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    rows
+                )
+                self.connection.commit()
+            except sqlite3.Error as e:
+                self.logger.error(f"Erro ao gravar {len(rows)} transições no journal: {e}")
+                self.connection.rollback()
+                with self.lock:
+                    self.buffer = rows + self.buffer
+                return 0
+
+            self.total_records += len(rows)
+            self.total_batches += 1
+            if self.total_batches % self.compact_every == 0:
+                self._compact()
+            return len(rows)
+
+    def unfinished(self):
+        """Eventos enfileirados sem estado final, na ordem de chegada"""
+        rows = self.connection.execute(
+            'SELECT event_id, event_type, priority, data, created_at FROM event_journal '
+            "WHERE state = 'enqueue' AND event_id NOT IN ("
+            f"SELECT event_id FROM event_journal WHERE state IN ({', '.join('?' * len(FINAL_STATES))})"
+            ') ORDER BY seq',
+            FINAL_STATES
+        ).fetchall()
+
+        events = []
+        for event_id, event_type, priority, data, created_at in rows:
+            try:
+                events.append({
+                    'id': event_id,
+                    'type': event_type,
+                    'priority': priority,
+                    'data': json.loads(data),
+                    'created_at': created_at
+                })
+            except (TypeError, ValueError):
+                self.logger.warning(f"Evento ilegível no journal ignorado: {event_id}")
+        return events
+
+    def get_status(self):
+        """Obter status do journal"""
+        return {
+            'path': self.path,
+            'buffered': len(self.buffer),
+            'total_records': self.total_records,
+            'total_batches': self.total_batches
+        }
+
+    def _flush_loop(self):
+        """Loop de gravação em lote"""
+        while self.is_running:
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error(f"Erro no loop do journal de eventos: {e}")
+
+    def _compact(self):
+        """Apagar transições de eventos já finalizados (chamado sob flush_lock)"""
+        try:
+            self.connection.execute(
+                'DELETE FROM event_journal WHERE event_id IN ('
+                f"SELECT event_id FROM event_journal WHERE state IN ({', '.join('?' * len(FINAL_STATES))}))",
+                FINAL_STATES
+            )
+            self.connection.commit()
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao compactar journal de eventos: {e}")
+            self.connection.rollback()
@@ -1,88 +1,422 @@
 """
 Sistema de filas de eventos para evitar sobreposição
-Garante que eventos sejam processados sequencialmente
+Cada overlay (canal) exibe um evento por vez, por ordem de prioridade, em paralelo aos demais
 """
 
+import os
+import math
 import threading
 import time
-import queue
+import heapq
+import itertools
+from collections import deque
 from datetime import datetime
 import logging
 
+from .async_backend import ThreadingBackend, select_backend
+from .event_journal import EventJournal
+from .latency_metrics import LatencyHistogram, ThroughputCounter
+
 class EventQueue:
+    # Prioridade padrão por tipo de evento (menor = mais urgente)
+    DEFAULT_PRIORITIES = {
+        'live_update': 0,
+        'poll': 1,
+        'poll_created': 1,
+        'screenshot': 2,
+        'message': 3
+    }
+    
+    # Canal de exibição (sala do overlay) por tipo de evento. Cada canal exibe
+    # um evento por vez, mas canais diferentes correm em paralelo. Tipos sem
+    # canal só emitem e são despachados assim que chegam.
+    CHANNELS = {
+        'message': 'overlay_messages',
+        'poll': 'overlay_polls',
+        'poll_created': 'overlay_polls'
+    }
+    
+    # Tipos sujeitos ao limite de capacidade (ações do admin nunca são descartadas)
+    SHEDDABLE_TYPES = ('message',)
+    SHEDDING_POLICIES = ('drop_oldest', 'drop_newest', 'sample', 'fair')
+    
     def __init__(self, socketio=None):
         self.socketio = socketio
-        self.queue = queue.Queue()
-        self.processing = False
+        self.lanes = {}  # (tipo, prioridade explícita) -> deque FIFO de eventos
+        self.lane_priorities = dict(self.DEFAULT_PRIORITIES)
+        self.lock = threading.RLock()
+        self.pending_count = 0
+        self.running = True
         self.worker_thread = None
-        self.lock = threading.Lock()
+        self.worker_generation = 0
+        
+        # Threads do sistema até init_event_queue escolher o backend do Socket.IO
+        self.backend = ThreadingBackend()
+        self.wakeup = self.backend.make_wakeup()
+        self.event_sequence = itertools.count(1)
+        
+        # Linha do tempo: prazos (monotonic) de fim de exibição e afins
+        self.timers = []  # heap de (vence_em, seq, callback, args)
+        self.timer_sequence = itertools.count()
+        self.busy_until = {channel: 0.0 for channel in self.CHANNELS.values()}  # Canal ocupado até
+        self.now_showing = {channel: None for channel in self.CHANNELS.values()}  # O que está na tela
         self.logger = logging.getLogger(__name__)
         
         # Configurações
         self.event_delay = 1.0  # 1 segundo entre eventos
         self.message_display_time = 8.0  # 8 segundos para mensagens
         self.poll_display_time = 30.0  # 30 segundos para enquetes
+        self.default_priority = 2
+        self.aging_interval = 10.0  # Cada 10s de espera vale 1 nível de prioridade
+        
+        # Modo adaptativo do chat: com fila grande, encurta a exibição e agrupa
+        # mensagens por card para respeitar o tempo máximo até a tela (SLO)
+        self.adaptive_messages = os.getenv('OVERLAY_ADAPTIVE', 'True').lower() == 'true'
+        self.max_time_to_screen = float(os.getenv('OVERLAY_MAX_TIME_TO_SCREEN', 120))
+        self.min_message_display_time = float(os.getenv('OVERLAY_MIN_DISPLAY_TIME', 3))
+        self.max_messages_per_card = int(os.getenv('OVERLAY_MAX_MESSAGES_PER_CARD', 5))
+        
+        # Latência medida entre entrar na fila e aparecer no overlay
+        self.time_to_screen_samples = deque(maxlen=500)
+        
+        # Limite de capacidade e política de descarte quando a fila enche
+        self.capacity = int(os.getenv('EVENT_QUEUE_CAPACITY', 500))
+        self.shedding_policy = os.getenv('EVENT_QUEUE_POLICY', 'fair')
+        if self.shedding_policy not in self.SHEDDING_POLICIES:
+            self.logger.warning(f"Política de descarte inválida: {self.shedding_policy!r}, usando 'fair'")
+            self.shedding_policy = 'fair'
+        self.sample_n = max(1, int(os.getenv('EVENT_QUEUE_SAMPLE_N', 10)))
+        self.shed_count = 0  # Eventos descartáveis na fila
+        self.sender_counts = {}  # Remetente -> eventos descartáveis na fila
+        self.overflow_seen = 0
+        self.dropped_by_type = {}
+        self.served_sequence = itertools.count()
+        self.last_served = {}  # Remetente -> ordem do último atendimento (rodízio)
+        self.fair_scan = 50  # Eventos examinados na frente da lane ao escolher a vez
+        
+        # Métricas por tipo: fila -> despacho, despacho -> fim e total
+        self.latency = {}
+        self.throughput = ThroughputCounter()
+        self.throughput_by_type = {}
+        
+        # Journal durável das transições (None = só memória)
+        self.journal = None
+        
+        # Chamado com o ID da mensagem ao fim da exibição no overlay, e também
+        # quando a mensagem é descartada pela política: ela não volta a ficar pendente
+        self.message_displayed_callback = None
         
         # Iniciar worker thread
         self.start_worker()
         
     def start_worker(self):
-        """Iniciar thread worker para processar eventos"""
-        if self.worker_thread and self.worker_thread.is_alive():
+        """Iniciar worker para processar eventos"""
+        if self.is_alive():
             return
             
-        self.worker_thread = threading.Thread(
-            target=self._process_queue,
-            daemon=True
-        )
-        self.worker_thread.start()
-        self.logger.info("Worker thread da fila de eventos iniciado")
+        self.running = True
+        self.worker_generation += 1
+        self.worker_thread = self.backend.start(self._process_queue, self.worker_generation)
+        self.logger.info(f"Worker da fila de eventos iniciado ({self.backend.name})")
         
-    def add_event(self, event_type, data, priority=1):
-        """Adicionar evento à fila"""
+    def set_backend(self, backend):
+        """Trocar o backend de concorrência, substituindo o worker atual"""
+        if backend.name == self.backend.name and backend.socketio is self.backend.socketio:
+            return
+            
+        with self.lock:
+            # O worker antigo sai do loop ao ver a geração mudar
+            self.worker_generation += 1
+            old_wakeup = self.wakeup
+            self.backend = backend
+            self.wakeup = backend.make_wakeup()
+            self.worker_thread = None
+        old_wakeup.set()
+        
+        self.start_worker()
+        
+    def is_alive(self):
+        """Se o worker da fila está rodando"""
+        return self.backend.is_alive(self.worker_thread)
+        
+    def add_event(self, event_type, data, priority=None):
+        """Adicionar evento à fila (priority=None usa a prioridade do tipo)"""
         event = {
             'type': event_type,
             'data': data,
             'priority': priority,
             'timestamp': datetime.now(),
-            'id': f"{event_type}_{int(time.time() * 1000)}"
+            'enqueued_at': time.monotonic(),
+            'id': f"{event_type}_{int(time.time() * 1000)}_{next(self.event_sequence)}"
         }
         
-        self.queue.put(event)
+        with self.lock:
+            victim = self._make_room(event) if event_type in self.SHEDDABLE_TYPES else None
+            if victim is not event:
+                self._journal(event['id'], 'enqueue', event)
+                self._enqueue(event)
+                
+        if victim is not None:
+            self._count_drop(victim)
+        if victim is event:
+            return None
+            
         self.logger.info(f"Evento adicionado à fila: {event_type} (ID: {event['id']})")
+        return event['id']
         
-    def _process_queue(self):
-        """Processar fila de eventos"""
-        self.logger.info("Iniciando processamento da fila de eventos")
+    def _enqueue(self, event):
+        """Colocar evento na lane do seu tipo/prioridade"""
+        with self.lock:
+            self.lanes.setdefault((event['type'], event['priority']), deque()).append(event)
+            self.pending_count += 1
+            self._track(event, 1)
+            self.wakeup.set()
+            
+    def _track(self, event, delta):
+        """Atualizar contagem de descartáveis por remetente (chamado sob self.lock)"""
+        if event['type'] not in self.SHEDDABLE_TYPES:
+            return
+        self.shed_count += delta
+        sender = self._sender(event)
+        count = self.sender_counts.get(sender, 0) + delta
+        if count > 0:
+            self.sender_counts[sender] = count
+        else:
+            self.sender_counts.pop(sender, None)
+            
+    @staticmethod
+    def _sender(event):
+        """Quem enviou o evento (nome no chat)"""
+        data = event['data']
+        return data.get('name') if isinstance(data, dict) else None
+        
+    def _make_room(self, event):
+        """Aplicar a política de descarte com a fila cheia (chamado sob self.lock)
+        
+        Retorna o evento descartado: o próprio `event` (recusado), um evento
+        já enfileirado (removido para abrir espaço) ou None se havia espaço.
+        """
+        if self.capacity <= 0 or self.shed_count < self.capacity:
+            return None
+            
+        if self.shedding_policy == 'drop_newest':
+            return event
+            
+        if self.shedding_policy == 'sample':
+            # Com a fila cheia, só 1 a cada N novos entra (no lugar do mais antigo)
+            self.overflow_seen += 1
+            if self.overflow_seen % self.sample_n:
+                return event
+                
+        if self.shedding_policy == 'fair':
+            # Cada remetente fica com uma fatia justa: quem mais ocupa a fila
+            # perde a sua mensagem mais recente
+            heaviest = max(self.sender_counts, key=self.sender_counts.get)
+            if self.sender_counts.get(self._sender(event), 0) + 1 > self.sender_counts[heaviest]:
+                return event
+            return self._remove_queued(lambda queued: self._sender(queued) == heaviest, newest=True)
+            
+        return self._remove_queued(lambda queued: True, newest=False)
+        
+    def _remove_queued(self, predicate, newest):
+        """Tirar da fila o descartável mais antigo/recente que satisfaz `predicate`"""
+        found_lane = None
+        found = None
+        
+        for lane, events in self.lanes.items():
+            if lane[0] not in self.SHEDDABLE_TYPES:
+                continue
+            candidates = reversed(events) if newest else iter(events)
+            for queued in candidates:
+                if predicate(queued):
+                    if found is None or (queued['enqueued_at'] > found['enqueued_at']) == newest:
+                        found_lane, found = lane, queued
+                    break
+                    
+        if found is None:
+            return None
+            
+        events = self.lanes[found_lane]
+        del events[next(index for index, queued in enumerate(events) if queued is found)]
+        self.pending_count -= 1
+        self._track(found, -1)
+        return found
         
-        while True:
+    def _count_drop(self, event):
+        """Contabilizar e anotar evento descartado"""
+        with self.lock:
+            self.dropped_by_type[event['type']] = self.dropped_by_type.get(event['type'], 0) + 1
+        self._journal(event['id'], 'dropped')
+        if event['type'] == 'message' and self.message_displayed_callback and event['data'].get('id') is not None:
+            self.message_displayed_callback(event['data']['id'])
+        self.logger.debug(f"Evento descartado pela política {self.shedding_policy}: {event['id']}")
+            
+    def attach_journal(self, journal):
+        """Ligar journal durável e devolver à fila os eventos não finalizados"""
+        self.journal = journal
+        
+        recovered = journal.unfinished()
+        for stored in recovered:
             try:
-                # Aguardar próximo evento
-                event = self.queue.get(timeout=1)
+                timestamp = datetime.fromisoformat(stored['created_at'])
+            except (TypeError, ValueError):
+                timestamp = datetime.now()
+            self._enqueue({
+                'type': stored['type'],
+                'data': stored['data'],
+                'priority': stored['priority'],
+                'timestamp': timestamp,
+                'enqueued_at': time.monotonic(),
+                'id': stored['id']
+            })
+            
+        if recovered:
+            self.logger.info(f"{len(recovered)} eventos recuperados do journal")
+            
+    def _journal(self, event_id, state, event=None):
+        """Anotar transição no journal, se houver"""
+        if self.journal:
+            self.journal.record(event_id, state, event)
+        
+    def set_priority(self, event_type, priority):
+        """Alterar em tempo de execução a prioridade de um tipo de evento"""
+        with self.lock:
+            self.lane_priorities[event_type] = priority
+            self.wakeup.set()
+        self.logger.info(f"Prioridade de '{event_type}' alterada para {priority}")
+        
+    def get_priorities(self):
+        """Prioridades atuais por tipo de evento"""
+        with self.lock:
+            return dict(self.lane_priorities)
+        
+    def _lane_priority(self, lane):
+        """Prioridade efetiva da lane: explícita no evento ou a do tipo"""
+        event_type, priority = lane
+        if priority is not None:
+            return priority
+        return self.lane_priorities.get(event_type, self.default_priority)
+        
+    def _pop_next_event(self, now, event_type=None):
+        """Retirar o próximo evento (chamado sob self.lock)
+        
+        Envelhecimento linear: a chave `prioridade * aging_interval + chegada`
+        equivale a descontar 1 nível a cada `aging_interval` segundos de espera,
+        e não muda com o tempo. Dentro de uma lane a ordem é FIFO, então basta
+        comparar a cabeça de cada lane. Lanes cujo canal está exibindo algo
+        ficam de fora até ele liberar.
+        """
+        best_lane = None
+        best_key = None
+        
+        for lane, events in self.lanes.items():
+            if not events or (event_type and lane[0] != event_type):
+                continue
+            channel = self.CHANNELS.get(lane[0])
+            if channel and self.busy_until[channel] > now:
+                continue
+            key = self._lane_priority(lane) * self.aging_interval + events[0]['enqueued_at']
+            if best_key is None or key < best_key:
+                best_lane, best_key = lane, key
                 
-                with self.lock:
-                    self.processing = True
+        if best_lane is None:
+            return None
+            
+        self.pending_count -= 1
+        events = self.lanes[best_lane]
+        if self.shedding_policy == 'fair' and best_lane[0] in self.SHEDDABLE_TYPES:
+            event = self._pop_round_robin(events)
+        else:
+            event = events.popleft()
+        self._track(event, -1)
+        return event
+        
+    def _pop_round_robin(self, events):
+        """Rodízio entre remetentes: na frente da lane, quem foi atendido há mais tempo"""
+        best_index = 0
+        best_served = None
+        
+        for index, event in enumerate(itertools.islice(events, self.fair_scan)):
+            served = self.last_served.get(self._sender(event), -1)
+            if best_served is None or served < best_served:
+                best_index, best_served = index, served
+                if served < 0:
+                    break
+                    
+        event = events[best_index]
+        del events[best_index]
+        
+        self.last_served[self._sender(event)] = next(self.served_sequence)
+        if len(self.last_served) > self.capacity * 2:
+            # Esquecer remetentes sem mensagens na fila
+            self.last_served = {
+                sender: served for sender, served in self.last_served.items()
+                if sender in self.sender_counts
+            }
+        return event
+        
+    def schedule(self, delay, callback, *args):
+        """Agendar callback(*args) para daqui a `delay` segundos, sem bloquear o worker"""
+        with self.lock:
+            heapq.heappush(self.timers, (time.monotonic() + delay, next(self.timer_sequence), callback, args))
+            self.wakeup.set()
+            
+    def _process_queue(self, generation):
+        """Processar fila de eventos e prazos da linha do tempo"""
+        self.logger.info("Iniciando processamento da fila de eventos")
+        
+        while self.running and generation == self.worker_generation:
+            try:
+                due, event = self._next_work(generation)
+                    
+                # Prazos vencidos primeiro (fim de exibição libera o overlay)
+                for _, _, callback, args in due:
+                    self._run_timer(callback, args)
                     
-                # Processar evento
-                self._process_event(event)
+                if event:
+                    self._process_event(event)
+                    
+            except Exception as e:
+                self.logger.error(f"Erro ao processar evento: {e}")
                 
-                # Aguardar antes do próximo evento
-                time.sleep(self.event_delay)
+    def _next_work(self, generation):
+        """Aguardar até haver prazo vencido ou evento elegível"""
+        while self.running and generation == self.worker_generation:
+            # Limpar antes de olhar o estado: um set() depois disso não se perde
+            self.wakeup.clear()
+            
+            with self.lock:
+                now = time.monotonic()
                 
-                with self.lock:
-                    self.processing = False
+                due = []
+                while self.timers and self.timers[0][0] <= now:
+                    due.append(heapq.heappop(self.timers))
                     
-                # Marcar evento como processado
-                self.queue.task_done()
+                event = self._pop_next_event(now) if self.pending_count else None
                 
-            except queue.Empty:
-                # Timeout normal, continuar
-                continue
-            except Exception as e:
-                self.logger.error(f"Erro ao processar evento: {e}")
-                with self.lock:
-                    self.processing = False
+                if due or event:
+                    return due, event
                     
+                # Dormir só até o próximo prazo relevante (timer ou canal com fila liberando)
+                wake_at = now + 1.0
+                if self.timers:
+                    wake_at = min(wake_at, self.timers[0][0])
+                for (event_type, _), events in self.lanes.items():
+                    channel = self.CHANNELS.get(event_type)
+                    if events and channel:
+                        wake_at = min(wake_at, self.busy_until[channel])
+                        
+            self.wakeup.wait(max(0.0, wake_at - now))
+            
+        return [], None
+        
+    def _run_timer(self, callback, args):
+        """Executar callback agendado"""
+        try:
+            callback(*args)
+        except Exception as e:
+            self.logger.error(f"Erro em evento agendado: {e}")
+            
     def _process_event(self, event):
         """Processar evento individual"""
         event_type = event['type']
@@ -90,75 +424,237 @@ class EventQueue:
         event_id = event['id']
         
         self.logger.info(f"Processando evento: {event_type} (ID: {event_id})")
+        self._dispatched(event)
         
         try:
             if event_type == 'message':
-                self._process_message_event(data, event_id)
-            elif event_type == 'poll':
+                with self.lock:
+                    batch_size, display_time = self._plan_message_display(self._channel_backlog('overlay_messages') + 1, time.monotonic())
+                    events = [event]
+                    while len(events) < batch_size:
+                        extra = self._pop_next_event(time.monotonic(), 'message')
+                        if extra is None:
+                            break
+                        self._dispatched(extra)
+                        events.append(extra)
+                self._occupy('overlay_messages', display_time)
+                self._process_message_batch(events, display_time)
+            elif event_type in ('poll', 'poll_created'):
+                self._occupy('overlay_polls', self.poll_display_time)
                 self._process_poll_event(data, event_id)
+                self.schedule(self.poll_display_time, self._end_poll_event, event)
             elif event_type == 'screenshot':
                 self._process_screenshot_event(data, event_id)
+                self._completed(event)
             elif event_type == 'live_update':
                 self._process_live_update_event(data, event_id)
+                self._completed(event)
             else:
                 self.logger.warning(f"Tipo de evento desconhecido: {event_type}")
+                self._journal(event_id, 'dropped')
                 
         except Exception as e:
             self.logger.error(f"Erro ao processar evento {event_type}: {e}")
             
-    def _process_message_event(self, data, event_id):
-        """Processar evento de mensagem"""
+    def _metrics(self, event_type):
+        """Histogramas do tipo de evento (criados na primeira vez)"""
+        metrics = self.latency.get(event_type)
+        if metrics is None:
+            metrics = self.latency.setdefault(event_type, {
+                'queue_wait': LatencyHistogram(),
+                'display': LatencyHistogram(),
+                'total': LatencyHistogram()
+            })
+            self.throughput_by_type.setdefault(event_type, ThroughputCounter())
+        return metrics
+        
+    def _dispatched(self, event):
+        """Anotar despacho: latência fila -> despacho"""
+        event['dispatched_at'] = time.monotonic()
+        self._metrics(event['type'])['queue_wait'].record(event['dispatched_at'] - event['enqueued_at'])
+        self._journal(event['id'], 'dispatch')
+        
+    def _completed(self, event):
+        """Anotar fim: latências despacho -> fim e total, vazão"""
+        now = time.monotonic()
+        metrics = self._metrics(event['type'])
+        metrics['display'].record(now - event.get('dispatched_at', now))
+        metrics['total'].record(now - event['enqueued_at'])
+        self.throughput.record()
+        self.throughput_by_type[event['type']].record()
+        self._journal(event['id'], 'complete')
+            
+    def _occupy(self, channel, display_time):
+        """Reservar o canal pela exibição mais o intervalo entre eventos"""
+        with self.lock:
+            self.busy_until[channel] = time.monotonic() + display_time + self.event_delay
+            
+    def _channel_backlog(self, channel):
+        """Eventos na fila de um canal (chamado sob self.lock)"""
+        return sum(
+            len(events) for (event_type, _), events in self.lanes.items()
+            if self.CHANNELS.get(event_type) == channel
+        )
+        
+    def _plan_message_display(self, backlog, now):
+        """(mensagens por card, tempo de exibição) para escoar `backlog` dentro do SLO
+        
+        O prazo é o da mensagem mais recente da fila (entrada + SLO), então o
+        plano não afrouxa enquanto a fila escoa. Primeiro encurta a exibição
+        até `min_message_display_time`; se ainda não couber, agrupa 2, 3...
+        até `max_messages_per_card` mensagens por card.
+        """
+        if not self.adaptive_messages:
+            return 1, self.message_display_time
+            
+        newest = max(
+            (events[-1]['enqueued_at'] for (event_type, _), events in self.lanes.items()
+             if event_type == 'message' and events),
+            default=now
+        )
+        budget = self.max_time_to_screen - (now - newest)
+        
+        for batch_size in range(1, self.max_messages_per_card + 1):
+            cards = max(1, math.ceil(backlog / batch_size))
+            display_time = budget / cards - self.event_delay
+            if display_time >= self.min_message_display_time:
+                return batch_size, min(display_time, self.message_display_time)
+                
+        return self.max_messages_per_card, self.min_message_display_time
+        
+    def _channel_eta(self, channel, backlog, now):
+        """Segundos para escoar a fila do canal no ritmo atual"""
+        if not backlog:
+            return 0.0
+        if channel == 'overlay_messages':
+            batch_size, display_time = self._plan_message_display(backlog, now)
+            return math.ceil(backlog / batch_size) * (display_time + self.event_delay)
+        return backlog * (self.poll_display_time + self.event_delay)
+            
+    def _process_message_batch(self, events, display_time):
+        """Exibir um card com uma ou mais mensagens"""
+        now = time.monotonic()
+        for event in events:
+            self.time_to_screen_samples.append(now - event['enqueued_at'])
+            
         if not self.socketio:
+            # Sem Socket.IO não há overlay: concluir o card e liberar o canal na hora
+            with self.lock:
+                self.busy_until['overlay_messages'] = time.monotonic()
+            for event in events:
+                self._completed(event)
             return
             
-        # Emitir evento para overlay de mensagens
-        self.socketio.emit('overlay_message', {
+        event_id = events[0]['id']
+        messages = [{
+            'message_id': event['data'].get('id'),
+            'name': event['data'].get('name', 'Anônimo'),
+            'content': event['data'].get('content', ''),
+            'timestamp': event['data'].get('created_at', datetime.now().isoformat()),
+            'merged_count': event['data'].get('merged_count', 1)
+        } for event in events]
+        
+        # Emitir evento para overlay de mensagens (campos da 1ª mensagem no topo)
+        payload = {
             'id': event_id,
-            'name': data.get('name', 'Anônimo'),
-            'content': data.get('content', ''),
-            'timestamp': data.get('created_at', datetime.now().isoformat()),
-            'display_time': self.message_display_time
-        }, room='overlay_messages')
+            **messages[0],
+            'messages': messages,
+            'display_time': display_time
+        }
+        self._show('overlay_messages', 'overlay_message', payload, [event['data'] for event in events])
+        self.socketio.emit('overlay_message', payload, room='overlay_messages')
         
         # Emitir para página principal
-        self.socketio.emit('new_message', data)
-        
-        self.logger.info(f"Mensagem processada: {data.get('name')} - {data.get('content')[:50]}...")
+        for event in events:
+            self.socketio.emit('new_message', event['data'])
+            
+        first = events[0]['data']
+        self.logger.info(
+            f"Mensagem processada: {first.get('name')} - {first.get('content', '')[:50]}..."
+            + (f" (+{len(events) - 1} no mesmo card)" if len(events) > 1 else '')
+        )
         
-        # Aguardar tempo de exibição
-        time.sleep(self.message_display_time)
+        # Fim da exibição agendado na linha do tempo
+        self.schedule(display_time, self._end_message_event, events, event_id)
         
-        # Sinalizar fim da exibição
+    def _end_message_event(self, events, event_id):
+        """Sinalizar fim da exibição do card de mensagens"""
+        self._unshow('overlay_messages', event_id)
         self.socketio.emit('overlay_message_end', {
             'id': event_id
         }, room='overlay_messages')
         
+        for event in events:
+            self._completed(event)
+            if self.message_displayed_callback and event['data'].get('id') is not None:
+                self.message_displayed_callback(event['data']['id'])
+        
     def _process_poll_event(self, data, event_id):
         """Processar evento de enquete"""
         if not self.socketio:
             return
             
         # Emitir evento para overlay de enquetes
-        self.socketio.emit('overlay_poll', {
+        payload = {
             'id': event_id,
             'question': data.get('question', ''),
             'options': data.get('options', []),
             'votes': data.get('votes', []),
             'display_time': self.poll_display_time
-        }, room='overlay_polls')
+        }
+        self._show('overlay_polls', 'overlay_poll', payload, data)
+        self.socketio.emit('overlay_poll', payload, room='overlay_polls')
         
         # Emitir para página principal
         self.socketio.emit('new_poll', data)
         
         self.logger.info(f"Enquete processada: {data.get('question', '')[:50]}...")
         
-        # Aguardar tempo de exibição
-        time.sleep(self.poll_display_time)
+    def _end_poll_event(self, event):
+        """Sinalizar fim da exibição da enquete (agendado na linha do tempo)"""
+        self._unshow('overlay_polls', event['id'])
+        if self.socketio:
+            self.socketio.emit('overlay_poll_end', {
+                'id': event['id']
+            }, room='overlay_polls')
         
-        # Sinalizar fim da exibição
-        self.socketio.emit('overlay_poll_end', {
-            'id': event_id
-        }, room='overlay_polls')
+        self._completed(event)
+        
+    def _show(self, channel, event_name, payload, data):
+        """Guardar o que o canal está exibindo, para redesenhar overlays que reconectam"""
+        with self.lock:
+            self.now_showing[channel] = {
+                'event_name': event_name,
+                'event': payload,
+                'data': data,
+                'started_at': datetime.now().isoformat(),
+                'started_monotonic': time.monotonic(),
+                'display_time': payload['display_time']
+            }
+            
+    def _unshow(self, channel, event_id):
+        """Limpar o canal se ainda estiver exibindo o evento"""
+        with self.lock:
+            showing = self.now_showing.get(channel)
+            if showing and showing['event']['id'] == event_id:
+                self.now_showing[channel] = None
+                
+    def get_now_showing(self, room):
+        """Snapshot do que a sala do overlay exibe agora, com o tempo restante (ou None)"""
+        with self.lock:
+            showing = self.now_showing.get(room)
+            if not showing:
+                return None
+            elapsed = time.monotonic() - showing['started_monotonic']
+            
+        return {
+            'event_name': showing['event_name'],
+            'event': showing['event'],
+            'data': showing['data'],
+            'started_at': showing['started_at'],
+            'display_time': showing['display_time'],
+            'remaining': round(max(0.0, showing['display_time'] - elapsed), 2)
+        }
         
     def _process_screenshot_event(self, data, event_id):
         """Processar evento de screenshot"""
@@ -188,29 +684,106 @@ class EventQueue:
         
     def get_status(self):
         """Obter status da fila"""
+        with self.lock:
+            lanes = {}
+            for (event_type, priority), events in self.lanes.items():
+                if events:
+                    name = event_type if priority is None else f"{event_type}:{priority}"
+                    lanes[name] = {
+                        'size': len(events),
+                        'priority': self._lane_priority((event_type, priority))
+                    }
+            queue_size = self.pending_count
+            
+            now = time.monotonic()
+            channels = {}
+            for channel, busy_until in self.busy_until.items():
+                remaining = max(0.0, busy_until - now)
+                backlog = self._channel_backlog(channel)
+                channels[channel] = {
+                    'busy': remaining > 0,
+                    'backlog': backlog,
+                    'eta_seconds': round(remaining + self._channel_eta(channel, backlog, now), 1)
+                }
+                
+            batch_size, display_time = self._plan_message_display(channels['overlay_messages']['backlog'] or 1, now)
+            samples = list(self.time_to_screen_samples)
+                
+            processing = any(status['busy'] for status in channels.values())
+            shed_count = self.shed_count
+            dropped_by_type = dict(self.dropped_by_type)
+            scheduled = len(self.timers)
+            
         return {
-            'queue_size': self.queue.qsize(),
-            'processing': self.processing,
-            'worker_alive': self.worker_thread.is_alive() if self.worker_thread else False
+            'queue_size': queue_size,
+            'processing': processing,
+            'scheduled_timers': scheduled,
+            'worker_alive': self.is_alive(),
+            'backend': self.backend.name,
+            'channels': channels,
+            'time_to_screen': {
+                'slo_seconds': self.max_time_to_screen,
+                'adaptive': self.adaptive_messages,
+                'messages_per_card': batch_size,
+                'display_time': round(display_time, 1),
+                'last': round(samples[-1], 2) if samples else None,
+                'avg': round(sum(samples) / len(samples), 2) if samples else None,
+                'max': round(max(samples), 2) if samples else None
+            },
+            'lanes': lanes,
+            'shedding': {
+                'policy': self.shedding_policy,
+                'capacity': self.capacity,
+                'queued': shed_count,
+                'dropped': sum(dropped_by_type.values()),
+                'dropped_by_type': dropped_by_type
+            },
+            'journal': self.journal.get_status() if self.journal else None,
+            'throughput': dict(
+                self.throughput.snapshot(),
+                by_type={event_type: counter.snapshot() for event_type, counter in list(self.throughput_by_type.items())}
+            ),
+            'latency_ms': {
+                event_type: {name: histogram.snapshot() for name, histogram in metrics.items()}
+                for event_type, metrics in list(self.latency.items())
+            },
+            'priorities': self.get_priorities()
         }
         
     def clear_queue(self):
         """Limpar fila de eventos"""
-        with self.queue.mutex:
-            self.queue.queue.clear()
+        with self.lock:
+            for events in self.lanes.values():
+                for event in events:
+                    self._journal(event['id'], 'cleared')
+            self.lanes.clear()
+            self.pending_count = 0
+            self.shed_count = 0
+            self.sender_counts.clear()
         self.logger.info("Fila de eventos limpa")
         
     def stop(self):
         """Parar processamento da fila"""
-        # Adicionar evento especial para parar
-        self.queue.put({'type': 'stop', 'data': {}, 'priority': 0, 'timestamp': datetime.now()})
+        with self.lock:
+            self.running = False
+        self.wakeup.set()
+            
+        if self.journal:
+            self.journal.stop()
 
 # Instância global da fila
 event_queue = EventQueue()
 
-def init_event_queue(socketio):
-    """Inicializar fila de eventos com socketio"""
+def init_event_queue(socketio, journal_path=None):
+    """Inicializar fila de eventos com socketio e recuperar o journal"""
     global event_queue
     event_queue.socketio = socketio
+    event_queue.set_backend(select_backend(socketio))
+    
+    if event_queue.journal is None:
+        journal = EventJournal(journal_path)
+        journal.start()
+        event_queue.attach_journal(journal)
+        
     return event_queue
 
@@ -11,6 +11,9 @@ import json
 import random
 from datetime import datetime, timedelta
 
+from .poll_engine import get_poll_engine
+from .poll_scheduler import get_poll_scheduler
+
 logger = logging.getLogger(__name__)
 
 class IntelligentPollService:
@@ -58,7 +61,13 @@ class IntelligentPollService:
         logger.info("📊 IntelligentPollService inicializado")
     
     def start(self):
-        """Iniciar serviço de enquetes"""
+        """Iniciar serviço de enquetes (sem loop próprio quando a agenda de enquetes existe)"""
+        if get_poll_scheduler():
+            # A agenda chama generate_next_poll no hub dela; uma thread do sistema
+            # não pode mexer nas travas e sinais de green thread da agenda
+            logger.info("📊 Enquetes inteligentes geradas pela agenda de enquetes")
+            return
+        
         if not self.is_running:
             self.is_running = True
             self.thread = threading.Thread(target=self._poll_generation_loop, daemon=True)
@@ -103,6 +112,17 @@ class IntelligentPollService:
                 logger.error(f"❌ Erro no loop de enquetes: {e}")
                 time.sleep(60)  # Aguardar 1 minuto em caso de erro
     
+    def generate_next_poll(self):
+        """Próxima enquete para a agenda a partir das transcrições recentes (ou None)"""
+        if not self.whisper_service:
+            return None
+        
+        transcriptions = self.whisper_service.get_recent_transcriptions(minutes=8)
+        if len(transcriptions) < 3:  # Mínimo 3 transcrições
+            return None
+        
+        return self._generate_poll(transcriptions)
+    
     def _generate_poll(self, transcriptions):
         """Gerar enquete baseada nas transcrições"""
         try:
@@ -223,25 +243,12 @@ class IntelligentPollService:
         """Criar enquete no banco de dados"""
         try:
             with self.app.app_context():
-                from main import Poll
-                
-                # Desativar enquetes antigas
-                old_polls = Poll.query.filter_by(active=True).all()
-                for old_poll in old_polls:
-                    old_poll.active = False
-                
-                # Criar nova enquete
-                poll = Poll(
-                    question=poll_data['question'],
-                    option_a=poll_data['option_a'],
-                    option_b=poll_data['option_b'],
-                    active=True,
-                    created_at=datetime.now()
+                # Encerrar enquete no ar (votos gravados) e abrir a nova no motor de enquetes
+                poll = get_poll_engine().open_poll(
+                    poll_data['question'],
+                    [poll_data['option_a'], poll_data['option_b']]
                 )
                 
-                self.db.session.add(poll)
-                self.db.session.commit()
-                
                 logger.info(f"📊 Enquete criada no banco: {poll.question}")
                 
                 # Emitir via WebSocket
@@ -0,0 +1,138 @@
+"""
+Histogramas de latência e contadores de vazão em memória fixa
+Usados pela fila de eventos para medir o pipeline do overlay no pico da live
+"""
+
+import time
+import threading
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS  # 16 faixas por potência de 2: erro relativo <= ~6%
+MAX_MS = 3600 * 1000  # Acima de 1h tudo cai no último bucket
+BUCKET_COUNT = SUB_BUCKETS + (MAX_MS.bit_length() - SUB_BUCKET_BITS) * SUB_BUCKETS
+
+def _bucket_index(ms):
+    """Bucket log-linear (estilo HDR) de um valor em milissegundos"""
+    if ms < SUB_BUCKETS:
+        return ms
+    shift = ms.bit_length() - SUB_BUCKET_BITS - 1
+    index = SUB_BUCKETS + shift * SUB_BUCKETS + (ms >> shift) - SUB_BUCKETS
+    return min(index, BUCKET_COUNT - 1)
+
+def _bucket_value(index):
+    """Maior valor (ms) que cai no bucket"""
+    if index < SUB_BUCKETS:
+        return index
+    shift, sub = divmod(index - SUB_BUCKETS, SUB_BUCKETS)
+    return ((sub + SUB_BUCKETS + 1) << shift) - 1
+
+class LatencyHistogram:
+    """Histograma log-linear com janela deslizante em fatias de 1 minuto.
+
+    A memória é fixa: `window_minutes` fatias de BUCKET_COUNT contadores,
+    reaproveitadas em anel, mais um acumulado desde o início.
+    """
+
+    def __init__(self, window_minutes=10):
+        self.window_minutes = window_minutes
+        self.slots = [[0] * BUCKET_COUNT for _ in range(window_minutes)]
+        self.slot_minute = [None] * window_minutes
+        self.total = [0] * BUCKET_COUNT
+        self.max_ms = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        """Registrar uma latência em segundos"""
+        ms = max(0, int(seconds * 1000))
+        index = _bucket_index(ms)
+        minute = int(time.monotonic() // 60)
+        slot = minute % self.window_minutes
+
+        with self.lock:
+            if self.slot_minute[slot] != minute:
+                self.slots[slot] = [0] * BUCKET_COUNT
+                self.slot_minute[slot] = minute
+            self.slots[slot][index] += 1
+            self.total[index] += 1
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def snapshot(self):
+        """Percentis (ms) da janela recente e desde o início"""
+        minute = int(time.monotonic() // 60)
+
+        with self.lock:
+            window = [0] * BUCKET_COUNT
+            for slot, slot_minute in enumerate(self.slot_minute):
+                if slot_minute is not None and minute - slot_minute < self.window_minutes:
+                    for index, count in enumerate(self.slots[slot]):
+                        if count:
+                            window[index] += count
+            total = list(self.total)
+            max_ms = self.max_ms
+
+        return {
+            f'last_{self.window_minutes}min': self._summary(window),
+            'all_time': dict(self._summary(total), max=max_ms)
+        }
+
+    @staticmethod
+    def _summary(counts):
+        """count, p50, p90, p99 e máximo aproximado de um vetor de buckets"""
+        count = sum(counts)
+        summary = {'count': count, 'p50': None, 'p90': None, 'p99': None, 'max': None}
+        if not count:
+            return summary
+
+        targets = [('p50', 0.50), ('p90', 0.90), ('p99', 0.99)]
+        seen = 0
+        for index, bucket in enumerate(counts):
+            if not bucket:
+                continue
+            seen += bucket
+            while targets and seen >= targets[0][1] * count:
+                summary[targets.pop(0)[0]] = _bucket_value(index)
+            summary['max'] = _bucket_value(index)
+        return summary
+
+class ThroughputCounter:
+    """Eventos por segundo num anel de fatias de 1 segundo"""
+
+    def __init__(self, window_seconds=60):
+        self.window_seconds = window_seconds
+        self.slots = [0] * window_seconds
+        self.slot_second = [None] * window_seconds
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def record(self, count=1):
+        """Somar eventos ao segundo atual"""
+        second = int(time.monotonic())
+        slot = second % self.window_seconds
+
+        with self.lock:
+            if self.slot_second[slot] != second:
+                self.slots[slot] = 0
+                self.slot_second[slot] = second
+            self.slots[slot] += count
+            self.total += count
+
+    def rate(self, seconds):
+        """Média de eventos/s nos últimos `seconds` segundos completos"""
+        seconds = min(seconds, self.window_seconds - 1)
+        now = int(time.monotonic())
+
+        with self.lock:
+            count = sum(
+                self.slots[slot] for slot, second in enumerate(self.slot_second)
+                if second is not None and 0 < now - second <= seconds
+            )
+        return round(count / seconds, 2)
+
+    def snapshot(self):
+        """Vazão recente e total"""
+        return {
+            'per_sec_10s': self.rate(10),
+            'per_sec_60s': self.rate(60),
+            'total': self.total
+        }
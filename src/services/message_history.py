@@ -0,0 +1,102 @@
+"""
+Histórico de mensagens com paginação por cursor (keyset)
+Cada página custa o mesmo, independente da profundidade
+"""
+
+import base64
+import logging
+from datetime import datetime
+
+class InvalidCursorError(ValueError):
+    """Cursor de paginação malformado"""
+
+class MessageHistoryService:
+    """Pagina mensagens da mais nova para a mais antiga por (created_at, id).
+
+    O cursor aponta para a última linha entregue; a próxima página é um
+    seek no índice composto `ix_messages_created_at_id`, sem OFFSET.
+    """
+
+    def __init__(self, app, db, model):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.max_limit = 200
+        self.logger = logging.getLogger(__name__)
+
+    def ensure_indexes(self):
+        """Criar índices declarados no modelo que ainda não existem no banco"""
+        with self.app.app_context():
+            for index in self.model.__table__.indexes:
+                index.create(bind=self.db.engine, checkfirst=True)
+        self.logger.info("Índices da tabela de mensagens verificados")
+
+    def get_page(self, cursor=None, limit=50):
+        """Obter uma página do histórico a partir do cursor"""
+        limit = max(1, min(limit, self.max_limit))
+        table = self.model.__table__
+
+        query = (
+            self.db.select(table)
+            .order_by(table.c.created_at.desc(), table.c.id.desc())
+            .limit(limit + 1)
+        )
+
+        if cursor:
+            created_at, message_id = self.decode_cursor(cursor)
+            query = query.where(
+                self.db.tuple_(table.c.created_at, table.c.id) < self.db.tuple_(created_at, message_id)
+            )
+
+        rows = self.db.session.execute(query).mappings().all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        messages_data = [{
+            'id': row['id'],
+            'name': row['name'],
+            'content': row['content'],
+            'created_at': row['created_at'].isoformat() if row['created_at'] else None,
+            'displayed': row['displayed']
+        } for row in rows]
+
+        next_cursor = None
+        if has_more and rows:
+            next_cursor = self.encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+
+        return {
+            'messages': messages_data,
+            'count': len(messages_data),
+            'next_cursor': next_cursor,
+            'has_more': has_more
+        }
+
+    @staticmethod
+    def encode_cursor(created_at, message_id):
+        """Codificar (created_at, id) num token opaco"""
+        raw = f"{created_at.isoformat()}|{message_id}".encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Decodificar token de cursor em (created_at, id)"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            created_at, message_id = base64.urlsafe_b64decode(padded).decode('utf-8').split('|')
+            return datetime.fromisoformat(created_at), int(message_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise InvalidCursorError(str(e))
+
+# Instância global do serviço
+message_history = None
+
+def init_message_history(app, db, model):
+    """Inicializar serviço de histórico e garantir índices"""
+    global message_history
+    message_history = MessageHistoryService(app, db, model)
+    message_history.ensure_indexes()
+    return message_history
+
+def get_message_history():
+    """Obter instância do serviço de histórico"""
+    return message_history
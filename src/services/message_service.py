@@ -36,12 +36,12 @@ class MessageService:
     
     @staticmethod
     def get_next_message():
-        """Obter próxima mensagem para exibição"""
+        """Obter próxima mensagem para exibição (agendador em memória, O(log n))"""
         try:
-            from src.models.message import Message
+            from .display_scheduler import get_display_scheduler
             
-            message = Message.query.filter_by(displayed=False).order_by(Message.created_at).first()
-            return message
+            scheduler = get_display_scheduler()
+            return scheduler.get_next() if scheduler else None
             
         except Exception as e:
             print(f"❌ Erro ao buscar mensagem: {e}")
@@ -49,22 +49,15 @@ class MessageService:
     
     @staticmethod
     def mark_as_displayed(message_id):
-        """Marcar mensagem como exibida"""
+        """Marcar mensagem como exibida (gravada no banco em lote)"""
         try:
-            from src.models.message import Message
+            from .display_scheduler import get_display_scheduler
             
-            message = Message.query.get(message_id)
-            if message:
-                message.displayed = True
-                message.displayed_at = datetime.utcnow()
-                db.session.commit()
-                return True
-            
-            return False
+            scheduler = get_display_scheduler()
+            return scheduler.mark_displayed(message_id) if scheduler else False
             
         except Exception as e:
             print(f"❌ Erro ao marcar mensagem: {e}")
-            db.session.rollback()
             return False
     
     @staticmethod
@@ -81,28 +74,16 @@ class MessageService:
             return []
     
     @staticmethod
-    def cleanup_old_messages(days=7):
-        """Limpar mensagens antigas"""
-        try:
-            from src.models.message import Message
-            
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-            
-            old_messages = Message.query.filter(
-                Message.created_at < cutoff_date,
-                Message.displayed == True
-            ).all()
-            
-            for message in old_messages:
-                db.session.delete(message)
-            
-            db.session.commit()
-            
-            print(f"🧹 Limpeza: {len(old_messages)} mensagens antigas removidas")
-            return len(old_messages)
-            
-        except Exception as e:
-            print(f"❌ Erro na limpeza de mensagens: {e}")
-            db.session.rollback()
+    def cleanup_old_messages(days=None):
+        """Arquivar e apagar mensagens antigas pelo job de retenção (NDJSON por live)"""
+        from .retention_service import get_retention_service
+        
+        retention_service = get_retention_service()
+        if retention_service is None:
+            print("⚠️ Job de retenção não inicializado, mensagens mantidas")
             return 0
+        
+        total = retention_service.archive_messages(days)
+        print(f"🧹 Limpeza: {total} mensagens antigas arquivadas")
+        return total
 
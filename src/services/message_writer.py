@@ -0,0 +1,336 @@
+"""
+Pipeline de escrita em lote (write-behind) para mensagens do chat
+Aceita mensagens em memória e grava no SQLite em transações agrupadas
+"""
+
+import os
+import json
+import threading
+import time
+import logging
+from datetime import datetime
+
+class WriterBacklogFullError(RuntimeError):
+    """Pendentes no limite (MESSAGE_MAX_PENDING): banco não está acompanhando"""
+
+class MessageWriter:
+    """Aceita mensagens na hora e grava no banco em lotes (group commit).
+
+    Cada mensagem aceita recebe um ID sequencial reservado em memória e é
+    anotada num journal NDJSON antes de responder. Uma thread grava os
+    pendentes a cada `flush_interval` segundos ou assim que `batch_size`
+    linhas se acumulam. Se o processo cair antes do flush, o journal é
+    reaplicado na próxima inicialização.
+
+    Os IDs vêm de `max(id) + 1` lido na partida e são reservados só neste
+    processo: apenas um worker pode gravar mensagens no banco. Um lote que
+    falha `max_attempts` vezes seguidas é dividido ao meio até isolar as
+    linhas ruins, que vão para o arquivo de dead-letter em vez de travar a
+    fila; acima de `max_pending` linhas pendentes, `submit` recusa.
+    """
+
+    def __init__(self, app=None, db=None, model=None, journal_path=None):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.pending = []  # Linhas aceitas e ainda não gravadas
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.flush_event = threading.Event()
+        self.is_running = False
+        self.worker_thread = None
+        self.next_id = 1
+        self.journal = None
+        self.journal_lines = 0
+        self.journal_dirty = False
+        self.logger = logging.getLogger(__name__)
+
+        # Configurações
+        self.flush_interval = float(os.getenv('MESSAGE_FLUSH_INTERVAL_MS', 50)) / 1000.0
+        self.batch_size = int(os.getenv('MESSAGE_FLUSH_BATCH_SIZE', 200))
+        self.journal_path = journal_path or os.getenv('MESSAGE_JOURNAL_PATH', 'instance/message_journal.ndjson')
+        self.dead_letter_path = os.getenv('MESSAGE_DEAD_LETTER_PATH', os.path.join(
+            os.path.dirname(self.journal_path), 'message_dead_letter.ndjson'
+        ))
+        self.max_attempts = int(os.getenv('MESSAGE_FLUSH_MAX_ATTEMPTS', 3))
+        self.max_pending = int(os.getenv('MESSAGE_MAX_PENDING', 10000))
+        self.failed_attempts = 0
+
+        # Contadores
+        self.total_accepted = 0
+        self.total_flushed = 0
+        self.total_batches = 0
+        self.total_dead_letters = 0
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        """Recuperar journal pendente e iniciar thread de flush"""
+        if self.is_running:
+            return
+
+        os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+        self._recover_journal()
+        self._seed_next_id()
+        self.journal = open(self.journal_path, 'a', encoding='utf-8')
+
+        self.is_running = True
+        self.worker_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.worker_thread.start()
+        self.logger.info(f"Pipeline de mensagens iniciado (próximo ID: {self.next_id})")
+
+    def stop(self):
+        """Parar thread e gravar tudo que estiver pendente"""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        self.flush_event.set()
+        if self.worker_thread:
+            self.worker_thread.join(timeout=5)
+
+        self.flush()
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+        self.logger.info("Pipeline de mensagens parado")
+
+    def submit(self, name, content):
+        """Aceitar mensagem já validada e devolver o dict serializado
+
+        Levanta WriterBacklogFullError se houver `max_pending` linhas sem gravar.
+        """
+        row = {
+            'name': name,
+            'content': content,
+            'created_at': datetime.utcnow(),
+            'displayed': False
+        }
+
+        with self.lock:
+            if len(self.pending) >= self.max_pending:
+                raise WriterBacklogFullError(f'{len(self.pending)} mensagens aguardando gravação')
+
+            row['id'] = self.next_id
+            self.next_id += 1
+            self.pending.append(row)
+
+            # Journal escrito sob o lock para manter a ordem dos IDs
+            if self.journal:
+                self.journal.write(json.dumps(self._serialize(row), ensure_ascii=False) + '\n')
+                self.journal.flush()
+                self.journal_lines += 1
+                self.journal_dirty = True
+
+            self.total_accepted += 1
+            full = len(self.pending) >= self.batch_size
+
+        if full:
+            self.flush_event.set()
+
+        return self._serialize(row)
+
+    def flush(self):
+        """Gravar pendentes numa única transação; após falhas seguidas, isolar as linhas ruins"""
+        with self.flush_lock:
+            with self.lock:
+                if not self.pending:
+                    return 0
+                batch = list(self.pending)
+                sync_journal = self.journal_dirty
+                self.journal_dirty = False
+
+            # fsync agrupado: um por ciclo de flush, não um por mensagem
+            if sync_journal and self.journal:
+                try:
+                    os.fsync(self.journal.fileno())
+                except (OSError, ValueError) as e:
+                    self.logger.warning(f"Falha no fsync do journal: {e}")
+
+            started = time.perf_counter()
+            error = self._insert(batch)
+            if error is None:
+                written = len(batch)
+                self.failed_attempts = 0
+            else:
+                self.failed_attempts += 1
+                self.logger.error(
+                    f"Erro ao gravar lote de {len(batch)} mensagens "
+                    f"(tentativa {self.failed_attempts}/{self.max_attempts}): {error}"
+                )
+                if self.failed_attempts < self.max_attempts:
+                    return 0
+                written = self._isolate(batch)
+                self.failed_attempts = 0
+
+            with self.lock:
+                del self.pending[:len(batch)]
+                self._compact_journal()
+
+            self.total_flushed += written
+            self.total_batches += 1
+            self.last_flush_ms = (time.perf_counter() - started) * 1000.0
+            return written
+
+    def pending_ids(self):
+        """IDs aceitos e ainda não gravados"""
+        with self.lock:
+            return {row['id'] for row in self.pending}
+
+    def get_status(self):
+        """Obter status do pipeline"""
+        return {
+            'pending': len(self.pending),
+            'total_accepted': self.total_accepted,
+            'total_flushed': self.total_flushed,
+            'total_batches': self.total_batches,
+            'total_dead_letters': self.total_dead_letters,
+            'failed_attempts': self.failed_attempts,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+            'worker_alive': self.worker_thread.is_alive() if self.worker_thread else False
+        }
+
+    def _flush_loop(self):
+        """Loop de flush por tempo ou por tamanho de lote"""
+        while self.is_running:
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error(f"Erro no loop de flush de mensagens: {e}")
+                time.sleep(1)
+            if self.failed_attempts:
+                # Recuo entre tentativas: erro passageiro (banco travado) tem tempo de passar
+                time.sleep(min(5.0, 0.25 * 2 ** self.failed_attempts))
+
+    def _insert(self, rows):
+        """Gravar linhas numa transação; retorna a exceção ou None"""
+        try:
+            with self.app.app_context():
+                self.db.session.execute(self.model.__table__.insert(), rows)
+                self.db.session.commit()
+            return None
+        except Exception as e:
+            try:
+                with self.app.app_context():
+                    self.db.session.rollback()
+            except Exception:
+                pass
+            return e
+
+    def _isolate(self, rows):
+        """Gravar dividindo ao meio até isolar as linhas ruins; retorna quantas foram gravadas"""
+        middle = len(rows) // 2
+        written = 0
+        for half in (rows[:middle], rows[middle:]):
+            if not half:
+                continue
+            error = self._insert(half)
+            if error is None:
+                written += len(half)
+            elif len(half) == 1:
+                self._dead_letter(half[0], error)
+            else:
+                written += self._isolate(half)
+        return written
+
+    def _dead_letter(self, row, error):
+        """Anotar linha que o banco recusa, com o erro, fora do journal de recuperação"""
+        self.total_dead_letters += 1
+        self.logger.error(f"Mensagem {row['id']} enviada ao dead-letter: {error}")
+        try:
+            with open(self.dead_letter_path, 'a', encoding='utf-8') as dead_letter:
+                record = dict(self._serialize(row), error=str(error), failed_at=datetime.utcnow().isoformat())
+                dead_letter.write(json.dumps(record, ensure_ascii=False) + '\n')
+                dead_letter.flush()
+                os.fsync(dead_letter.fileno())
+        except OSError as e:
+            self.logger.error(f"Falha ao gravar dead-letter da mensagem {row['id']}: {e}")
+
+    def _compact_journal(self):
+        """Truncar journal quando tudo foi gravado (chamado sob self.lock)"""
+        if not self.journal:
+            return
+
+        if not self.pending:
+            self.journal.seek(0)
+            self.journal.truncate()
+            self.journal_lines = 0
+        elif self.journal_lines > self.batch_size * 10:
+            # Sob carga contínua o journal nunca esvazia: reescrever só com pendentes
+            self.journal.seek(0)
+            self.journal.truncate()
+            for row in self.pending:
+                self.journal.write(json.dumps(self._serialize(row), ensure_ascii=False) + '\n')
+            self.journal.flush()
+            self.journal_lines = len(self.pending)
+            self.journal_dirty = True
+
+    def _recover_journal(self):
+        """Reaplicar mensagens aceitas e não gravadas antes de uma queda"""
+        if not os.path.exists(self.journal_path):
+            return
+
+        rows = {}
+        with open(self.journal_path, 'r', encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    data = json.loads(line)
+                    rows[data['id']] = {
+                        'id': data['id'],
+                        'name': data['name'],
+                        'content': data['content'],
+                        'created_at': datetime.fromisoformat(data['created_at']),
+                        'displayed': bool(data.get('displayed', False))
+                    }
+                except (ValueError, KeyError, TypeError):
+                    # Última linha pode estar truncada pela queda
+                    continue
+
+        if rows:
+            with self.app.app_context():
+                table = self.model.__table__
+                existing = {
+                    row[0] for row in self.db.session.execute(
+                        self.db.select(table.c.id).where(table.c.id.in_(list(rows)))
+                    )
+                }
+                missing = [row for message_id, row in sorted(rows.items()) if message_id not in existing]
+                if missing:
+                    self.db.session.execute(table.insert(), missing)
+                    self.db.session.commit()
+                self.logger.info(f"Journal de mensagens recuperado: {len(missing)} mensagens regravadas")
+
+        open(self.journal_path, 'w').close()
+
+    def _seed_next_id(self):
+        """Continuar a sequência de IDs a partir do maior ID gravado"""
+        with self.app.app_context():
+            table = self.model.__table__
+            max_id = self.db.session.execute(self.db.select(self.db.func.max(table.c.id))).scalar()
+        self.next_id = (max_id or 0) + 1
+
+    @staticmethod
+    def _serialize(row):
+        """Mesmo formato de Message.to_dict()"""
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'content': row['content'],
+            'created_at': row['created_at'].isoformat() if row['created_at'] else None,
+            'displayed': row['displayed']
+        }
+
+# Instância global do pipeline
+message_writer = None
+
+def init_message_writer(app, db, model):
+    """Inicializar pipeline de escrita de mensagens"""
+    global message_writer
+    message_writer = MessageWriter(app, db, model)
+    message_writer.start()
+    return message_writer
+
+def get_message_writer():
+    """Obter instância do pipeline de mensagens"""
+    return message_writer
@@ -0,0 +1,246 @@
+"""
+Filtro de moderação do chat
+Blocklist + padrões de doxxing compilados numa única regex, com recarga a quente
+"""
+
+import os
+import re
+import threading
+import time
+import logging
+import unicodedata
+
+# Variações "leet" aceitas para cada letra da blocklist
+LEET_CLASSES = {
+    'a': 'a4@',
+    'b': 'b8',
+    'e': 'e3&',
+    'g': 'g96',
+    'i': 'i1!|',
+    'l': 'l1|',
+    'o': 'o0',
+    's': 's5$',
+    't': 't7+',
+    'z': 'z2'
+}
+
+# Padrões de dados pessoais (aplicados ao mesmo texto normalizado)
+DOXXING_PATTERNS = {
+    'cpf': r'(?<!\d)\d{3}\.?\d{3}\.?\d{3}[-.\s]?\d{2}(?!\d)',
+    'telefone': r'(?<!\d)(?:\+?55[\s-]?)?\(?\d{2}\)?[\s-]?9\d{4}[\s-]?\d{4}(?!\d)',
+    'email': r'[\w.+-]+@[\w-]+\.[a-z]{2,}(?:\.[a-z]{2,})?',
+    'cep': r'(?<!\d)\d{5}-\d{3}(?!\d)'
+}
+
+# Flags globais no início de uma regex crua (viram flags locais ao juntar)
+LEADING_FLAGS = re.compile(r'^\(\?([imsx]+)\)')
+# Construções que quebram ou mudam de sentido dentro da regex combinada
+UNSAFE_RAW = re.compile(r'\(\?[aiLmsux]+\)|\(\?P[<=]|\\[1-9]|\\g<')
+
+BLOCKLIST_HEADER = """# Blocklist de moderação do chat (uma expressão por linha)
+# - Acentos, maiúsculas e variações leet (4 -> a, 3 -> e, 0 -> o...) já são tratados
+# - Linhas começando com "re:" são regex cruas aplicadas ao texto normalizado
+# - O arquivo é recarregado automaticamente quando salvo, sem reiniciar o servidor
+"""
+
+def normalize_text(text):
+    """Minúsculas e sem acentos, preservando dígitos e símbolos para leet e doxxing"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+def _letter_pattern(letter):
+    """Classe de caracteres de uma letra, aceitando repetição ("merdaaa")"""
+    variants = LEET_CLASSES.get(letter)
+    if variants:
+        return '[' + re.escape(variants) + ']+'
+    return re.escape(letter) + '+'
+
+def _trie_pattern(node):
+    """Converter trie de termos numa regex com prefixos fatorados"""
+    end = node.get('', False)
+    branches = [
+        _letter_pattern(letter) + r'[\W_]?' * (letter != ' ') + _trie_pattern(child)
+        for letter, child in sorted(node.items()) if letter != ''
+    ]
+
+    if not branches:
+        return ''
+
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    return '(?:' + body + ')?' if end else body
+
+class ModerationFilter:
+    """Filtro de conteúdo com veredito em uma única passada.
+
+    Os termos da blocklist viram uma trie compilada como uma só regex
+    (prefixos comuns são testados uma vez), unida por alternação aos
+    padrões de doxxing. O arquivo é conferido a cada `reload_interval`
+    segundos e recompilado quando o mtime muda.
+    """
+
+    def __init__(self, blocklist_path=None):
+        self.blocklist_path = blocklist_path or os.getenv('MODERATION_BLOCKLIST_PATH', 'instance/moderation_blocklist.txt')
+        self.reload_interval = float(os.getenv('MODERATION_RELOAD_INTERVAL', 2))
+        self.pattern = None
+        self.term_count = 0
+        self.loaded_mtime = None
+        self.last_check = 0.0
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        # Contadores
+        self.total_checked = 0
+        self.total_blocked = 0
+
+        self._ensure_blocklist_file()
+        self.reload()
+
+    def check(self, *texts):
+        """Veredito para os textos: {'allowed', 'category', 'match'}"""
+        self._maybe_reload()
+        self.total_checked += 1
+
+        match = self.pattern.search(normalize_text('\n'.join(texts)))
+        if not match:
+            return {'allowed': True, 'category': None, 'match': None}
+
+        self.total_blocked += 1
+        return {'allowed': False, 'category': match.lastgroup, 'match': match.group(0)}
+
+    def reload(self):
+        """Recompilar blocklist a partir do arquivo"""
+        terms = []
+        raw_patterns = []
+        mtime = None
+
+        try:
+            mtime = os.path.getmtime(self.blocklist_path)
+            with open(self.blocklist_path, 'r', encoding='utf-8') as blocklist:
+                for line in blocklist:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    if line.startswith('re:'):
+                        raw_patterns.append(line[3:].strip())
+                    else:
+                        terms.append(re.sub(r'\s+', ' ', normalize_text(line)))
+        except OSError as e:
+            self.logger.warning(f"Blocklist de moderação indisponível: {e}")
+
+        try:
+            pattern = self._compile(terms, raw_patterns)
+        except re.error as e:
+            # Nunca deixar o chat sem filtro nem derrubar o envio: mantém o último padrão bom
+            self.logger.error(f"Blocklist de moderação não compilou, mantendo a versão anterior: {e}")
+            with self.lock:
+                self.loaded_mtime = mtime
+                if self.pattern is not None:
+                    return
+            pattern = self._compile(terms, [])
+
+        with self.lock:
+            self.pattern = pattern
+            self.term_count = len(terms) + len(raw_patterns)
+            self.loaded_mtime = mtime
+
+        self.logger.info(f"Blocklist de moderação carregada: {self.term_count} termos")
+
+    def get_status(self):
+        """Obter status do filtro"""
+        return {
+            'terms': self.term_count,
+            'total_checked': self.total_checked,
+            'total_blocked': self.total_blocked
+        }
+
+    def _maybe_reload(self):
+        """Recarregar se o arquivo mudou (checagem de mtime limitada por intervalo)"""
+        now = time.monotonic()
+        if now - self.last_check < self.reload_interval:
+            return
+        self.last_check = now
+
+        try:
+            mtime = os.path.getmtime(self.blocklist_path)
+        except OSError:
+            mtime = None
+
+        if mtime != self.loaded_mtime:
+            self.reload()
+
+    def _compile(self, terms, raw_patterns):
+        """Montar a regex única: blocklist (trie) | regex crua | doxxing"""
+        alternatives = []
+
+        trie = {}
+        for term in terms:
+            node = trie
+            for letter in term:
+                node = node.setdefault(letter, {})
+            node[''] = True
+
+        if trie:
+            alternatives.append(r'(?P<blocklist>(?<![a-z0-9])' + _trie_pattern(trie) + r'(?![a-z]))')
+
+        valid_raw = []
+        for raw in raw_patterns:
+            wrapped = self._wrap_raw(raw)
+            if wrapped is None:
+                continue
+            try:
+                re.compile(wrapped)
+                valid_raw.append(wrapped)
+            except re.error as e:
+                self.logger.warning(f"Regex inválida na blocklist ignorada ({raw!r}): {e}")
+        if valid_raw:
+            alternatives.append('(?P<regex>' + '|'.join(valid_raw) + ')')
+
+        for name, pattern in DOXXING_PATTERNS.items():
+            alternatives.append(f'(?P<{name}>{pattern})')
+
+        return re.compile('|'.join(alternatives))
+
+    def _wrap_raw(self, raw):
+        """Regex crua como grupo não capturante seguro para a alternação (ou None se recusada)
+
+        `(?i)` no início vira `(?i:...)`; flags globais no meio, grupos
+        nomeados e referências a grupos são recusados, porque mudam de
+        sentido ou quebram quando a regex é unida às demais.
+        """
+        flags = ''
+        leading = LEADING_FLAGS.match(raw)
+        if leading:
+            flags = leading.group(1)
+            raw = raw[leading.end():]
+
+        if UNSAFE_RAW.search(raw):
+            self.logger.warning(
+                f"Regex da blocklist ignorada ({raw!r}): flags globais no meio, grupos nomeados "
+                "ou referências a grupos não são aceitos"
+            )
+            return None
+        return f'(?{flags}:{raw})' if flags else f'(?:{raw})'
+
+    def _ensure_blocklist_file(self):
+        """Criar arquivo de blocklist vazio (só instruções) na primeira execução"""
+        if os.path.exists(self.blocklist_path):
+            return
+        try:
+            os.makedirs(os.path.dirname(self.blocklist_path) or '.', exist_ok=True)
+            with open(self.blocklist_path, 'w', encoding='utf-8') as blocklist:
+                blocklist.write(BLOCKLIST_HEADER)
+        except OSError as e:
+            self.logger.warning(f"Não foi possível criar a blocklist de moderação: {e}")
+
+# Instância global do filtro
+moderation_filter = None
+
+def init_moderation_filter(blocklist_path=None):
+    """Inicializar filtro de moderação"""
+    global moderation_filter
+    moderation_filter = ModerationFilter(blocklist_path)
+    return moderation_filter
+
+def get_moderation_filter():
+    """Obter instância do filtro de moderação"""
+    return moderation_filter
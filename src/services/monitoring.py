@@ -233,31 +233,20 @@ class DatabaseOptimizer:
             self.db.session.rollback()
             
     def cleanup_old_data(self):
-        """Limpar dados antigos"""
+        """Limpar dados antigos (arquivamento + DELETE em lotes pelo job de retenção)"""
         try:
-            from ..main import Message, Screenshot, LiveSession
+            from .retention_service import get_retention_service
             
-            # Limpar mensagens antigas (7 dias)
-            cutoff_date = datetime.now() - timedelta(days=7)
-            old_messages = Message.query.filter(Message.created_at < cutoff_date).delete()
+            retention_service = get_retention_service()
+            if not retention_service:
+                self.logger.warning("Job de retenção não inicializado, limpeza ignorada")
+                return
             
-            # Limpar screenshots antigos (7 dias)
-            old_screenshots = Screenshot.query.filter(Screenshot.created_at < cutoff_date).delete()
-            
-            # Limpar sessões antigas (24 horas)
-            session_cutoff = datetime.now() - timedelta(hours=24)
-            old_sessions = LiveSession.query.filter(
-                LiveSession.created_at < session_cutoff,
-                LiveSession.active == False
-            ).delete()
-            
-            self.db.session.commit()
-            
-            self.logger.info(f"Limpeza concluída: {old_messages} mensagens, {old_screenshots} screenshots, {old_sessions} sessões")
+            result = retention_service.run()
+            self.logger.info(f"Limpeza concluída: {result}")
             
         except Exception as e:
             self.logger.error(f"Erro na limpeza: {e}")
-            self.db.session.rollback()
 
 class ConnectionManager:
     def __init__(self):
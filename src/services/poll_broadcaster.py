@@ -0,0 +1,168 @@
+"""
+Transmissão agregada dos resultados de enquete
+Em vez de um poll_update por voto, envia a cada tick só as opções que mudaram
+"""
+
+import os
+import threading
+import logging
+
+from .async_backend import select_backend
+from .active_poll_cache import get_active_poll_cache
+
+class PollBroadcaster:
+    """Emissor de deltas de votos a uma taxa fixa (POLL_BROADCAST_HZ).
+
+    O caminho do voto só marca a enquete como suja (O(1)). A cada tick as
+    enquetes sujas são comparadas com o último estado enviado e apenas as
+    opções alteradas saem num `poll_delta` para as salas que exibem
+    enquetes. Quem entra numa dessas salas recebe o dict completo
+    (`poll_update`) com a versão atual, e descarta deltas mais antigos.
+    A enquete no ar também é publicada no cache de /api/polls/active.
+    """
+
+    def __init__(self, socketio, vote_counter, rooms=None, rate_hz=None):
+        self.socketio = socketio
+        self.vote_counter = vote_counter
+        self.backend = select_backend(socketio)
+        self.rooms = rooms or [
+            room.strip() for room in os.getenv('POLL_BROADCAST_ROOMS', 'overlay_polls,polls').split(',')
+            if room.strip()
+        ]
+        rate_hz = rate_hz or float(os.getenv('POLL_BROADCAST_HZ', 4))
+        self.interval = 1.0 / max(0.1, rate_hz)
+
+        self.dirty = set()
+        self.last_sent = {}  # poll_id -> votos do último envio
+        self.versions = {}   # poll_id -> versão do último envio
+        self.current_poll_id = None
+        self.lock = threading.Lock()
+        self.is_running = False
+        self.worker = None
+        self.logger = logging.getLogger(__name__)
+
+        # Contadores
+        self.total_ticks = 0
+        self.total_deltas = 0
+
+    def start(self):
+        """Iniciar loop de transmissão"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.worker = self.backend.start(self._loop)
+
+    def stop(self):
+        """Parar loop de transmissão"""
+        self.is_running = False
+
+    def mark_dirty(self, poll_id):
+        """Anotar que a enquete recebeu votos desde o último tick"""
+        with self.lock:
+            self.dirty.add(poll_id)
+
+    def set_poll(self, poll_id):
+        """Nova enquete no ar: esquecer estados anteriores"""
+        with self.lock:
+            self.current_poll_id = poll_id
+            self.dirty = {poll_id} if poll_id is not None else set()
+            self.last_sent = {}
+            self.versions = {}
+
+        active_poll_cache = get_active_poll_cache()
+        if active_poll_cache and poll_id is None:
+            active_poll_cache.publish(None)
+
+    def close_poll(self):
+        """Nenhuma enquete no ar"""
+        self.set_poll(None)
+
+    def snapshot(self):
+        """Dict completo da enquete atual com a versão (ou None)"""
+        with self.lock:
+            poll_id = self.current_poll_id
+            version = self.versions.get(poll_id, 0)
+        if poll_id is None:
+            return None
+
+        data = self.vote_counter.get_poll_dict(poll_id)
+        if data is None:
+            return None
+        return dict(data, version=version)
+
+    def tick(self):
+        """Enviar deltas das enquetes sujas; retorna quantos deltas saíram"""
+        with self.lock:
+            dirty = self.dirty
+            self.dirty = set()
+        self.total_ticks += 1
+
+        sent = 0
+        for poll_id in dirty:
+            data = self.vote_counter.get_poll_dict(poll_id)
+            if data is None:
+                continue
+
+            active_poll_cache = get_active_poll_cache()
+            if active_poll_cache and poll_id == self.current_poll_id:
+                active_poll_cache.publish(data)
+
+            with self.lock:
+                previous = self.last_sent.get(poll_id, {})
+                changed = {
+                    option: count for option, count in data['votes'].items()
+                    if previous.get(option) != count
+                }
+                if not changed:
+                    continue
+                version = self.versions.get(poll_id, 0) + 1
+                self.versions[poll_id] = version
+                self.last_sent[poll_id] = data['votes']
+
+            payload = {
+                'poll_id': poll_id,
+                'version': version,
+                'votes': changed,
+                'total_votes': data['total_votes']
+            }
+            for room in self.rooms:
+                self.socketio.emit('poll_delta', payload, room=room)
+            sent += 1
+
+        self.total_deltas += sent
+        return sent
+
+    def get_status(self):
+        """Obter status da transmissão"""
+        return {
+            'rate_hz': round(1.0 / self.interval, 2),
+            'rooms': self.rooms,
+            'current_poll_id': self.current_poll_id,
+            'version': self.versions.get(self.current_poll_id, 0),
+            'backend': self.backend.name,
+            'total_ticks': self.total_ticks,
+            'total_deltas': self.total_deltas
+        }
+
+    def _loop(self):
+        """Loop de ticks"""
+        while self.is_running:
+            self.backend.sleep(self.interval)
+            try:
+                self.tick()
+            except Exception as e:
+                self.logger.error(f"Erro ao transmitir resultados de enquete: {e}")
+
+# Instância global do transmissor
+poll_broadcaster = None
+
+def init_poll_broadcaster(socketio, vote_counter):
+    """Inicializar transmissor de resultados de enquete"""
+    global poll_broadcaster
+    poll_broadcaster = PollBroadcaster(socketio, vote_counter)
+    poll_broadcaster.start()
+    return poll_broadcaster
+
+def get_poll_broadcaster():
+    """Obter instância do transmissor de resultados de enquete"""
+    return poll_broadcaster
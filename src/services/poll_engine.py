@@ -0,0 +1,204 @@
+"""
+Motor de enquetes sobre opções normalizadas (tabela poll_options)
+Qualquer número de opções, votos como incremento SQL numa linha indexada e dict da enquete em cache
+"""
+
+import threading
+import logging
+
+from sqlalchemy import text
+
+from .vote_counter import get_vote_counter
+from .voter_registry import get_voter_registry
+from .poll_broadcaster import get_poll_broadcaster
+from .vote_timeseries import get_vote_timeseries
+
+MIN_OPTIONS = 2
+MAX_OPTIONS = 26
+MAX_QUESTION_LENGTH = 200
+MAX_OPTION_LENGTH = 100
+
+def option_key(index):
+    """Chave da opção pela posição: a, b, ..., z, aa, ab, ..."""
+    key = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        key = chr(ord('a') + remainder) + key
+    return key
+
+class PollEngine:
+    """Criação, leitura e contagem de enquetes sobre `PollOption`.
+
+    Cada opção é uma linha em poll_options; o voto vira
+    `UPDATE poll_options SET votes = votes + :delta` na linha de
+    (poll_id, option_key), coberta por índice único. O dict de cada enquete
+    é montado do banco uma vez e mantido em memória: os incrementos
+    gravados também são somados ao cache, sem recarregar a enquete.
+    Enquetes antigas (só com option_a..d) ganham suas linhas de opção na
+    primeira leitura.
+    """
+
+    def __init__(self, app, db, poll_model, option_model):
+        self.app = app
+        self.db = db
+        self.poll_model = poll_model
+        self.option_model = option_model
+        self.cache = {}  # poll_id -> dict da enquete (formato do to_dict)
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        self._ensure_index()
+
+    def open_poll(self, question, options):
+        """Encerrar a enquete no ar e abrir uma nova; retorna o modelo criado
+
+        Chamar dentro do contexto da aplicação. Levanta ValueError se a
+        pergunta ou as opções forem inválidas.
+        """
+        question, options = self.clean(question, options)
+        self.close_polls()
+
+        # Colunas option_a..d mantidas preenchidas para clientes antigos
+        legacy = dict(zip(('option_a', 'option_b', 'option_c', 'option_d'), options))
+        poll = self.poll_model(question=question, active=True, **legacy)
+        self.db.session.add(poll)
+        self.db.session.flush()
+        for index, option in enumerate(options):
+            self.db.session.add(self.option_model(
+                poll_id=poll.id,
+                option_key=option_key(index),
+                option_text=option,
+                votes=0
+            ))
+        self.db.session.commit()
+
+        poll_broadcaster = get_poll_broadcaster()
+        if poll_broadcaster:
+            poll_broadcaster.set_poll(poll.id)
+        vote_timeseries = get_vote_timeseries()
+        if vote_timeseries:
+            vote_timeseries.start_poll(poll.id)
+        return poll
+
+    @staticmethod
+    def clean(question, options):
+        """Pergunta e opções normalizadas; levanta ValueError se inválidas"""
+        question = (question or '').strip()
+        options = [(option or '').strip() for option in options]
+        options = [option for option in options if option]
+
+        if not question or len(question) > MAX_QUESTION_LENGTH:
+            raise ValueError(f'Pergunta inválida (máximo {MAX_QUESTION_LENGTH} caracteres)')
+        if len(options) < MIN_OPTIONS:
+            raise ValueError('Pelo menos duas opções são obrigatórias')
+        if len(options) > MAX_OPTIONS:
+            raise ValueError(f'No máximo {MAX_OPTIONS} opções')
+        if any(len(option) > MAX_OPTION_LENGTH for option in options):
+            raise ValueError(f'Opção inválida (máximo {MAX_OPTION_LENGTH} caracteres)')
+        return question, options
+
+    def close_polls(self):
+        """Desativar todas as enquetes ativas e gravar seus votos pendentes"""
+        poll_ids = [row.id for row in self.poll_model.query.filter_by(active=True).with_entities(self.poll_model.id)]
+        self.poll_model.query.filter_by(active=True).update({'active': False})
+        self.db.session.commit()
+
+        vote_counter = get_vote_counter()
+        if vote_counter:
+            vote_counter.close_polls(poll_ids)
+        voter_registry = get_voter_registry()
+        if voter_registry:
+            voter_registry.clear()
+        with self.lock:
+            self.cache.clear()
+
+    def get_poll_dict(self, poll_id):
+        """Dict em cache da enquete ativa (ou None); não alterar o retorno"""
+        data = self.cache.get(poll_id)
+        if data is not None:
+            return data
+
+        with self.app.app_context():
+            poll = self.poll_model.query.get(poll_id)
+            if poll is None or not poll.active:
+                return None
+            self._ensure_options(poll)
+            data = poll.to_dict()
+
+        with self.lock:
+            return self.cache.setdefault(poll_id, data)
+
+    def increment(self, deltas):
+        """Gravar {(poll_id, opção): delta} numa transação (levanta em caso de erro)"""
+        table = self.option_model.__table__
+        with self.app.app_context():
+            try:
+                for (poll_id, key), delta in deltas.items():
+                    self.db.session.execute(
+                        table.update()
+                        .where(table.c.poll_id == poll_id)
+                        .where(table.c.option_key == key)
+                        .values(votes=table.c.votes + delta)
+                    )
+                self.db.session.commit()
+            except Exception:
+                self.db.session.rollback()
+                raise
+
+    def apply_cached(self, deltas):
+        """Somar ao cache os deltas já gravados por `increment`"""
+        with self.lock:
+            for (poll_id, key), delta in deltas.items():
+                data = self.cache.get(poll_id)
+                if data is None:
+                    continue
+                votes = dict(data['votes'])
+                votes[key] = (votes.get(key) or 0) + delta
+                self.cache[poll_id] = dict(data, votes=votes, total_votes=sum(votes.values()))
+
+    def get_status(self):
+        """Obter status do motor"""
+        return {
+            'cached_polls': list(self.cache.keys()),
+            'max_options': MAX_OPTIONS
+        }
+
+    def _ensure_options(self, poll):
+        """Criar linhas de opção para enquete antiga que só tem option_a..d"""
+        if poll.option_rows:
+            return
+        for key in ('a', 'b', 'c', 'd'):
+            text_value = getattr(poll, f'option_{key}', None)
+            if text_value:
+                poll.option_rows.append(self.option_model(
+                    option_key=key,
+                    option_text=text_value,
+                    votes=getattr(poll, f'votes_{key}', 0) or 0
+                ))
+        self.db.session.commit()
+
+    def _ensure_index(self):
+        """Índice único (poll_id, option_key) também em bancos criados antes dele"""
+        table = self.option_model.__table__.name
+        try:
+            with self.app.app_context():
+                self.db.session.execute(text(
+                    f'CREATE UNIQUE INDEX IF NOT EXISTS ix_{table}_poll_key ON {table} (poll_id, option_key)'
+                ))
+                self.db.session.commit()
+        except Exception as e:
+            self.logger.warning(f"Não foi possível criar índice de {table}: {e}")
+
+# Instância global do motor
+poll_engine = None
+
+def init_poll_engine(app, db, poll_model, option_model):
+    """Inicializar motor de enquetes"""
+    global poll_engine
+    poll_engine = PollEngine(app, db, poll_model, option_model)
+    return poll_engine
+
+def get_poll_engine():
+    """Obter instância do motor de enquetes"""
+    return poll_engine
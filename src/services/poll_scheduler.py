@@ -0,0 +1,412 @@
+"""
+Agenda do ciclo de vida das enquetes: abrir -> revelar -> encerrar -> próxima
+Prazos gravados no banco (tabela poll_schedule) para retomar a linha do tempo após reinício
+"""
+
+import os
+import json
+import time
+import logging
+from datetime import datetime, timedelta
+
+from .async_backend import select_backend
+from .poll_broadcaster import get_poll_broadcaster
+
+# Estados de uma entrada da agenda
+QUEUED = 'queued'
+OPEN = 'open'
+REVEALED = 'revealed'
+CLOSED = 'closed'
+CANCELLED = 'cancelled'
+
+class PollScheduler:
+    """Máquina de estados das enquetes com prazos exatos.
+
+    Cada entrada da agenda tem duração de votação (`open_seconds`) e de
+    revelação (`reveal_seconds`). Ao abrir, os prazos de revelar e encerrar
+    são gravados; o worker dorme até o próximo prazo e dispara a transição
+    (`poll_reveal`, depois `poll_ended`) e abre a próxima entrada da fila.
+    Assim que uma enquete abre, a próxima já é preparada: da fila do admin
+    ou, se vazia, gerada pela fonte automática (IntelligentPollService);
+    sem enquete no ar, a fonte é consultada a cada `idle_auto_seconds`.
+    Toda chamada à fonte e à fila automática parte do próprio worker.
+    Na inicialização a entrada em andamento é retomada com os prazos do
+    banco; prazos vencidos disparam na hora.
+    """
+
+    def __init__(self, app, db, socketio, model, engine, vote_counter, event_queue=None, poll_source=None):
+        self.app = app
+        self.db = db
+        self.socketio = socketio
+        self.model = model
+        self.engine = engine
+        self.vote_counter = vote_counter
+        self.event_queue = event_queue
+        self.poll_source = poll_source  # Callable -> {'question', 'options'} ou None
+        self.backend = select_backend(socketio)
+        self.wakeup = self.backend.make_wakeup()
+        self.lock = self.backend.make_lock()  # Só decisões e fila; banco da enquete e emissões ficam fora
+        self.is_running = False
+        self.worker = None
+        self.staging = False
+        self.transitioning = False  # Uma transição (abrir/revelar/encerrar) por vez
+        self.logger = logging.getLogger(__name__)
+
+        # Configurações
+        self.default_open_seconds = int(os.getenv('POLL_OPEN_SECONDS', 180))
+        self.default_reveal_seconds = int(os.getenv('POLL_REVEAL_SECONDS', 30))
+        self.idle_auto_seconds = int(os.getenv('POLL_AUTO_IDLE_SECONDS', 8 * 60))
+        self.next_auto_at = time.monotonic() + self.idle_auto_seconds
+
+        # Entrada em andamento (id) e seus prazos
+        self.current_id = None
+        self.reveal_at = None
+        self.closes_at = None
+        self.status = None
+
+    def start(self):
+        """Retomar a linha do tempo do banco e iniciar o worker"""
+        if self.is_running:
+            return
+        self._recover()
+        self.is_running = True
+        self.worker = self.backend.start(self._loop)
+        self.logger.info("Agenda de enquetes iniciada")
+
+    def stop(self):
+        """Parar o worker (os prazos continuam no banco)"""
+        self.is_running = False
+        self.wakeup.set()
+
+    def enqueue(self, question, options, open_seconds=None, reveal_seconds=None, source='admin'):
+        """Colocar enquete na fila; abre na hora se nada estiver no ar"""
+        fields = self._entry_fields(question, options, open_seconds, reveal_seconds, source)
+        with self.lock:
+            entry = self._insert_entry(fields)
+        self.logger.info(f"Enquete na fila ({source}): {entry['question']}")
+        self.wakeup.set()
+        return entry
+
+    def stage_auto(self, poll_data):
+        """Enquete gerada automaticamente: entra só se a fila estiver vazia
+
+        A conferência e a inserção acontecem na mesma seção crítica, então
+        a preparação da agenda e o loop das enquetes inteligentes nunca
+        deixam duas automáticas na fila.
+        """
+        fields = self._entry_fields(
+            poll_data['question'],
+            poll_data.get('options') or [poll_data.get('option_a'), poll_data.get('option_b')],
+            None, None, 'auto'
+        )
+        with self.lock:
+            if self._queued_count():
+                return None
+            entry = self._insert_entry(fields)
+        self.logger.info(f"Enquete na fila (auto): {entry['question']}")
+        self.wakeup.set()
+        return entry
+
+    def open_now(self, question, options, open_seconds=None, reveal_seconds=None):
+        """Encerrar a enquete no ar e abrir esta imediatamente; retorna o dict da enquete"""
+        fields = self._entry_fields(question, options, open_seconds, reveal_seconds, 'admin')
+
+        # Esperar transição em andamento do worker e reservar a próxima
+        while True:
+            with self.lock:
+                if not self.transitioning:
+                    self.transitioning = True
+                    current_id = self.current_id
+                    break
+            self.backend.sleep(0.05)
+
+        try:
+            with self.lock:
+                entry = self._insert_entry(fields)
+            if current_id is not None:
+                self._close(current_id, announce=True)
+            return self._open(entry['id'])
+        finally:
+            with self.lock:
+                self.transitioning = False
+            self.wakeup.set()
+
+    def cancel(self, entry_id):
+        """Remover entrada ainda na fila; False se não existe ou já saiu da fila"""
+        with self.lock:
+            with self.app.app_context():
+                entry = self.model.query.get(entry_id)
+                if entry is None or entry.status != QUEUED:
+                    return False
+                entry.status = CANCELLED
+                self.db.session.commit()
+        return True
+
+    def get_status(self):
+        """Linha do tempo atual e fila"""
+        with self.app.app_context():
+            queued = (
+                self.model.query
+                .filter_by(status=QUEUED)
+                .order_by(self.model.source == 'auto', self.model.id)
+                .all()
+            )
+            current = self.model.query.get(self.current_id) if self.current_id else None
+            return {
+                'backend': self.backend.name,
+                'current': current.to_dict() if current else None,
+                'seconds_to_reveal': self._seconds_until(self.reveal_at) if self.status == OPEN else None,
+                'seconds_to_close': self._seconds_until(self.closes_at) if self.current_id else None,
+                'queue': [entry.to_dict() for entry in queued],
+                'default_open_seconds': self.default_open_seconds,
+                'default_reveal_seconds': self.default_reveal_seconds
+            }
+
+    def _loop(self):
+        """Dormir até o próximo prazo e disparar a transição"""
+        while self.is_running:
+            self.wakeup.clear()
+            try:
+                timeout = self._tick()
+            except Exception as e:
+                self.logger.error(f"Erro na agenda de enquetes: {e}")
+                timeout = 5.0
+            self.wakeup.wait(timeout)
+
+    def _tick(self):
+        """Disparar o prazo vencido; retorna segundos até o próximo (None = esperar sinal)
+
+        Sob a trava só se decide e reserva a transição; banco da enquete e
+        emissões rodam fora dela.
+        """
+        with self.lock:
+            if self.transitioning:
+                return None  # open_now em andamento acorda o worker ao terminar
+
+            if self.current_id is None:
+                action, target = 'open', self._next_queued()
+                if target is None:
+                    return self._idle_wait()
+            elif self.status == OPEN and self._seconds_until(self.reveal_at) <= 0:
+                action, target = 'reveal', self.current_id
+            elif self.status == REVEALED and self._seconds_until(self.closes_at) <= 0:
+                action, target = 'close', self.current_id
+            else:
+                deadline = self.reveal_at if self.status == OPEN else self.closes_at
+                return max(0.0, self._seconds_until(deadline))
+            self.transitioning = True
+
+        try:
+            if action == 'open':
+                self._open(target)
+            elif action == 'reveal':
+                self._reveal(target)
+            else:
+                self._close(target, announce=True)
+        finally:
+            with self.lock:
+                self.transitioning = False
+        return 0
+
+    def _open(self, entry_id):
+        """Abrir a enquete da entrada e gravar seus prazos (com a transição reservada)"""
+        with self.app.app_context():
+            entry = self.model.query.get(entry_id)
+            poll = self.engine.open_poll(entry.question, json.loads(entry.options))
+
+            now = datetime.utcnow()
+            entry.status = OPEN
+            entry.poll_id = poll.id
+            entry.opened_at = now
+            entry.reveal_at = now + timedelta(seconds=entry.open_seconds)
+            entry.closes_at = entry.reveal_at + timedelta(seconds=entry.reveal_seconds)
+            self.db.session.commit()
+
+            with self.lock:
+                self._track(entry)
+            poll_data = poll.to_dict()
+            open_seconds = entry.open_seconds
+
+        self.logger.info(f"📊 Enquete no ar: {poll_data['question']} (revela em {open_seconds}s)")
+        self.socketio.emit('new_poll', poll_data)
+        if self.event_queue:
+            self.event_queue.add_event('poll_created', poll_data)
+
+        self._stage_next()
+        return poll_data
+
+    def _reveal(self, entry_id):
+        """Revelar resultados da enquete no ar (com a transição reservada)"""
+        with self.app.app_context():
+            entry = self.model.query.get(entry_id)
+            entry.status = REVEALED
+            self.db.session.commit()
+            poll_id = entry.poll_id
+            reveal_seconds = entry.reveal_seconds
+        with self.lock:
+            self.status = REVEALED
+
+        poll_data = self.vote_counter.get_poll_dict(poll_id)
+        if poll_data:
+            payload = dict(poll_data, closes_in=reveal_seconds)
+            poll_broadcaster = get_poll_broadcaster()
+            for room in (poll_broadcaster.rooms if poll_broadcaster else [None]):
+                self.socketio.emit('poll_reveal', payload, room=room)
+        self.logger.info(f"Resultados revelados da enquete {poll_id}")
+
+    def _close(self, entry_id, announce):
+        """Encerrar a enquete no ar com os totais exatos (com a transição reservada)"""
+        with self.app.app_context():
+            entry = self.model.query.get(entry_id)
+            poll_id = entry.poll_id
+
+            # Encerrar antes de ler: votos aceitos até aqui já estão no banco
+            self.engine.close_polls()
+            poll = self.engine.poll_model.query.get(poll_id)
+            final = poll.to_dict() if poll else None
+
+            entry.status = CLOSED
+            entry.closed_at = datetime.utcnow()
+            self.db.session.commit()
+
+        poll_broadcaster = get_poll_broadcaster()
+        if poll_broadcaster:
+            poll_broadcaster.close_poll()
+        with self.lock:
+            self.current_id = self.reveal_at = self.closes_at = self.status = None
+
+        if announce and final:
+            self.socketio.emit('poll_ended', dict(final, active=False))
+        self.logger.info(f"Enquete {poll_id} encerrada")
+
+    def _stage_next(self):
+        """Preparar a próxima enquete em segundo plano se a fila estiver vazia"""
+        if self.poll_source is None:
+            return
+        with self.lock:
+            if self.staging:
+                return
+            self.staging = True
+        self.backend.start(self._stage_from_source)
+
+    def _stage_from_source(self):
+        """Gerar a próxima enquete pela fonte automática
+
+        A fonte pode chamar a API do GPT (até 30 s): roda numa thread do
+        sistema via backend, sem travar o hub das green threads.
+        """
+        try:
+            with self.lock:
+                if self._queued_count():
+                    return
+            poll_data = self.backend.call_blocking(self.poll_source)
+            if poll_data:
+                self.stage_auto(poll_data)
+        except Exception as e:
+            self.logger.error(f"Erro ao preparar próxima enquete: {e}")
+        finally:
+            with self.lock:
+                self.staging = False
+
+    def _idle_wait(self):
+        """Nada no ar nem na fila: pedir enquete automática a cada `idle_auto_seconds` (chamado sob lock)"""
+        if self.poll_source is None:
+            return None
+        now = time.monotonic()
+        if now >= self.next_auto_at:
+            self.next_auto_at = now + self.idle_auto_seconds
+            if not self.staging:
+                self.staging = True
+                self.backend.start(self._stage_from_source)
+        return self.next_auto_at - now
+
+    def _queued_count(self):
+        """Entradas na fila (chamado sob lock)"""
+        with self.app.app_context():
+            return self.model.query.filter_by(status=QUEUED).count()
+
+    def _next_queued(self):
+        """ID da próxima entrada da fila (ou None); as do admin passam na frente das automáticas"""
+        with self.app.app_context():
+            entry = (
+                self.model.query
+                .filter_by(status=QUEUED)
+                .order_by(self.model.source == 'auto', self.model.id)
+                .first()
+            )
+            return entry.id if entry else None
+
+    def _entry_fields(self, question, options, open_seconds, reveal_seconds, source):
+        """Campos validados de uma entrada; levanta ValueError se inválida"""
+        question, options = self.engine.clean(question, [str(option or '') for option in (options or [])])
+
+        open_seconds = int(open_seconds or self.default_open_seconds)
+        reveal_seconds = int(reveal_seconds or self.default_reveal_seconds)
+        if open_seconds <= 0 or reveal_seconds < 0:
+            raise ValueError('Durações inválidas')
+
+        return {
+            'question': question,
+            'options': json.dumps(options, ensure_ascii=False),
+            'open_seconds': open_seconds,
+            'reveal_seconds': reveal_seconds,
+            'source': source
+        }
+
+    def _insert_entry(self, fields):
+        """Gravar entrada na fila (chamado sob lock)"""
+        with self.app.app_context():
+            entry = self.model(status=QUEUED, **fields)
+            self.db.session.add(entry)
+            self.db.session.commit()
+            return entry.to_dict()
+
+    def _track(self, entry):
+        """Guardar a entrada em andamento e seus prazos (chamado sob lock)"""
+        self.current_id = entry.id
+        self.reveal_at = entry.reveal_at
+        self.closes_at = entry.closes_at
+        self.status = entry.status
+
+    def _recover(self):
+        """Retomar a entrada em andamento gravada no banco"""
+        with self.app.app_context():
+            entry = (
+                self.model.query
+                .filter(self.model.status.in_([OPEN, REVEALED]))
+                .order_by(self.model.id.desc())
+                .first()
+            )
+            if entry is None:
+                return
+
+            if self.engine.get_poll_dict(entry.poll_id) is None:
+                # Enquete encerrada por fora da agenda
+                entry.status = CLOSED
+                entry.closed_at = datetime.utcnow()
+                self.db.session.commit()
+                return
+
+            self._track(entry)
+            self.logger.info(f"📊 Agenda de enquetes retomada: {entry.question} ({entry.status})")
+
+    @staticmethod
+    def _seconds_until(deadline):
+        """Segundos até o prazo (negativo se vencido)"""
+        if deadline is None:
+            return 0.0
+        return (deadline - datetime.utcnow()).total_seconds()
+
+# Instância global da agenda
+poll_scheduler = None
+
+def init_poll_scheduler(app, db, socketio, model, engine, vote_counter, event_queue=None, poll_source=None):
+    """Inicializar agenda de enquetes"""
+    global poll_scheduler
+    poll_scheduler = PollScheduler(app, db, socketio, model, engine, vote_counter, event_queue, poll_source)
+    poll_scheduler.start()
+    return poll_scheduler
+
+def get_poll_scheduler():
+    """Obter instância da agenda de enquetes"""
+    return poll_scheduler
@@ -0,0 +1,163 @@
+"""
+Limitador de taxa em memória (token bucket) para endpoints de chat e votação
+Buckets por IP e por sid do Socket.IO, em dicionários particionados
+"""
+
+import os
+import math
+import threading
+import time
+import logging
+
+class RateLimiter:
+    """Token buckets particionados em shards com expiração preguiçosa.
+
+    Cada regra é `capacidade/segundos` (ex.: "5/10" = rajada de 5 e
+    reposição de 0,5 token/s), configurável por rota e escopo via
+    RATE_LIMIT_<ROTA>_<ESCOPO> no .env. Buckets ociosos por tempo suficiente
+    para encher de novo são descartados na próxima varredura do shard,
+    pois equivalem a um bucket novo.
+    """
+
+    DEFAULT_RULES = {
+        ('send_message', 'ip'): '30/10',
+        ('send_message', 'sid'): '5/10',
+        ('vote_poll', 'ip'): '60/10',
+        ('vote_poll', 'sid'): '3/10'
+    }
+
+    def __init__(self, shard_count=16):
+        self.shard_count = shard_count
+        self.shards = [{} for _ in range(shard_count)]
+        self.shard_locks = [threading.Lock() for _ in range(shard_count)]
+        self.counter_lock = threading.Lock()
+        self.last_sweep = [time.monotonic()] * shard_count
+        self.sweep_interval = 30.0
+        self.rules = {}
+        self.logger = logging.getLogger(__name__)
+
+        # Contadores
+        self.total_allowed = 0
+        self.total_rejected = 0
+
+        for (route, scope), default in self.DEFAULT_RULES.items():
+            self.set_rule(route, scope, os.getenv(f'RATE_LIMIT_{route.upper()}_{scope.upper()}', default))
+
+    def set_rule(self, route, scope, spec):
+        """Definir regra "capacidade/segundos" para uma rota e escopo"""
+        try:
+            capacity, seconds = spec.split('/')
+            capacity = float(capacity)
+            refill = capacity / float(seconds)
+        except (ValueError, ZeroDivisionError):
+            self.logger.warning(f"Regra de rate limit inválida para {route}/{scope}: {spec!r}")
+            return
+
+        if capacity <= 0:
+            self.rules.pop((route, scope), None)
+        else:
+            self.rules[(route, scope)] = (capacity, refill)
+
+    def check(self, route, ip=None, sid=None):
+        """Consumir um token de cada bucket aplicável se todos tiverem; retorna (permitido, retry_after)
+
+        Os shards envolvidos são travados juntos (em ordem de índice, sem
+        deadlock): primeiro todos os buckets são conferidos e só então cada
+        um perde um token, de modo que a recusa de um escopo não gasta o outro.
+        """
+        now = time.monotonic()
+        buckets = []
+        for scope, key in (('ip', ip), ('sid', sid)):
+            if not key:
+                continue
+            rule = self.rules.get((route, scope))
+            if not rule:
+                continue
+            bucket_key = (route, scope, key)
+            buckets.append((bucket_key, rule, hash(bucket_key) % self.shard_count))
+
+        indexes = sorted({index for _, _, index in buckets})
+        for index in indexes:
+            self.shard_locks[index].acquire()
+        try:
+            retry_after = 0.0
+            states = []
+            for bucket_key, rule, index in buckets:
+                bucket = self._refill(bucket_key, rule, index, now)
+                states.append(bucket)
+                if bucket[0] < 1.0:
+                    retry_after = max(retry_after, (1.0 - bucket[0]) / rule[1])
+
+            if retry_after == 0.0:
+                for bucket in states:
+                    bucket[0] -= 1.0
+        finally:
+            for index in reversed(indexes):
+                self.shard_locks[index].release()
+
+        with self.counter_lock:
+            if retry_after > 0:
+                self.total_rejected += 1
+            else:
+                self.total_allowed += 1
+
+        if retry_after > 0:
+            return False, max(1, math.ceil(retry_after))
+        return True, 0
+
+    def _refill(self, bucket_key, rule, index, now):
+        """Bucket com os tokens repostos até agora (chamado sob o lock do shard)"""
+        capacity, refill = rule
+        shard = self.shards[index]
+
+        if now - self.last_sweep[index] > self.sweep_interval:
+            self._sweep(index, now)
+
+        bucket = shard.get(bucket_key)
+        if bucket is None:
+            # [tokens, último refill, tempo para encher]
+            bucket = [capacity, now, capacity / refill]
+            shard[bucket_key] = bucket
+        else:
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill)
+            bucket[1] = now
+        return bucket
+
+    def _sweep(self, index, now):
+        """Remover buckets que já teriam enchido (chamado sob o lock do shard)"""
+        shard = self.shards[index]
+        expired = [key for key, bucket in shard.items() if now - bucket[1] >= bucket[2]]
+        for key in expired:
+            del shard[key]
+        self.last_sweep[index] = now
+
+    def get_status(self):
+        """Obter status do limitador"""
+        return {
+            'tracked_buckets': sum(len(shard) for shard in self.shards),
+            'total_allowed': self.total_allowed,
+            'total_rejected': self.total_rejected,
+            'rules': {
+                f"{route}/{scope}": f"{capacity:g}/{capacity / refill:g}s"
+                for (route, scope), (capacity, refill) in self.rules.items()
+            }
+        }
+
+def get_client_ip(request):
+    """IP do cliente; com RATE_LIMIT_TRUST_PROXY=true usa o X-Forwarded-For do proxy"""
+    if os.getenv('RATE_LIMIT_TRUST_PROXY', 'False').lower() == 'true' and request.access_route:
+        return request.access_route[-1]
+    return request.remote_addr
+
+# Instância global do limitador
+rate_limiter = RateLimiter()
+
+def init_rate_limiter():
+    """Inicializar limitador com as regras do .env"""
+    global rate_limiter
+    rate_limiter = RateLimiter()
+    return rate_limiter
+
+def get_rate_limiter():
+    """Obter instância do limitador"""
+    return rate_limiter
@@ -0,0 +1,90 @@
+"""
+Cache em memória das mensagens recentes
+Responde /api/messages/recent sem tocar no banco
+"""
+
+import json
+import threading
+import time
+import logging
+from collections import deque
+
+class RecentMessagesCache:
+    """Ring buffer das últimas mensagens já serializadas.
+
+    Cada mensagem nova incrementa `version`, que vira o ETag do endpoint.
+    O corpo JSON de cada `limit` é montado uma única vez por versão.
+    """
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self.messages = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        # Base em milissegundos para o ETag continuar crescente após reinício
+        self.version = int(time.time() * 1000)
+        self._rendered = {}
+
+    def warm(self, app, model):
+        """Carregar as últimas mensagens do banco na inicialização"""
+        with app.app_context():
+            rows = model.query.order_by(model.created_at.desc(), model.id.desc()).limit(self.capacity).all()
+            with self.lock:
+                self.messages.clear()
+                self.messages.extend(row.to_dict() for row in reversed(rows))
+                self._bump()
+        self.logger.info(f"Cache de mensagens recentes carregado: {len(rows)} mensagens")
+
+    def add(self, message_data):
+        """Registrar mensagem recém-aceita"""
+        with self.lock:
+            self.messages.append(message_data)
+            self._bump()
+
+    def update(self, message_id, **fields):
+        """Atualizar campos de uma mensagem ainda presente no cache"""
+        with self.lock:
+            for message in reversed(self.messages):
+                if message['id'] == message_id:
+                    message.update(fields)
+                    self._bump()
+                    return True
+        return False
+
+    def get_json(self, limit):
+        """Obter (versão, corpo JSON) com as `limit` mensagens mais recentes, mais antigas primeiro"""
+        limit = max(0, min(limit, self.capacity))
+
+        with self.lock:
+            version = self.version
+            body = self._rendered.get(limit)
+            if body is None:
+                size = len(self.messages)
+                messages_data = [self.messages[i] for i in range(size - min(limit, size), size)]
+                body = json.dumps({
+                    'success': True,
+                    'messages': messages_data,
+                    'count': len(messages_data),
+                    'version': version
+                }, separators=(',', ':'))
+                self._rendered[limit] = body
+
+        return version, body
+
+    def _bump(self):
+        """Nova versão invalida os corpos já montados (chamado sob self.lock)"""
+        self.version += 1
+        self._rendered = {}
+
+# Instância global do cache
+recent_messages_cache = RecentMessagesCache()
+
+def init_recent_messages_cache(app, model):
+    """Inicializar cache de mensagens recentes a partir do banco"""
+    recent_messages_cache.warm(app, model)
+    return recent_messages_cache
+
+def get_recent_messages_cache():
+    """Obter instância do cache de mensagens recentes"""
+    return recent_messages_cache
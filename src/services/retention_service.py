@@ -0,0 +1,299 @@
+"""
+Retenção e arquivamento de dados antigos
+Exporta mensagens para NDJSON compactado por live e apaga em lotes curtos
+"""
+
+import os
+import json
+import gzip
+import bisect
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
+
+class RetentionService:
+    """Job de retenção com transações curtas.
+
+    Cada lote (`chunk_size` linhas) de mensagens já exibidas é lido pelo
+    índice de data, anexado ao arquivo `archives/live_<id>/messages.ndjson.gz`
+    da live em que a mensagem foi enviada e só então apagado por ID,
+    liberando o lock de escrita do
+    SQLite entre lotes. Se o processo cair entre o arquivamento e o DELETE, o
+    lote é arquivado de novo na próxima execução (pelo menos uma vez).
+    """
+
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+        self.is_running = False
+        self.worker_thread = None
+        self.run_lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        # Configurações
+        self.message_retention_days = float(os.getenv('MESSAGE_RETENTION_DAYS', 7))
+        self.screenshot_retention_days = float(os.getenv('SCREENSHOT_RETENTION_DAYS', 7))
+        self.session_retention_hours = float(os.getenv('LIVE_SESSION_RETENTION_HOURS', 24))
+        self.interval = float(os.getenv('RETENTION_INTERVAL_HOURS', 6)) * 3600
+        self.chunk_size = int(os.getenv('RETENTION_CHUNK_SIZE', 500))
+        self.chunk_pause = 0.05  # Folga para os escritores entre lotes
+        self.archive_dir = os.getenv('ARCHIVE_DIR', 'archives')
+
+        # Última execução
+        self.last_run = None
+        self.last_result = {}
+
+    def start(self):
+        """Iniciar execução periódica"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.worker_thread = threading.Thread(target=self._retention_loop, daemon=True)
+        self.worker_thread.start()
+        self.logger.info("Job de retenção iniciado")
+
+    def stop(self):
+        """Parar execução periódica"""
+        self.is_running = False
+
+    def run(self):
+        """Executar uma rodada completa de retenção"""
+        if not self.run_lock.acquire(blocking=False):
+            self.logger.info("Retenção já em andamento, ignorando nova execução")
+            return self.last_result
+
+        try:
+            now = datetime.utcnow()
+            with self.app.app_context():
+                lives = self._load_lives()
+                result = {
+                    'messages': self._archive_messages(now - timedelta(days=self.message_retention_days), lives),
+                    'screenshots': self._delete_in_chunks('screenshots', now - timedelta(days=self.screenshot_retention_days)),
+                    'live_sessions': self._archive_live_sessions(now - timedelta(hours=self.session_retention_hours))
+                }
+
+            self.last_run = now
+            self.last_result = result
+            self.logger.info(
+                f"Retenção concluída: {result['messages']} mensagens arquivadas, "
+                f"{result['screenshots']} screenshots, {result['live_sessions']} sessões"
+            )
+            return result
+
+        except Exception as e:
+            self.logger.error(f"Erro na retenção: {e}")
+            try:
+                with self.app.app_context():
+                    self.db.session.rollback()
+            except Exception:
+                pass
+            return self.last_result
+
+        finally:
+            self.run_lock.release()
+
+    def archive_messages(self, days=None):
+        """Arquivar e apagar só as mensagens antigas já exibidas; retorna quantas saíram"""
+        days = self.message_retention_days if days is None else days
+        return self._run_step('mensagens', lambda now: self._archive_messages(now - timedelta(days=days), self._load_lives()))
+
+    def archive_live_sessions(self, hours=None):
+        """Arquivar e apagar só as sessões de live inativas; retorna quantas saíram"""
+        hours = self.session_retention_hours if hours is None else hours
+        return self._run_step('sessões', lambda now: self._archive_live_sessions(now - timedelta(hours=hours)))
+
+    def get_status(self):
+        """Obter status do job"""
+        return {
+            'last_run': self.last_run.isoformat() if self.last_run else None,
+            'last_result': self.last_result,
+            'running': self.run_lock.locked()
+        }
+
+    def _run_step(self, label, step):
+        """Executar uma etapa avulsa sob o mesmo lock da rodada completa"""
+        if not self.run_lock.acquire(blocking=False):
+            self.logger.info(f"Retenção já em andamento, ignorando limpeza de {label}")
+            return 0
+
+        try:
+            with self.app.app_context():
+                return step(datetime.utcnow())
+        except Exception as e:
+            self.logger.error(f"Erro na retenção de {label}: {e}")
+            try:
+                with self.app.app_context():
+                    self.db.session.rollback()
+            except Exception:
+                pass
+            return 0
+        finally:
+            self.run_lock.release()
+
+    def _retention_loop(self):
+        """Loop de execução periódica"""
+        while self.is_running:
+            self.run()
+            time.sleep(self.interval)
+
+    def _archive_messages(self, cutoff, lives):
+        """Arquivar e apagar mensagens já exibidas anteriores ao corte, lote a lote
+
+        Mensagens nunca exibidas ficam: o agendador de exibição ainda pode
+        tê-las pendentes e marcá-las depois.
+        """
+        table = self.db.metadata.tables.get('messages')
+        if table is None:
+            return 0
+
+        total = 0
+        while True:
+            rows = self.db.session.execute(
+                self.db.select(table)
+                .where(table.c.created_at < cutoff, table.c.displayed == True)  # noqa: E712
+                .order_by(table.c.created_at, table.c.id)
+                .limit(self.chunk_size)
+            ).mappings().all()
+            self.db.session.commit()  # Encerrar a transação de leitura
+
+            if not rows:
+                break
+
+            by_live = {}
+            for row in rows:
+                by_live.setdefault(self._live_for(lives, row['created_at']), []).append(row)
+            for live_id, live_rows in by_live.items():
+                self._append_archive(os.path.join(f"live_{live_id}", 'messages.ndjson.gz'), live_rows)
+
+            self.db.session.execute(table.delete().where(table.c.id.in_([row['id'] for row in rows])))
+            self.db.session.commit()
+            total += len(rows)
+
+            if len(rows) < self.chunk_size:
+                break
+            time.sleep(self.chunk_pause)
+
+        return total
+
+    def _archive_live_sessions(self, cutoff):
+        """Arquivar e apagar sessões de live inativas anteriores ao corte"""
+        table = self.db.metadata.tables.get('live_sessions')
+        if table is None:
+            return 0
+
+        total = 0
+        while True:
+            rows = self.db.session.execute(
+                self.db.select(table)
+                .where(table.c.created_at < cutoff, table.c.active == False)  # noqa: E712
+                .order_by(table.c.id)
+                .limit(self.chunk_size)
+            ).mappings().all()
+            self.db.session.commit()
+
+            if not rows:
+                break
+
+            # O índice de lives arquivadas mantém o mapeamento mensagem -> live
+            self._append_archive('live_sessions.ndjson.gz', rows)
+            self.db.session.execute(table.delete().where(table.c.id.in_([row['id'] for row in rows])))
+            self.db.session.commit()
+            total += len(rows)
+
+            if len(rows) < self.chunk_size:
+                break
+            time.sleep(self.chunk_pause)
+
+        return total
+
+    def _delete_in_chunks(self, table_name, cutoff):
+        """Apagar linhas antigas em lotes curtos, sem arquivar"""
+        table = self.db.metadata.tables.get(table_name)
+        if table is None:
+            return 0
+
+        total = 0
+        while True:
+            ids = self.db.session.execute(
+                self.db.select(table.c.id).where(table.c.created_at < cutoff).limit(self.chunk_size)
+            ).scalars().all()
+
+            if not ids:
+                self.db.session.commit()
+                break
+
+            self.db.session.execute(table.delete().where(table.c.id.in_(ids)))
+            self.db.session.commit()
+            total += len(ids)
+
+            if len(ids) < self.chunk_size:
+                break
+            time.sleep(self.chunk_pause)
+
+        return total
+
+    def _load_lives(self):
+        """Lista ordenada de (created_at, id) das lives no banco e no arquivo"""
+        lives = {}
+
+        table = self.db.metadata.tables.get('live_sessions')
+        if table is not None:
+            for live_id, created_at in self.db.session.execute(
+                self.db.select(table.c.id, table.c.created_at)
+            ):
+                if created_at:
+                    lives[live_id] = created_at
+
+        archived = os.path.join(self.archive_dir, 'live_sessions.ndjson.gz')
+        if os.path.exists(archived):
+            with gzip.open(archived, 'rt', encoding='utf-8') as archive:
+                for line in archive:
+                    try:
+                        data = json.loads(line)
+                        if data.get('created_at'):
+                            lives.setdefault(data['id'], datetime.fromisoformat(data['created_at']))
+                    except (ValueError, KeyError):
+                        continue
+
+        ordered = sorted((created_at, live_id) for live_id, created_at in lives.items())
+        return [created_at for created_at, _ in ordered], [live_id for _, live_id in ordered]
+
+    @staticmethod
+    def _live_for(lives, created_at):
+        """ID da última live criada antes da mensagem (0 se nenhuma)"""
+        starts, ids = lives
+        if not created_at:
+            return 0
+        index = bisect.bisect_right(starts, created_at) - 1
+        return ids[index] if index >= 0 else 0
+
+    def _append_archive(self, relative_path, rows):
+        """Anexar linhas a um arquivo NDJSON gzip (um membro gzip por lote)"""
+        path = os.path.join(self.archive_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, 'ab') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='ab') as archive:
+                for row in rows:
+                    record = {
+                        key: value.isoformat() if isinstance(value, datetime) else value
+                        for key, value in row.items()
+                    }
+                    archive.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+
+# Instância global do job
+retention_service = None
+
+def init_retention_service(app, db):
+    """Inicializar job de retenção periódica"""
+    global retention_service
+    retention_service = RetentionService(app, db)
+    retention_service.start()
+    return retention_service
+
+def get_retention_service():
+    """Obter instância do job de retenção"""
+    return retention_service
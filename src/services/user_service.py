@@ -80,24 +80,34 @@ class UserService:
             return 0
     
     @staticmethod
-    def cleanup_old_sessions():
-        """Limpar sessões antigas (mais de 1 hora)"""
+    def cleanup_old_sessions(chunk_size=500):
+        """Limpar sessões de espectadores antigas (mais de 1 hora) em lotes curtos
+
+        Sessões de live são arquivadas à parte por RetentionService.archive_live_sessions.
+        """
         try:
             from src.models.user_session import UserSession
             
             cutoff_time = datetime.utcnow() - timedelta(hours=1)
+            total = 0
+            
+            while True:
+                ids = [row.id for row in db.session.query(UserSession.id).filter(
+                    UserSession.last_activity < cutoff_time
+                ).limit(chunk_size)]
+                
+                if not ids:
+                    break
+                
+                UserSession.query.filter(UserSession.id.in_(ids)).delete(synchronize_session=False)
+                db.session.commit()
+                total += len(ids)
+                
+                if len(ids) < chunk_size:
+                    break
             
-            old_sessions = UserSession.query.filter(
-                UserSession.last_activity < cutoff_time
-            ).all()
-            
-            for session in old_sessions:
-                db.session.delete(session)
-            
-            db.session.commit()
-            
-            print(f"🧹 Limpeza: {len(old_sessions)} sessões antigas removidas")
-            return len(old_sessions)
+            print(f"🧹 Limpeza: {total} sessões antigas removidas")
+            return total
             
         except Exception as e:
             print(f"❌ Erro na limpeza de sessões: {e}")
@@ -0,0 +1,223 @@
+"""
+Contadores de votos em memória, particionados, com gravação periódica em lote
+Substitui o read-modify-write de `poll.votes_x += 1` com commit por voto
+"""
+
+import os
+import itertools
+import threading
+import time
+import logging
+
+class PollNotFoundError(LookupError):
+    """Enquete inexistente ou inativa"""
+
+class InvalidOptionError(ValueError):
+    """Opção que não existe na enquete"""
+
+class VoteCounter:
+    """Votos absorvidos em O(1) e gravados como `votes = votes + :delta`.
+
+    Cada voto soma 1 num dicionário (enquete, opção) -> delta de um shard
+    escolhido em rodízio. A cada `flush_interval` os shards são trocados por
+    dicionários vazios e os deltas agregados viram um UPDATE por opção numa
+    única transação do motor de enquetes, sem perder votos concorrentes. Os
+    totais expostos são os do cache do motor mais o que ainda não foi gravado.
+    """
+
+    def __init__(self, engine, shard_count=16):
+        self.engine = engine
+        self.shard_count = shard_count
+        self.shards = [{} for _ in range(shard_count)]
+        self.shard_locks = [threading.Lock() for _ in range(shard_count)]
+        self.shard_cursor = itertools.count()  # next() é atômico: espalha votos entre os shards
+        self.polls = {}  # poll_id -> opções válidas
+        self.closed = set()  # Enquetes encerradas: recusam votos mesmo já validados
+        self.polls_lock = threading.Lock()
+        self.in_flight = {}  # Deltas retirados dos shards e ainda não confirmados no banco
+        self.flush_lock = threading.Lock()
+        self.is_running = False
+        self.worker_thread = None
+        self.logger = logging.getLogger(__name__)
+
+        # Configurações
+        self.flush_interval = float(os.getenv('VOTE_FLUSH_INTERVAL_MS', 250)) / 1000.0
+
+        # Contadores
+        self.total_flushed = 0
+        self.total_batches = 0
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        """Iniciar thread de gravação"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.worker_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.worker_thread.start()
+
+    def stop(self):
+        """Parar thread e gravar votos pendentes"""
+        self.is_running = False
+        if self.worker_thread:
+            self.worker_thread.join(timeout=5)
+        self.flush()
+
+    def validate(self, poll_id, option):
+        """Conferir enquete ativa e opção válida; levanta PollNotFoundError ou InvalidOptionError"""
+        options = self._get_options(poll_id)
+        if options is None:
+            raise PollNotFoundError(poll_id)
+        if option not in options:
+            raise InvalidOptionError(option)
+
+    def vote(self, poll_id, option):
+        """Registrar um voto; levanta PollNotFoundError ou InvalidOptionError"""
+        self.validate(poll_id, option)
+
+        key = (poll_id, option)
+        # get_ident() é endereço alinhado (ident % 16 == 0 sempre); rodízio distribui de verdade
+        index = next(self.shard_cursor) % self.shard_count
+        with self.shard_locks[index]:
+            # Conferido sob o lock do shard: o flush de close_polls pega este voto ou ele é recusado
+            if poll_id in self.closed:
+                raise PollNotFoundError(poll_id)
+            shard = self.shards[index]
+            shard[key] = shard.get(key, 0) + 1
+
+    def get_poll_dict(self, poll_id):
+        """Dict da enquete (formato do to_dict) com os totais já incluindo votos pendentes"""
+        if self._get_options(poll_id) is None:
+            return None
+
+        data, pending = self._pending_for(poll_id)
+        if data is None:
+            return None
+        data = dict(data)
+        data['votes'] = {
+            option: (count or 0) + pending.get(option, 0)
+            for option, count in data['votes'].items()
+        }
+        data['total_votes'] = sum(data['votes'].values())
+        return data
+
+    def close_polls(self, poll_ids=()):
+        """Encerrar as enquetes em cache (e `poll_ids`) e gravar tudo
+
+        As enquetes são marcadas como encerradas antes do flush final: um
+        voto validado antes disso ou entra nos shards antes do flush (que
+        trava cada shard) ou é recusado. Depois disso o banco tem os totais
+        exatos.
+        """
+        with self.polls_lock:
+            self.closed.update(self.polls)
+            self.closed.update(poll_ids)
+            self.polls.clear()
+        self.flush()
+
+    def flush(self):
+        """Gravar deltas acumulados; retorna quantos votos foram gravados"""
+        with self.flush_lock:
+            deltas = {}
+            for index in range(self.shard_count):
+                with self.shard_locks[index]:
+                    shard = self.shards[index]
+                    self.shards[index] = {}
+                for key, delta in shard.items():
+                    deltas[key] = deltas.get(key, 0) + delta
+
+            if not deltas:
+                return 0
+
+            with self.polls_lock:
+                self.in_flight = deltas
+
+            started = time.perf_counter()
+            try:
+                self.engine.increment(deltas)
+            except Exception as e:
+                self.logger.error(f"Erro ao gravar {sum(deltas.values())} votos: {e}")
+                # Devolver os deltas para o próximo ciclo
+                with self.shard_locks[0]:
+                    for key, delta in deltas.items():
+                        self.shards[0][key] = self.shards[0].get(key, 0) + delta
+                with self.polls_lock:
+                    self.in_flight = {}
+                return 0
+
+            with self.polls_lock:
+                self.engine.apply_cached(deltas)
+                self.in_flight = {}
+
+            flushed = sum(deltas.values())
+            self.total_flushed += flushed
+            self.total_batches += 1
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            return flushed
+
+    def get_status(self):
+        """Obter status dos contadores"""
+        pending = sum(sum(shard.values()) for shard in list(self.shards))
+        return {
+            'cached_polls': len(self.polls),
+            'pending_votes': pending,
+            'total_flushed': self.total_flushed,
+            'total_batches': self.total_batches,
+            'last_flush_ms': round(self.last_flush_ms, 2)
+        }
+
+    def _get_options(self, poll_id):
+        """Opções válidas da enquete ativa (ou None), lidas do motor na primeira vez"""
+        options = self.polls.get(poll_id)
+        if options is not None:
+            return options
+        if poll_id in self.closed:
+            return None
+
+        data = self.engine.get_poll_dict(poll_id)
+        if data is None:
+            return None
+
+        options = {option for option, text in data['options'].items() if text}
+        with self.polls_lock:
+            return self.polls.setdefault(poll_id, options)
+
+    def _pending_for(self, poll_id):
+        """Dict gravado da enquete e votos ainda não gravados, por opção"""
+        pending = {}
+        with self.polls_lock:
+            data = self.engine.get_poll_dict(poll_id)
+            for (key_poll, option), delta in self.in_flight.items():
+                if key_poll == poll_id:
+                    pending[option] = pending.get(option, 0) + delta
+
+        for index in range(self.shard_count):
+            with self.shard_locks[index]:
+                items = list(self.shards[index].items())
+            for (key_poll, option), delta in items:
+                if key_poll == poll_id:
+                    pending[option] = pending.get(option, 0) + delta
+        return data, pending
+
+    def _flush_loop(self):
+        """Loop de gravação periódica"""
+        while self.is_running:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error(f"Erro no loop de gravação de votos: {e}")
+
+# Instância global dos contadores
+vote_counter = None
+
+def init_vote_counter(engine):
+    """Inicializar contadores de votos"""
+    global vote_counter
+    vote_counter = VoteCounter(engine)
+    vote_counter.start()
+    return vote_counter
+
+def get_vote_counter():
+    """Obter instância dos contadores de votos"""
+    return vote_counter
@@ -0,0 +1,145 @@
+"""
+Série temporal de votos por segundo de cada enquete
+Buckets fixos em array por opção, sem uma linha por voto, consultados já reamostrados
+"""
+
+import os
+import time
+import threading
+from array import array
+from collections import OrderedDict
+
+class PollSeries:
+    """Votos por segundo de uma enquete num anel de `capacity` segundos por opção.
+
+    Segundos que saem do anel somam em `evicted`, então o acumulado continua
+    exato mesmo em enquetes mais longas que a janela.
+    """
+
+    def __init__(self, capacity, started):
+        self.capacity = capacity
+        self.started = started
+        self.head = started  # Último segundo já aberto no anel
+        self.counts = {}     # opção -> array('I') de votos por segundo
+        self.evicted = {}    # opção -> votos que já saíram do anel
+
+    def record(self, option, second, count=1):
+        """Somar votos ao segundo informado (segundos antigos caem no mais velho da janela)"""
+        self._advance(second)
+        second = max(second, self.head - self.capacity + 1, self.started)
+        counts = self.counts.get(option)
+        if counts is None:
+            counts = self.counts[option] = array('I', bytes(4 * self.capacity))
+            self.evicted[option] = 0
+        counts[second % self.capacity] += count
+
+    def query(self, points, seconds=None, now=None):
+        """Série reamostrada em até `points` intervalos entre o início da janela e `now`"""
+        if now is not None:
+            self._advance(now)
+        oldest = max(self.started, self.head - self.capacity + 1)
+        start = oldest if not seconds else max(oldest, self.head - int(seconds) + 1)
+        span = self.head - start + 1
+        bin_seconds = max(1, -(-span // max(1, points)))
+        bins = -(-span // bin_seconds)
+
+        options = {}
+        for option, counts in self.counts.items():
+            baseline = self.evicted[option] + sum(
+                counts[second % self.capacity] for second in range(oldest, start)
+            )
+            votes = [0] * bins
+            for offset in range(span):
+                votes[offset // bin_seconds] += counts[(start + offset) % self.capacity]
+
+            cumulative = []
+            total = baseline
+            for value in votes:
+                total += value
+                cumulative.append(total)
+            options[option] = {'votes': votes, 'cumulative': cumulative}
+
+        return {
+            'start': start,
+            'end': self.head,
+            'bin_seconds': bin_seconds,
+            'points': bins,
+            'options': options
+        }
+
+    def memory_bytes(self):
+        """Bytes ocupados pelos arrays"""
+        return sum(counts.itemsize * len(counts) for counts in self.counts.values())
+
+    def _advance(self, second):
+        """Abrir segundos novos no anel, zerando (e acumulando) os que saem"""
+        if second <= self.head:
+            return
+        for opened in range(max(self.head + 1, second - self.capacity + 1), second + 1):
+            slot = opened % self.capacity
+            for option, counts in self.counts.items():
+                if counts[slot]:
+                    self.evicted[option] += counts[slot]
+                    counts[slot] = 0
+        self.head = second
+
+class VoteTimeSeries:
+    """Séries de votos das enquetes recentes (as mais antigas são descartadas)"""
+
+    def __init__(self):
+        self.capacity = int(os.getenv('VOTE_SERIES_SECONDS', 3600))
+        self.max_polls = int(os.getenv('VOTE_SERIES_MAX_POLLS', 5))
+        self.polls = OrderedDict()  # poll_id -> PollSeries
+        self.lock = threading.Lock()
+
+    def record(self, poll_id, option, count=1):
+        """Registrar voto no segundo atual"""
+        second = int(time.time())
+        with self.lock:
+            series = self._series(poll_id, second)
+            series.record(option, second, count)
+
+    def start_poll(self, poll_id):
+        """Abrir série de uma enquete nova a partir de agora"""
+        with self.lock:
+            self._series(poll_id, int(time.time()))
+
+    def query(self, poll_id, points=60, seconds=None):
+        """Série reamostrada da enquete (ou None se não há registro)"""
+        with self.lock:
+            series = self.polls.get(poll_id)
+            if series is None:
+                return None
+            data = series.query(points, seconds, now=int(time.time()))
+        return dict(data, poll_id=poll_id)
+
+    def get_status(self):
+        """Obter status das séries"""
+        with self.lock:
+            return {
+                'polls': list(self.polls.keys()),
+                'window_seconds': self.capacity,
+                'memory_bytes': sum(series.memory_bytes() for series in self.polls.values())
+            }
+
+    def _series(self, poll_id, second):
+        """Série da enquete, criada se necessário (chamado sob lock)"""
+        series = self.polls.get(poll_id)
+        if series is None:
+            series = self.polls[poll_id] = PollSeries(self.capacity, second)
+            while len(self.polls) > self.max_polls:
+                self.polls.popitem(last=False)
+        return series
+
+# Instância global das séries
+vote_timeseries = None
+
+def init_vote_timeseries():
+    """Inicializar séries de votos"""
+    global vote_timeseries
+    vote_timeseries = VoteTimeSeries()
+    return vote_timeseries
+
+def get_vote_timeseries():
+    """Obter instância das séries de votos"""
+    return vote_timeseries
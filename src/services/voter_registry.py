@@ -0,0 +1,249 @@
+"""
+Registro de quem já votou em cada enquete (um voto por espectador)
+Impressões digitais de 64 bits num conjunto compacto de endereçamento aberto
+"""
+
+import os
+import uuid
+import hashlib
+import threading
+import logging
+from array import array
+
+from .rate_limiter import get_client_ip
+
+VOTER_COOKIE = 'voter_id'
+VOTER_COOKIE_MAX_AGE = 365 * 24 * 3600
+CLIENT_KEY_PREFIX = 'client:'
+
+class FingerprintSet:
+    """Conjunto exato de inteiros de 64 bits num único array('Q').
+
+    Endereçamento aberto com sondagem linear e carga máxima de 50%:
+    16 bytes por eleitor, busca e inserção em tempo constante. O valor 0
+    marca posição vazia.
+    """
+
+    def __init__(self, capacity=1024):
+        self.slots = array('Q', bytes(8 * capacity))
+        self.mask = capacity - 1
+        self.size = 0
+
+    def add(self, fingerprint):
+        """Inserir; retorna False se já estava no conjunto"""
+        if (self.size + 1) * 2 > len(self.slots):
+            self._grow()
+        index = fingerprint & self.mask
+        while True:
+            current = self.slots[index]
+            if current == 0:
+                self.slots[index] = fingerprint
+                self.size += 1
+                return True
+            if current == fingerprint:
+                return False
+            index = (index + 1) & self.mask
+
+    def __contains__(self, fingerprint):
+        index = fingerprint & self.mask
+        while True:
+            current = self.slots[index]
+            if current == 0:
+                return False
+            if current == fingerprint:
+                return True
+            index = (index + 1) & self.mask
+
+    def discard(self, fingerprint):
+        """Remover; retorna False se não estava no conjunto
+
+        Sem marcadores de remoção: as impressões seguintes da mesma sequência
+        de sondagem recuam para o buraco, e a busca continua parando no 0.
+        """
+        index = fingerprint & self.mask
+        while True:
+            current = self.slots[index]
+            if current == 0:
+                return False
+            if current == fingerprint:
+                break
+            index = (index + 1) & self.mask
+
+        hole = index
+        index = (hole + 1) & self.mask
+        while True:
+            current = self.slots[index]
+            if current == 0:
+                break
+            # Recuar se a posição de origem não fica entre o buraco e a atual
+            home = current & self.mask
+            if (index - home) & self.mask >= (index - hole) & self.mask:
+                self.slots[hole] = current
+                hole = index
+            index = (index + 1) & self.mask
+
+        self.slots[hole] = 0
+        self.size -= 1
+        return True
+
+    def __len__(self):
+        return self.size
+
+    def memory_bytes(self):
+        """Bytes ocupados pelo array"""
+        return self.slots.itemsize * len(self.slots)
+
+    def _grow(self):
+        """Dobrar a capacidade reinserindo as impressões existentes"""
+        old = self.slots
+        self.slots = array('Q', bytes(8 * len(old) * 2))
+        self.mask = len(self.slots) - 1
+        self.size = 0
+        for fingerprint in old:
+            if fingerprint:
+                self.add(fingerprint)
+
+class VoterRegistry:
+    """Um voto por espectador por enquete.
+
+    Cada identidade do espectador (cookie `voter_id` e sid do Socket.IO) vira
+    uma impressão de 64 bits salgada com o ID da enquete. O voto só é aceito
+    se nenhuma delas já votou, e todas são registradas juntas: apagar o cookie
+    sem recarregar a página não libera um segundo voto.
+
+    O cookie é entregue já com a página e com /api/polls/active, então o
+    primeiro voto normalmente chega com ele. Votos sem cookie trazem a chave
+    fraca de IP + User-Agent, que não é única (várias pessoas na mesma rede
+    e navegador): ela só conta quantos votos sem cookie aquele cliente deu
+    na enquete, e recusa a partir de `cookieless_limit`.
+    """
+
+    def __init__(self):
+        self.polls = {}  # poll_id -> FingerprintSet
+        self.cookieless = {}  # poll_id -> {impressão IP+UA: votos sem cookie}
+        self.cookieless_limit = int(os.getenv('VOTER_COOKIELESS_LIMIT', 3))
+        self.lock = threading.Lock()
+        self.secret = os.getenv('SECRET_KEY', 'moedor-ao-vivo-secret-key-2025').encode('utf-8')
+        self.logger = logging.getLogger(__name__)
+
+        # Contadores
+        self.total_accepted = 0
+        self.total_repeated = 0
+        self.total_cookieless_rejected = 0
+
+    def register(self, poll_id, voter_keys):
+        """Registrar o espectador na enquete; False se alguma identidade já votou"""
+        fingerprints, clients = self._split(poll_id, voter_keys)
+        if not fingerprints and not clients:
+            return True
+
+        with self.lock:
+            voters = self.polls.get(poll_id)
+            if voters is None:
+                voters = self.polls[poll_id] = FingerprintSet()
+            counts = self.cookieless.setdefault(poll_id, {})
+
+            if any(fingerprint in voters for fingerprint in fingerprints):
+                self.total_repeated += 1
+                return False
+            if any(counts.get(client, 0) >= self.cookieless_limit for client in clients):
+                self.total_cookieless_rejected += 1
+                return False
+
+            for fingerprint in fingerprints:
+                voters.add(fingerprint)
+            for client in clients:
+                counts[client] = counts.get(client, 0) + 1
+            self.total_accepted += 1
+            return True
+
+    def unregister(self, poll_id, voter_keys):
+        """Desfazer `register` quando o voto não foi aceito pelo contador"""
+        fingerprints, clients = self._split(poll_id, voter_keys)
+        with self.lock:
+            voters = self.polls.get(poll_id)
+            if voters is None:
+                return
+            for fingerprint in fingerprints:
+                voters.discard(fingerprint)
+            counts = self.cookieless.get(poll_id, {})
+            for client in clients:
+                if counts.get(client, 0) > 1:
+                    counts[client] -= 1
+                else:
+                    counts.pop(client, None)
+            self.total_accepted -= 1
+
+    def clear(self):
+        """Esquecer eleitores das enquetes encerradas"""
+        with self.lock:
+            self.polls.clear()
+            self.cookieless.clear()
+
+    def get_status(self):
+        """Obter status do registro"""
+        with self.lock:
+            return {
+                'polls': len(self.polls),
+                'fingerprints': sum(len(voters) for voters in self.polls.values()),
+                'memory_bytes': sum(voters.memory_bytes() for voters in self.polls.values()),
+                'cookieless_clients': sum(len(counts) for counts in self.cookieless.values()),
+                'total_accepted': self.total_accepted,
+                'total_repeated': self.total_repeated,
+                'total_cookieless_rejected': self.total_cookieless_rejected
+            }
+
+    def _split(self, poll_id, voter_keys):
+        """(impressões das identidades únicas, impressões das chaves fracas IP+UA)"""
+        fingerprints, clients = [], []
+        for key in voter_keys:
+            if key:
+                (clients if key.startswith(CLIENT_KEY_PREFIX) else fingerprints).append(self._fingerprint(poll_id, key))
+        return fingerprints, clients
+
+    def _fingerprint(self, poll_id, key):
+        """Impressão de 64 bits (nunca 0) da identidade na enquete"""
+        digest = hashlib.blake2b(f"{poll_id}:{key}".encode('utf-8'), digest_size=8, key=self.secret[:64]).digest()
+        return int.from_bytes(digest, 'big') or 1
+
+def get_voter_keys(request):
+    """Identidades do espectador: (lista de chaves, novo cookie a gravar ou None)"""
+    cookie = request.cookies.get(VOTER_COOKIE)
+    new_cookie = None
+    keys = []
+    if not cookie:
+        cookie = new_cookie = uuid.uuid4().hex
+        # Cliente que não guarda cookie ganharia um uuid novo a cada voto
+        user_agent = hashlib.blake2b(
+            request.headers.get('User-Agent', '').encode('utf-8'), digest_size=8
+        ).hexdigest()
+        keys.append(f"{CLIENT_KEY_PREFIX}{get_client_ip(request)}:{user_agent}")
+
+    keys.append(f"cookie:{cookie}")
+    sid = request.headers.get('X-Socket-Id')
+    if sid:
+        keys.append(f"sid:{sid}")
+    return keys, new_cookie
+
+def set_voter_cookie(response, voter_id):
+    """Gravar o cookie de eleitor na resposta"""
+    response.set_cookie(VOTER_COOKIE, voter_id, max_age=VOTER_COOKIE_MAX_AGE, httponly=True, samesite='Lax')
+
+def issue_voter_cookie(request, response):
+    """Entregar cookie de eleitor novo se a requisição ainda não tem um"""
+    if not request.cookies.get(VOTER_COOKIE):
+        set_voter_cookie(response, uuid.uuid4().hex)
+    return response
+
+# Instância global do registro
+voter_registry = VoterRegistry()
+
+def init_voter_registry():
+    """Inicializar registro de eleitores"""
+    global voter_registry
+    voter_registry = VoterRegistry()
+    return voter_registry
+
+def get_voter_registry():
+    """Obter instância do registro de eleitores"""
+    return voter_registry
@@ -7,6 +7,8 @@ class LiveSystem {
     constructor() {
         this.socket = null;
         this.currentPoll = null;
+        this.pollVersion = 0;
+        this.pollWatcher = false;
         this.userVoted = false;
         
         this.init();
@@ -30,6 +32,11 @@ class LiveSystem {
         this.socket.on('disconnect', () => {
             console.log('❌ Desconectado do servidor');
             this.showStatus('Conexão perdida. Tentando reconectar...', 'error');
+            this.watchActivePoll();
+        });
+        
+        this.socket.on('connect_error', () => {
+            this.watchActivePoll();
         });
         
         // Eventos de mensagem
@@ -126,10 +133,18 @@ class LiveSystem {
             return;
         }
         
-        // Enviar via WebSocket
+        // Enviar via WebSocket; o servidor responde no ack
         this.socket.emit('send_message', {
             name: name,
             content: message
+        }, (result) => {
+            if (result && result.success) {
+                this.showStatus('Mensagem enviada com sucesso!', 'success');
+                this.resetForm();
+            } else {
+                this.showStatus((result && result.error) || 'Erro ao enviar mensagem', 'error');
+                this.enableForm();
+            }
         });
         
         this.disableForm();
@@ -431,8 +446,11 @@ class LiveSystem {
         fetch('/api/polls/active')
             .then(response => response.json())
             .then(data => {
-                if (data.id) {
-                    this.displayPoll(data);
+                if (data.version) {
+                    this.pollVersion = data.version;
+                }
+                if (data.poll) {
+                    this.displayPoll(data.poll);
                 }
             })
             .catch(error => console.log('Nenhuma enquete ativa'));
@@ -441,6 +459,32 @@ class LiveSystem {
         this.loadScreenshots();
     }
     
+    // Sem WebSocket: acompanhar a enquete por long-poll (o servidor segura até a versão mudar)
+    watchActivePoll() {
+        if (this.pollWatcher) return;
+        this.pollWatcher = true;
+        
+        const poll = () => {
+            if (this.socket.connected) {
+                this.pollWatcher = false;
+                return;
+            }
+            fetch(`/api/polls/active?since=${this.pollVersion}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (data.version && data.version !== this.pollVersion) {
+                        this.pollVersion = data.version;
+                        if (data.poll) {
+                            this.displayPoll(data.poll);
+                        }
+                    }
+                })
+                .catch(() => new Promise(resolve => setTimeout(resolve, 5000)))
+                .then(poll);
+        };
+        poll();
+    }
+    
     loadScreenshots() {
         fetch('/api/screenshots?limit=12')
             .then(response => response.json())
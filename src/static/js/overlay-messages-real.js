@@ -12,6 +12,9 @@ class MessageOverlay {
         this.fadeDuration = 500; // 0.5 segundos
         this.messageCount = 0;
         this.displayedMessages = new Set(); // Controle de mensagens já exibidas
+        this.serverPaced = false; // Fila do servidor envia os cards (overlay_message) no ritmo dela
+        this.currentCardId = null;
+        this.cardTimer = null;
         
         this.init();
     }
@@ -46,6 +49,25 @@ class MessageOverlay {
                 this.addRealMessageToQueue(messageData);
             });
             
+            // Card da fila do servidor: uma ou mais mensagens pelo tempo que ela definir
+            this.socket.on('overlay_message', (card) => {
+                this.showCard(card, card.display_time);
+            });
+            
+            this.socket.on('overlay_message_end', (data) => {
+                this.endCard(data.id);
+            });
+            
+            // Ao entrar na sala o servidor envia o card que está no ar agora
+            this.socket.on('overlay_snapshot', (snapshot) => {
+                this.resumeFromSnapshot(snapshot);
+            });
+            
+            // Cópias repetidas somadas a uma mensagem original ("x12")
+            this.socket.on('message_merged', (data) => {
+                this.updateMergedCount(data.message_id, data.count);
+            });
+            
             // Escutar mensagens do chat principal
             this.socket.on('message', (messageData) => {
                 console.log('💬 Mensagem do chat principal:', messageData);
@@ -75,6 +97,8 @@ class MessageOverlay {
     }
     
     async fetchRealMessages() {
+        if (this.serverPaced) return;
+        
         try {
             const response = await fetch('/api/messages/recent?limit=5');
             if (response.ok) {
@@ -108,11 +132,12 @@ class MessageOverlay {
             name: messageData.name || messageData.author || 'Usuário',
             content: messageData.content || messageData.message || '',
             timestamp: messageData.timestamp || messageData.created_at || new Date().toISOString(),
+            count: messageData.merged_count || 1,
             type: 'real'
         };
         
-        // Verificar se já foi exibida
-        if (this.displayedMessages.has(normalizedMessage.id)) {
+        // Verificar se já foi exibida (ou se o servidor já controla a exibição)
+        if (this.serverPaced || this.displayedMessages.has(normalizedMessage.id)) {
             return;
         }
         
@@ -122,6 +147,71 @@ class MessageOverlay {
         console.log('📨 Mensagem REAL adicionada à fila:', normalizedMessage.name, '- Total na fila:', this.messageQueue.length);
     }
     
+    resumeFromSnapshot(snapshot) {
+        const showing = snapshot && snapshot.showing;
+        if (!showing || !showing.event || !(showing.remaining > 0)) {
+            return;
+        }
+        
+        // Redesenhar o card atual só pelo tempo que ainda resta
+        console.log('🔄 Retomando card em exibição por', showing.remaining, 's');
+        this.showCard(showing.event, showing.remaining);
+    }
+    
+    // ===== CARDS DA FILA DO SERVIDOR =====
+    showCard(card, seconds) {
+        if (!card) return;
+        
+        this.serverPaced = true;
+        this.messageQueue = [];
+        
+        const messages = (Array.isArray(card.messages) && card.messages.length ? card.messages : [card]).map(message => ({
+            id: message.message_id !== undefined ? message.message_id : message.id,
+            name: message.name || 'Anônimo',
+            content: message.content || '',
+            timestamp: message.timestamp || new Date().toISOString(),
+            count: message.merged_count || 1
+        }));
+        messages.forEach(message => this.displayedMessages.add(message.id));
+        
+        const container = document.getElementById('messageContainer');
+        container.querySelectorAll('.message-overlay').forEach(element => element.remove());
+        
+        const cardElement = this.createMessageElement(messages[0]);
+        cardElement.dataset.cardId = card.id;
+        messages.slice(1).forEach(message => {
+            const extra = this.createMessageElement(message);
+            cardElement.insertBefore(extra.querySelector('.message-header'), cardElement.querySelector('.message-progress'));
+            cardElement.insertBefore(extra.querySelector('.message-content'), cardElement.querySelector('.message-progress'));
+        });
+        cardElement.querySelector('.message-progress').style.animationDuration = `${seconds}s`;
+        
+        this.isDisplaying = true;
+        this.messageCount++;
+        this.currentCardId = card.id;
+        container.appendChild(cardElement);
+        setTimeout(() => cardElement.classList.add('show'), 50);
+        
+        // Se o overlay_message_end se perder, o card sai sozinho no prazo
+        clearTimeout(this.cardTimer);
+        this.cardTimer = setTimeout(() => this.endCard(card.id), seconds * 1000 + this.fadeDuration);
+        
+        console.log('📺 Exibindo card #' + this.messageCount + ':', messages.length, 'mensagem(ns) por', seconds, 's');
+    }
+    
+    endCard(cardId) {
+        if (cardId !== this.currentCardId) return;
+        
+        clearTimeout(this.cardTimer);
+        this.currentCardId = null;
+        const element = document.querySelector(`.message-overlay[data-card-id="${cardId}"]`);
+        if (element) {
+            this.hideMessage(element);
+        } else {
+            this.isDisplaying = false;
+        }
+    }
+    
     startMessageProcessor() {
         setInterval(() => {
             if (!this.isDisplaying && this.messageQueue.length > 0) {
@@ -169,6 +259,7 @@ class MessageOverlay {
     createMessageElement(messageData) {
         const messageDiv = document.createElement('div');
         messageDiv.className = 'message-overlay';
+        messageDiv.dataset.messageId = messageData.id;
         
         // Determinar tipo de mensagem
         const messageType = this.getMessageType(messageData);
@@ -190,8 +281,9 @@ class MessageOverlay {
         }
         
         messageDiv.innerHTML = `
-            <div class="message-header">
+            <div class="message-header" data-message-id="${this.escapeHtml(String(messageData.id))}">
                 <span class="message-author">${this.escapeHtml(messageData.name)}</span>
+                <span class="message-count"${messageData.count > 1 ? '' : ' hidden'}>x${messageData.count || 1}</span>
                 <span class="message-time">${timeString}</span>
             </div>
             <div class="message-content">${this.escapeHtml(content)}</div>
@@ -219,6 +311,22 @@ class MessageOverlay {
         return 'normal';
     }
     
+    updateMergedCount(messageId, count) {
+        // Mensagem ainda na fila
+        this.messageQueue.forEach(message => {
+            if (message.id === messageId) {
+                message.count = count;
+            }
+        });
+        
+        // Mensagem em exibição
+        const element = document.querySelector(`.message-header[data-message-id="${messageId}"] .message-count`);
+        if (element) {
+            element.textContent = `x${count}`;
+            element.hidden = false;
+        }
+    }
+    
     hideMessage(messageElement) {
         messageElement.classList.add('hide');
         
@@ -0,0 +1,63 @@
+"""
+Fixtures compartilhadas: aplicação Flask mínima com os modelos de enquete do main_original
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+def load_poll_models(db):
+    """Executar as classes Poll, PollOption e PollSchedule do main_original sobre `db`"""
+    with open(os.path.join(ROOT, 'src', 'main_original.py'), encoding='utf-8') as source:
+        code = source.read()
+    code = code[code.index('class Poll(db.Model)'):code.index('class Screenshot(db.Model)')]
+    namespace = {'db': db, 'datetime': datetime, 'json': json}
+    exec(code, namespace)
+    return namespace['Poll'], namespace['PollOption'], namespace['PollSchedule']
+
+class PollApp:
+    """Aplicação, banco e modelos de enquete de um teste"""
+
+    def __init__(self, path):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+        self.db = SQLAlchemy(self.app)
+        self.Poll, self.PollOption, self.PollSchedule = load_poll_models(self.db)
+        with self.app.app_context():
+            self.db.create_all()
+
+class RecordingSocketIO:
+    """Socket.IO falso que guarda os eventos emitidos"""
+
+    async_mode = 'threading'
+
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data=None, **kwargs):
+        self.emitted.append((event, data, kwargs.get('room')))
+
+    def start_background_task(self, target, *args):
+        import threading
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        return thread
+
+    def sleep(self, seconds):
+        import time
+        time.sleep(seconds)
+
+    def events(self, name):
+        return [data for event, data, _ in self.emitted if event == name]
+
+@pytest.fixture
+def poll_app(tmp_path):
+    return PollApp(tmp_path / 'polls.db')
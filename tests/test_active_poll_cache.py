@@ -0,0 +1,44 @@
+"""
+Testes do cache da enquete ativa
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services.active_poll_cache import ActivePollCache
+
+def test_publish_wakes_every_waiter():
+    cache = ActivePollCache()
+    since = cache.version
+    results = []
+
+    def wait():
+        started = time.monotonic()
+        results.append((cache.wait(since, timeout=5), time.monotonic() - started))
+
+    waiters = [threading.Thread(target=wait) for _ in range(8)]
+    for waiter in waiters:
+        waiter.start()
+    time.sleep(0.05)
+    cache.publish({'id': 1, 'question': 'Q'})
+    for waiter in waiters:
+        waiter.join()
+
+    assert len(results) == 8
+    assert all(changed and elapsed < 1 for changed, elapsed in results)
+
+def test_wait_times_out_without_publish():
+    cache = ActivePollCache()
+    started = time.monotonic()
+    assert not cache.wait(cache.version, timeout=0.2)
+    assert 0.15 < time.monotonic() - started < 1
+
+def test_unchanged_publish_keeps_version():
+    cache = ActivePollCache()
+    version = cache.publish({'id': 1})
+    assert cache.publish({'id': 1}) == version
+    assert cache.wait(version - 1, timeout=0)
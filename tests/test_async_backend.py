@@ -0,0 +1,66 @@
+"""
+Testes dos backends de concorrência
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+eventlet = pytest.importorskip('eventlet')
+
+from services.async_backend import select_backend
+
+class EventletSocketIO:
+    """Socket.IO mínimo em modo eventlet, sem monkey patching (como o app)"""
+
+    async_mode = 'eventlet'
+
+    def start_background_task(self, target, *args):
+        return eventlet.spawn(target, *args)
+
+    def sleep(self, seconds):
+        eventlet.sleep(seconds)
+
+def test_wakeup_set_from_os_thread_reaches_the_hub():
+    backend = select_backend(EventletSocketIO())
+    wakeup = backend.make_wakeup()
+    woke = []
+
+    def worker():
+        started = time.monotonic()
+        woke.append((wakeup.wait(), time.monotonic() - started))
+
+    green = eventlet.spawn(worker)
+    eventlet.sleep(0.05)
+
+    # Thread do sistema, como o Whisper chamando event_queue.add_event
+    thread = threading.Thread(target=lambda: (time.sleep(0.1), wakeup.set()))
+    thread.start()
+    with eventlet.Timeout(5):
+        green.wait()
+    thread.join()
+
+    assert woke and woke[0][0]
+    assert woke[0][1] < 1
+
+def test_hub_calls_run_directly_and_os_thread_calls_are_relayed():
+    backend = select_backend(EventletSocketIO())
+    calls = []
+
+    backend.call_on_hub(calls.append, 'hub')
+    assert calls == ['hub']
+
+    hub_thread = threading.get_ident()
+    seen = []
+    thread = threading.Thread(target=backend.call_on_hub, args=(lambda: seen.append(threading.get_ident()),))
+    thread.start()
+    thread.join()
+    with eventlet.Timeout(5):
+        while not seen:
+            eventlet.sleep(0.01)
+    assert seen == [hub_thread]
@@ -0,0 +1,57 @@
+"""
+Testes do agendador de exibição
+"""
+
+import os
+import sys
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services.display_scheduler import DisplayScheduler
+
+class StalledWriter:
+    """MessageWriter cujo flush não conseguiu gravar as linhas pendentes"""
+
+    def __init__(self, pending):
+        self.pending = set(pending)
+
+    def flush(self):
+        return 0
+
+    def pending_ids(self):
+        return set(self.pending)
+
+def test_marks_wait_for_rows_still_in_the_writer(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    db = SQLAlchemy(app)
+
+    class Message(db.Model):
+        __tablename__ = 'messages'
+        id = db.Column(db.Integer, primary_key=True)
+        displayed = db.Column(db.Boolean, default=False)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(Message(id=1))
+        db.session.commit()
+
+    writer = StalledWriter(pending=[2])
+    scheduler = DisplayScheduler(app, db, Message, writer=writer)
+    scheduler.displayed_ids = [1, 2, 3]
+
+    assert scheduler.flush() == 1
+    assert scheduler.displayed_ids == [2]
+
+    with app.app_context():
+        db.session.add(Message(id=2))
+        db.session.commit()
+    writer.pending.clear()
+
+    assert scheduler.flush() == 1
+    assert scheduler.displayed_ids == []
+    with app.app_context():
+        assert db.session.execute(db.select(Message.id).where(Message.displayed)).scalars().all() == [1, 2]
@@ -0,0 +1,44 @@
+"""
+Testes do filtro de mensagens quase duplicadas
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services.duplicate_filter import DuplicateFilter, normalize_text
+
+def test_normalization_folds_accents_punctuation_and_repeats():
+    assert normalize_text('GOOOOL!!! É campeão') == 'gool e campeao'
+    assert normalize_text('kkkkkkk') == normalize_text('kkk')
+
+def test_near_copies_merge_into_the_original():
+    duplicates = DuplicateFilter()
+    original = duplicates.register('que golaço do time hoje pessoal', {'id': 1})
+
+    assert duplicates.find('QUE GOLAÇO do time hoje, pessoal!!!') is original
+    assert duplicates.find('que golaço do time hoje pessoall') is original
+    assert duplicates.find('alguém sabe que horas começa o segundo tempo') is None
+    assert duplicates.merge(original) == 2
+
+def test_short_texts_need_an_exact_match():
+    duplicates = DuplicateFilter()
+    duplicates.register('oi', {'id': 1})
+
+    assert duplicates.find('Oi!') is not None
+    assert duplicates.find('oii') is None
+
+def test_window_evicts_by_size_and_age():
+    duplicates = DuplicateFilter()
+    duplicates.max_entries = 2
+    for index, text in enumerate(('primeira mensagem do chat', 'segunda mensagem do chat', 'terceira mensagem do chat')):
+        duplicates.register(text, {'id': index})
+    assert duplicates.find('primeira mensagem do chat') is None
+    assert duplicates.find('terceira mensagem do chat') is not None
+
+    duplicates = DuplicateFilter()
+    duplicates.window_seconds = 0
+    duplicates.register('mensagem que expira na hora', {'id': 9})
+    assert duplicates.find('mensagem que expira na hora') is None
+    assert all(not bucket for band in duplicates.bands for bucket in band.values())
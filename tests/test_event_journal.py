@@ -0,0 +1,75 @@
+"""
+Testes do journal durável da fila de eventos
+"""
+
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services.event_journal import EventJournal
+from services.event_queue import EventQueue
+
+def make_event(index, event_type='message'):
+    return {
+        'id': f'{event_type}_{index}',
+        'type': event_type,
+        'priority': None,
+        'data': {'id': index, 'name': f'user{index}', 'content': 'oi'},
+        'timestamp': datetime(2026, 1, 1, 0, 0, index)
+    }
+
+def open_journal(path):
+    journal = EventJournal(str(path))
+    journal.flush_interval = 60
+    journal.start()
+    return journal
+
+def test_restart_returns_only_unfinished_events(tmp_path):
+    path = tmp_path / 'journal.db'
+    journal = open_journal(path)
+    for index in range(1, 6):
+        journal.record(f'message_{index}', 'enqueue', make_event(index))
+    journal.record('message_1', 'dispatch')
+    journal.record('message_1', 'complete')
+    journal.record('message_2', 'dropped')
+    journal.record('message_3', 'dispatch')
+    journal.flush()
+    journal._compact()
+
+    # Queda: transições ainda no buffer não chegam ao disco
+    journal.is_running = False
+    journal.flush_event.set()
+    journal.worker_thread.join(timeout=5)
+    journal.record('message_4', 'complete')
+    journal.connection.close()
+
+    restarted = open_journal(path)
+    try:
+        unfinished = restarted.unfinished()
+        assert [event['id'] for event in unfinished] == ['message_3', 'message_4', 'message_5']
+        assert unfinished[0]['data'] == {'id': 3, 'name': 'user3', 'content': 'oi'}
+        assert unfinished[0]['created_at'] == '2026-01-01T00:00:03'
+    finally:
+        restarted.stop()
+
+def test_attach_requeues_recovered_events(tmp_path):
+    journal = open_journal(tmp_path / 'journal.db')
+    journal.record('poll_1', 'enqueue', make_event(1, 'poll'))
+    journal.record('message_2', 'enqueue', make_event(2))
+    journal.flush()
+
+    queue = EventQueue()
+    with queue.lock:
+        queue.worker_generation += 1
+    queue.wakeup.set()
+    try:
+        queue.attach_journal(journal)
+        assert queue.pending_count == 2
+        queued = {event['id']: event for events in queue.lanes.values() for event in events}
+        assert set(queued) == {'poll_1', 'message_2'}
+        assert queued['message_2']['timestamp'] == datetime(2026, 1, 1, 0, 0, 2)
+        assert queue.shed_count == 1
+    finally:
+        journal.stop()
@@ -0,0 +1,184 @@
+"""
+Testes da fila de eventos
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services.display_scheduler import DisplayScheduler
+from services.event_queue import EventQueue
+
+from conftest import RecordingSocketIO
+
+def test_messages_complete_without_socketio():
+    queue = EventQueue()
+    queue.event_delay = 0
+    for index in range(5):
+        queue.add_event('message', {'id': index, 'name': 'user', 'content': 'oi'})
+    queue.start_worker()
+
+    deadline = time.monotonic() + 5
+    while queue.throughput.total < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    queue.running = False
+    queue.wakeup.set()
+
+    assert queue.throughput.total == 5
+    assert queue.busy_until['overlay_messages'] <= time.monotonic()
+
+def test_cards_carry_merged_counts():
+    socketio = RecordingSocketIO()
+    queue = EventQueue(socketio)
+    message = {'id': 1, 'name': 'user', 'content': 'gol', 'created_at': '2026-01-01T00:00:00'}
+    event = {'type': 'message', 'data': message, 'id': 'message_1', 'enqueued_at': time.monotonic()}
+
+    # Cópias somadas enquanto a mensagem esperava na fila
+    message['merged_count'] = 12
+    queue._process_message_batch([event], 5.0)
+
+    card = socketio.events('overlay_message')[0]
+    assert card['messages'][0]['merged_count'] == 12
+    assert card['merged_count'] == 12
+
+def paused_queue(capacity, policy):
+    """Fila sem worker: os eventos ficam parados esperando descarte"""
+    queue = EventQueue()
+    with queue.lock:
+        queue.worker_generation += 1
+    queue.wakeup.set()
+    queue.capacity = capacity
+    queue.shedding_policy = policy
+    return queue
+
+def test_shed_messages_leave_display_scheduler():
+    scheduler = DisplayScheduler(None, None, None)
+    queue = paused_queue(2, 'drop_oldest')
+    queue.message_displayed_callback = scheduler.mark_displayed
+
+    for index in range(1, 6):
+        message = {'id': index, 'name': f'user{index}', 'content': 'oi', 'created_at': f'2026-01-01T00:00:0{index}'}
+        scheduler.push(message)
+        queue.add_event('message', message)
+
+    # Ficam só as duas mais novas; as descartadas não seguem pendentes
+    assert queue.pending_count == 2
+    assert queue.dropped_by_type == {'message': 3}
+    assert sorted(scheduler.pending) == [4, 5]
+    assert scheduler.displayed_ids == [1, 2, 3]
+    assert scheduler.get_next()['id'] == 4
+
+def test_refused_message_is_marked_too():
+    dropped = []
+    queue = paused_queue(1, 'drop_newest')
+    queue.message_displayed_callback = dropped.append
+
+    assert queue.add_event('message', {'id': 1, 'name': 'a', 'content': 'oi'})
+    assert queue.add_event('message', {'id': 2, 'name': 'b', 'content': 'oi'}) is None
+    assert dropped == [2]
+
+def test_display_heap_is_compacted():
+    scheduler = DisplayScheduler(None, None, None)
+    scheduler.compact_slack = 4
+    for index in range(100):
+        scheduler.push({'id': index, 'created_at': f'2026-01-01T00:{index // 60:02d}:{index % 60:02d}'})
+    for index in range(100):
+        if index % 5:
+            scheduler.mark_displayed(index)
+
+    assert len(scheduler.pending) == 20
+    assert len(scheduler.heap) <= 2 * len(scheduler.pending) + scheduler.compact_slack
+    assert [scheduler.pop_next()['id'] for _ in range(3)] == [0, 5, 10]
+
+def test_lanes_follow_priority_then_aging():
+    queue = paused_queue(0, 'drop_oldest')
+    queue.add_event('message', {'id': 1, 'name': 'a'})
+    queue.add_event('screenshot', {})
+    queue.add_event('live_update', {})
+    queue.add_event('message', {'id': 2, 'name': 'b'}, priority=0)
+
+    with queue.lock:
+        order = [queue._pop_next_event(time.monotonic()) for _ in range(4)]
+    # Prioridade explícita vale para o evento; empate na prioridade segue a chegada
+    assert [(event['type'], event['data'].get('id')) for event in order] == [
+        ('live_update', None), ('message', 2), ('screenshot', None), ('message', 1)
+    ]
+
+    # Cada aging_interval de espera desconta um nível
+    queue.add_event('message', {'id': 3, 'name': 'c'})
+    queue.add_event('poll', {})
+    with queue.lock:
+        queue.lanes[('message', None)][0]['enqueued_at'] -= 2.5 * queue.aging_interval
+        assert queue._pop_next_event(time.monotonic())['type'] == 'message'
+
+def test_timers_fire_by_deadline_while_events_flow():
+    queue = EventQueue()
+    fired = []
+    queue.schedule(0.2, fired.append, 'tarde')
+    queue.schedule(0.05, fired.append, 'cedo')
+    queue.add_event('live_update', {'status': 'on'})
+
+    deadline = time.monotonic() + 5
+    while len(fired) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    queue.running = False
+    queue.wakeup.set()
+
+    # O evento sem canal sai na hora, sem esperar os prazos
+    assert fired == ['cedo', 'tarde']
+    assert queue.throughput_by_type['live_update'].total == 1
+
+def test_busy_channel_does_not_hold_the_other():
+    queue = paused_queue(0, 'drop_oldest')
+    queue.add_event('message', {'id': 1, 'name': 'a'})
+    queue.add_event('poll', {'question': 'Quem ganha?'})
+
+    now = time.monotonic()
+    with queue.lock:
+        queue.busy_until['overlay_messages'] = now + 60
+        assert queue._pop_next_event(now)['type'] == 'poll'
+        assert queue._pop_next_event(now) is None
+
+        queue.busy_until['overlay_messages'] = now
+        assert queue._pop_next_event(now)['type'] == 'message'
+
+def test_message_pacing_shrinks_then_batches_to_meet_the_slo():
+    queue = paused_queue(0, 'drop_oldest')
+    queue.adaptive_messages = True
+    queue.max_time_to_screen = 120
+    queue.message_display_time = 8
+    queue.min_message_display_time = 3
+    queue.max_messages_per_card = 5
+    queue.event_delay = 1
+    now = time.monotonic()
+
+    assert queue._plan_message_display(10, now) == (1, 8)
+    assert queue._plan_message_display(40, now) == (2, 5)
+    assert queue._plan_message_display(1000, now) == (5, 3)
+
+    queue.adaptive_messages = False
+    assert queue._plan_message_display(1000, now) == (1, 8)
+
+def test_snapshot_follows_the_card_on_screen():
+    socketio = RecordingSocketIO()
+    queue = paused_queue(0, 'drop_oldest')
+    queue.socketio = socketio
+    message = {'id': 1, 'name': 'user', 'content': 'oi', 'created_at': '2026-01-01T00:00:00'}
+    event = {'type': 'message', 'data': message, 'id': 'message_1', 'enqueued_at': time.monotonic()}
+
+    assert queue.get_now_showing('overlay_messages') is None
+    queue._process_message_batch([event], 5.0)
+
+    snapshot = queue.get_now_showing('overlay_messages')
+    assert snapshot['event_name'] == 'overlay_message'
+    assert snapshot['event'] == socketio.events('overlay_message')[0]
+    assert 4.5 < snapshot['remaining'] <= 5.0
+    assert queue.get_now_showing('overlay_polls') is None
+
+    # Fim de outro card não apaga o atual; o fim deste apaga
+    queue._unshow('overlay_messages', 'message_0')
+    assert queue.get_now_showing('overlay_messages') is not None
+    queue._end_message_event([event], 'message_1')
+    assert queue.get_now_showing('overlay_messages') is None
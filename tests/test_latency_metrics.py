@@ -0,0 +1,57 @@
+"""
+Testes dos histogramas de latência e contadores de vazão
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services import latency_metrics
+from services.latency_metrics import LatencyHistogram, ThroughputCounter, _bucket_index, _bucket_value
+
+class FakeClock:
+    """Substitui o módulo time só dentro de latency_metrics"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+def test_buckets_bound_the_relative_error():
+    for ms in list(range(0, 2000)) + [10 ** 5, 10 ** 6, 3 * 10 ** 6]:
+        upper = _bucket_value(_bucket_index(ms))
+        assert ms <= upper <= ms + ms / 16 + 1
+
+def test_percentiles_window_and_all_time(monkeypatch):
+    clock = FakeClock(600.0)
+    monkeypatch.setattr(latency_metrics, 'time', clock)
+    histogram = LatencyHistogram(window_minutes=2)
+    for ms in range(1, 101):
+        histogram.record(ms / 1000)
+
+    summary = histogram.snapshot()['last_2min']
+    assert summary['count'] == 100
+    assert 50 <= summary['p50'] <= 53
+    assert 90 <= summary['p90'] <= 95
+    assert 99 <= summary['p99'] <= 103
+
+    # Fora da janela só o acumulado lembra
+    clock.now += 180
+    snapshot = histogram.snapshot()
+    assert snapshot['last_2min']['count'] == 0
+    assert snapshot['all_time']['count'] == 100
+    assert snapshot['all_time']['max'] == 100
+
+def test_throughput_counts_only_complete_seconds(monkeypatch):
+    clock = FakeClock(1000.0)
+    monkeypatch.setattr(latency_metrics, 'time', clock)
+    counter = ThroughputCounter(window_seconds=60)
+    for _ in range(10):
+        counter.record(5)
+        clock.now += 1
+
+    counter.record(100)  # Segundo em andamento não entra na média
+    assert counter.rate(10) == 5.0
+    assert counter.snapshot()['total'] == 150
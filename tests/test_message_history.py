@@ -0,0 +1,63 @@
+"""
+Testes do histórico paginado por cursor
+"""
+
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services.message_history import InvalidCursorError, MessageHistoryService
+
+@pytest.fixture
+def history(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'history.db'}"
+    db = SQLAlchemy(app)
+
+    class Message(db.Model):
+        __tablename__ = 'messages'
+        __table_args__ = (db.Index('ix_messages_created_at_id', 'created_at', 'id'),)
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(50))
+        content = db.Column(db.Text)
+        displayed = db.Column(db.Boolean, default=False)
+        created_at = db.Column(db.DateTime)
+
+    with app.app_context():
+        db.create_all()
+        # Mensagens 2, 3 e 4 no mesmo instante: o id desempata
+        for message_id, second in ((1, 1), (2, 2), (3, 2), (4, 2), (5, 3)):
+            db.session.add(Message(id=message_id, name='user', content='oi', created_at=datetime(2026, 1, 1, 0, 0, second)))
+        db.session.commit()
+
+    service = MessageHistoryService(app, db, Message)
+    service.context = app.app_context
+    return service
+
+def test_pages_walk_every_message_once(history):
+    seen = []
+    cursor = None
+    with history.context():
+        while True:
+            page = history.get_page(cursor, limit=2)
+            seen.extend(message['id'] for message in page['messages'])
+            cursor = page['next_cursor']
+            if not page['has_more']:
+                assert cursor is None
+                break
+
+    assert seen == [5, 4, 3, 2, 1]
+
+def test_bad_cursor_is_rejected(history):
+    cursor = history.encode_cursor(datetime(2026, 1, 1), 7)
+    assert history.decode_cursor(cursor) == (datetime(2026, 1, 1), 7)
+
+    with history.context():
+        with pytest.raises(InvalidCursorError):
+            history.get_page('não-é-cursor')
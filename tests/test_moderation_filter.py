@@ -0,0 +1,49 @@
+"""
+Testes do filtro de moderação
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services.moderation_filter import ModerationFilter
+
+def make_filter(tmp_path, *lines):
+    path = tmp_path / 'blocklist.txt'
+    path.write_text('\n'.join(('# comentário',) + lines) + '\n', encoding='utf-8')
+    moderation = ModerationFilter(str(path))
+    moderation.reload_interval = 0
+    return moderation, path
+
+def test_blocklist_matches_accents_leet_and_repeats(tmp_path):
+    moderation, _ = make_filter(tmp_path, 'merda', 'bosta', 'pão duro')
+
+    for text in ('que MERDA', 'm3rd4aaa', 'b0$ta', 'pao duro demais'):
+        verdict = moderation.check(text)
+        assert not verdict['allowed'], text
+        assert verdict['category'] == 'blocklist'
+    # Palavra que só contém o termo não é bloqueada
+    assert moderation.check('bostanica')['allowed']
+    assert moderation.check('oi', 'tudo bem?')['allowed']
+
+def test_doxxing_patterns_are_categorized(tmp_path):
+    moderation, _ = make_filter(tmp_path)
+
+    assert moderation.check('meu cpf 123.456.789-09')['category'] == 'cpf'
+    assert moderation.check('liga (11) 91234-5678')['category'] == 'telefone'
+    assert moderation.check('fulano@exemplo.com.br')['category'] == 'email'
+    assert moderation.check('cep 01310-100')['category'] == 'cep'
+
+def test_unsafe_or_broken_raw_regex_keeps_the_rest(tmp_path):
+    moderation, path = make_filter(tmp_path, 're:(?i)spam+', 're:(a)\\1', 're:[quebrada', 'bosta')
+
+    assert moderation.check('SPAMMM')['category'] == 'regex'
+    assert moderation.check('aa')['allowed']
+    assert not moderation.check('bosta')['allowed']
+
+    # Arquivo salvo de novo é recompilado sem reiniciar
+    path.write_text('chato\n', encoding='utf-8')
+    os.utime(path, (1, 1))
+    assert not moderation.check('que chato')['allowed']
+    assert moderation.check('bosta')['allowed']
@@ -0,0 +1,70 @@
+"""
+Testes da transmissão agregada de resultados de enquete
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services import active_poll_cache as active_poll_cache_module
+from services.active_poll_cache import ActivePollCache
+from services.poll_broadcaster import PollBroadcaster
+
+from conftest import RecordingSocketIO
+
+class FakeCounter:
+    """Contador com os votos definidos pelo teste"""
+
+    def __init__(self):
+        self.votes = {}
+
+    def get_poll_dict(self, poll_id):
+        votes = self.votes.get(poll_id)
+        if votes is None:
+            return None
+        return {'id': poll_id, 'votes': dict(votes), 'total_votes': sum(votes.values())}
+
+def test_ticks_send_only_changed_options(monkeypatch):
+    monkeypatch.setattr(active_poll_cache_module, 'active_poll_cache', ActivePollCache())
+    socketio = RecordingSocketIO()
+    counter = FakeCounter()
+    broadcaster = PollBroadcaster(socketio, counter, rooms=['overlay_polls', 'polls'])
+
+    counter.votes[1] = {'a': 0, 'b': 0}
+    broadcaster.set_poll(1)
+    assert broadcaster.tick() == 1
+
+    # Muitos votos entre dois ticks viram um delta só
+    for _ in range(50):
+        counter.votes[1]['a'] += 1
+        broadcaster.mark_dirty(1)
+    assert broadcaster.tick() == 1
+    assert broadcaster.tick() == 0
+
+    # Marcada sem mudança não emite
+    broadcaster.mark_dirty(1)
+    assert broadcaster.tick() == 0
+
+    deltas = socketio.events('poll_delta')
+    assert len(deltas) == 4  # 2 deltas x 2 salas
+    last = deltas[-1]
+    assert last == {'poll_id': 1, 'version': 2, 'votes': {'a': 50}, 'total_votes': 50}
+    assert broadcaster.snapshot() == dict(counter.get_poll_dict(1), version=2)
+    assert active_poll_cache_module.active_poll_cache.poll_data['votes'] == {'a': 50, 'b': 0}
+
+def test_new_poll_restarts_versions():
+    counter = FakeCounter()
+    broadcaster = PollBroadcaster(RecordingSocketIO(), counter, rooms=['polls'])
+    counter.votes[1] = {'a': 3}
+    counter.votes[2] = {'x': 1}
+    broadcaster.set_poll(1)
+    broadcaster.tick()
+
+    broadcaster.set_poll(2)
+    assert broadcaster.snapshot()['version'] == 0
+    broadcaster.tick()
+    assert broadcaster.snapshot() == {'id': 2, 'votes': {'x': 1}, 'total_votes': 1, 'version': 1}
+
+    broadcaster.close_poll()
+    assert broadcaster.snapshot() is None
@@ -0,0 +1,66 @@
+"""
+Testes do motor de enquetes com opções normalizadas
+"""
+
+import pytest
+
+from services import poll_broadcaster as poll_broadcaster_module
+from services import vote_counter as vote_counter_module
+from services import vote_timeseries as vote_timeseries_module
+from services import voter_registry as voter_registry_module
+from services.poll_engine import PollEngine, option_key
+
+@pytest.fixture
+def engine(poll_app, monkeypatch):
+    # Sem os serviços globais de outros testes
+    for module, name in ((vote_counter_module, 'vote_counter'), (voter_registry_module, 'voter_registry'),
+                         (poll_broadcaster_module, 'poll_broadcaster'), (vote_timeseries_module, 'vote_timeseries')):
+        monkeypatch.setattr(module, name, None)
+    return PollEngine(poll_app.app, poll_app.db, poll_app.Poll, poll_app.PollOption)
+
+def test_option_keys_continue_after_z():
+    assert [option_key(index) for index in (0, 1, 25, 26, 27, 51, 52)] == ['a', 'b', 'z', 'aa', 'ab', 'az', 'ba']
+
+def test_any_number_of_options_and_cached_increments(poll_app, engine):
+    options = [f'Opção {index}' for index in range(6)]
+    with poll_app.app.app_context():
+        first = engine.open_poll('Primeira?', ['sim', 'não']).id
+        poll_id = engine.open_poll('  Qual a melhor?  ', options + ['  ']).id
+        assert not poll_app.Poll.query.get(first).active
+
+    data = engine.get_poll_dict(poll_id)
+    assert data['question'] == 'Qual a melhor?'
+    assert list(data['options']) == ['a', 'b', 'c', 'd', 'e', 'f']
+    assert engine.get_poll_dict(first) is None
+
+    deltas = {(poll_id, 'f'): 3, (poll_id, 'a'): 1}
+    engine.increment(deltas)
+    engine.apply_cached(deltas)
+    assert engine.get_poll_dict(poll_id)['votes'] == {'a': 1, 'b': 0, 'c': 0, 'd': 0, 'e': 0, 'f': 3}
+    assert engine.get_poll_dict(poll_id)['total_votes'] == 4
+
+    # O banco tem os mesmos totais que o cache
+    engine.cache.clear()
+    assert engine.get_poll_dict(poll_id)['votes']['f'] == 3
+
+def test_legacy_poll_gets_option_rows(poll_app, engine):
+    with poll_app.app.app_context():
+        poll = poll_app.Poll(question='Antiga?', option_a='x', option_b='y', votes_a=4, votes_b=1, active=True)
+        poll_app.db.session.add(poll)
+        poll_app.db.session.commit()
+        poll_id = poll.id
+
+    assert engine.get_poll_dict(poll_id)['votes'] == {'a': 4, 'b': 1}
+    with poll_app.app.app_context():
+        rows = poll_app.PollOption.query.filter_by(poll_id=poll_id).order_by(poll_app.PollOption.option_key).all()
+        assert [(row.option_key, row.option_text, row.votes) for row in rows] == [('a', 'x', 4), ('b', 'y', 1)]
+
+@pytest.mark.parametrize('question, options', [
+    ('', ['a', 'b']),
+    ('Só uma?', ['a', '   ']),
+    ('Demais?', [str(index) for index in range(27)]),
+    ('Longa?', ['a', 'x' * 101])
+])
+def test_invalid_polls_are_refused(question, options):
+    with pytest.raises(ValueError):
+        PollEngine.clean(question, options)
@@ -0,0 +1,57 @@
+"""
+Testes da agenda de enquetes
+"""
+
+from services import poll_engine as poll_engine_module
+from services import vote_counter as vote_counter_module
+from services.poll_engine import PollEngine
+from services.poll_scheduler import PollScheduler, OPEN
+from services.vote_counter import VoteCounter
+
+from conftest import RecordingSocketIO
+
+def make_scheduler(poll_app, socketio, poll_source=None):
+    engine = PollEngine(poll_app.app, poll_app.db, poll_app.Poll, poll_app.PollOption)
+    counter = VoteCounter(engine)
+    # O motor encerra enquetes pelo contador global
+    vote_counter_module.vote_counter = counter
+    poll_engine_module.poll_engine = engine
+    return PollScheduler(
+        poll_app.app, poll_app.db, socketio, poll_app.PollSchedule, engine, counter,
+        poll_source=poll_source
+    ), counter
+
+def test_poll_ended_carries_totals_written_at_close(poll_app):
+    socketio = RecordingSocketIO()
+    scheduler, counter = make_scheduler(poll_app, socketio)
+
+    poll = scheduler.open_now('Qual?', ['Sim', 'Não'], open_seconds=60, reveal_seconds=5)
+    for option in ('a', 'a', 'b'):
+        counter.vote(poll['id'], option)
+
+    scheduler._close(scheduler.current_id, announce=True)
+
+    ended = socketio.events('poll_ended')[-1]
+    assert ended['votes'] == {'a': 2, 'b': 1}
+    assert ended['active'] is False
+    with poll_app.app.app_context():
+        rows = poll_app.PollOption.query.filter_by(poll_id=poll['id']).all()
+        assert {row.option_key: row.votes for row in rows} == {'a': 2, 'b': 1}
+
+def test_stage_auto_keeps_a_single_auto_entry(poll_app):
+    scheduler, _ = make_scheduler(poll_app, RecordingSocketIO())
+    scheduler.open_now('No ar', ['x', 'y'], open_seconds=60)
+
+    assert scheduler.stage_auto({'question': 'Auto 1', 'options': ['a', 'b']})
+    assert scheduler.stage_auto({'question': 'Auto 2', 'options': ['a', 'b']}) is None
+    assert [entry['question'] for entry in scheduler.get_status()['queue']] == ['Auto 1']
+
+def test_restart_resumes_the_open_entry(poll_app):
+    scheduler, _ = make_scheduler(poll_app, RecordingSocketIO())
+    scheduler.open_now('Retomar', ['x', 'y'], open_seconds=60)
+
+    restarted, _ = make_scheduler(poll_app, RecordingSocketIO())
+    restarted._recover()
+    assert restarted.current_id == scheduler.current_id
+    assert restarted.status == OPEN
+    assert 55 < restarted._seconds_until(restarted.reveal_at) <= 60
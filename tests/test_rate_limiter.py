@@ -0,0 +1,44 @@
+"""
+Testes do limitador de taxa
+"""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services.rate_limiter import RateLimiter
+
+def test_rejection_does_not_spend_the_other_bucket():
+    limiter = RateLimiter()
+    limiter.set_rule('vote_poll', 'ip', '2/1000')
+    limiter.set_rule('vote_poll', 'sid', '1/1000')
+
+    assert limiter.check('vote_poll', ip='1.1.1.1', sid='s1') == (True, 0)
+    for _ in range(5):
+        allowed, retry_after = limiter.check('vote_poll', ip='1.1.1.1', sid='s1')
+        assert not allowed and retry_after >= 1
+
+    # O IP ainda tem o segundo token: as recusas pelo sid não o consumiram
+    assert limiter.check('vote_poll', ip='1.1.1.1', sid='s2') == (True, 0)
+    assert not limiter.check('vote_poll', ip='1.1.1.1', sid='s3')[0]
+
+def test_concurrent_checks_never_exceed_capacity():
+    limiter = RateLimiter()
+    limiter.set_rule('send_message', 'ip', '100/1000')
+    limiter.set_rule('send_message', 'sid', '0/1')
+    results = []
+
+    def hammer():
+        for _ in range(50):
+            results.append(limiter.check('send_message', ip='2.2.2.2')[0])
+
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 100
+    assert limiter.total_allowed + limiter.total_rejected == 400
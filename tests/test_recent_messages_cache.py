@@ -0,0 +1,38 @@
+"""
+Testes do cache de mensagens recentes
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services.recent_messages_cache import RecentMessagesCache
+
+def test_ring_keeps_the_newest_oldest_first():
+    cache = RecentMessagesCache(capacity=3)
+    for index in range(1, 6):
+        cache.add({'id': index, 'content': 'oi'})
+
+    _, body = cache.get_json(10)
+    data = json.loads(body)
+    assert [message['id'] for message in data['messages']] == [3, 4, 5]
+    assert data['count'] == 3
+
+    _, body = cache.get_json(2)
+    assert [message['id'] for message in json.loads(body)['messages']] == [4, 5]
+
+def test_version_changes_only_with_content():
+    cache = RecentMessagesCache()
+    cache.add({'id': 1, 'content': 'oi'})
+    version, body = cache.get_json(50)
+    assert cache.get_json(50) == (version, body)
+
+    assert cache.update(1, merged_count=3)
+    updated_version, updated_body = cache.get_json(50)
+    assert updated_version > version
+    assert json.loads(updated_body)['messages'][0]['merged_count'] == 3
+
+    assert not cache.update(99, merged_count=2)
+    assert cache.get_json(50)[0] == updated_version
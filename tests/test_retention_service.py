@@ -0,0 +1,74 @@
+"""
+Testes do job de retenção
+"""
+
+import gzip
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services.retention_service import RetentionService
+
+def make_service(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'retention.db'}"
+    db = SQLAlchemy(app)
+
+    class LiveSession(db.Model):
+        __tablename__ = 'live_sessions'
+        id = db.Column(db.Integer, primary_key=True)
+        active = db.Column(db.Boolean, default=False)
+        created_at = db.Column(db.DateTime)
+
+    class Message(db.Model):
+        __tablename__ = 'messages'
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(50))
+        content = db.Column(db.Text)
+        displayed = db.Column(db.Boolean, default=False)
+        created_at = db.Column(db.DateTime)
+
+    with app.app_context():
+        db.create_all()
+
+    service = RetentionService(app, db)
+    service.archive_dir = str(tmp_path / 'archives')
+    service.chunk_size = 2
+    service.chunk_pause = 0
+    return service, app, db, Message, LiveSession
+
+def read_archive(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        return [json.loads(line) for line in archive]
+
+def test_archives_displayed_messages_per_live_in_chunks(tmp_path):
+    service, app, db, Message, LiveSession = make_service(tmp_path)
+    old = datetime.utcnow() - timedelta(days=30)
+    with app.app_context():
+        db.session.add_all([
+            LiveSession(id=1, active=False, created_at=old),
+            LiveSession(id=2, active=True, created_at=old + timedelta(hours=2))
+        ])
+        for index in range(5):
+            db.session.add(Message(
+                id=index + 1, name='user', content=f'm{index}', displayed=True,
+                created_at=old + timedelta(hours=index)
+            ))
+        db.session.add(Message(id=6, name='user', content='nunca exibida', displayed=False, created_at=old))
+        db.session.add(Message(id=7, name='user', content='recente', displayed=True, created_at=datetime.utcnow()))
+        db.session.commit()
+
+    assert service.archive_messages() == 5
+
+    with app.app_context():
+        assert sorted(row[0] for row in db.session.execute(db.select(Message.id))) == [6, 7]
+    first = read_archive(os.path.join(service.archive_dir, 'live_1', 'messages.ndjson.gz'))
+    second = read_archive(os.path.join(service.archive_dir, 'live_2', 'messages.ndjson.gz'))
+    assert [row['id'] for row in first] == [1, 2]
+    assert [row['id'] for row in second] == [3, 4, 5]
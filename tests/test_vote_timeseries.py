@@ -0,0 +1,48 @@
+"""
+Testes da série temporal de votos
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services.vote_timeseries import PollSeries, VoteTimeSeries
+
+def test_resampled_bins_and_cumulative_totals():
+    series = PollSeries(capacity=10, started=100)
+    series.record('a', 100)
+    series.record('a', 101, 2)
+    series.record('b', 103)
+    series.record('a', 105, 3)
+
+    data = series.query(points=3, now=105)
+    assert (data['start'], data['end'], data['bin_seconds'], data['points']) == (100, 105, 2, 3)
+    assert data['options']['a'] == {'votes': [3, 0, 3], 'cumulative': [3, 3, 6]}
+    assert data['options']['b'] == {'votes': [0, 1, 0], 'cumulative': [0, 1, 1]}
+
+    # Só os últimos segundos, com o que veio antes no acumulado
+    recent = series.query(points=10, seconds=2)
+    assert recent['options']['a'] == {'votes': [0, 3], 'cumulative': [3, 6]}
+
+def test_totals_stay_exact_after_the_ring_wraps():
+    series = PollSeries(capacity=10, started=100)
+    series.record('a', 100)
+    series.record('a', 105, 5)
+    series.record('a', 115)
+    series.record('a', 90)  # Atrasado: cai no segundo mais velho da janela
+
+    data = series.query(points=10)
+    assert data['start'] == 106
+    assert data['options']['a']['votes'] == [1] + [0] * 8 + [1]
+    assert data['options']['a']['cumulative'][-1] == 8
+
+def test_only_recent_polls_are_kept():
+    timeseries = VoteTimeSeries()
+    timeseries.max_polls = 2
+    for poll_id in (1, 2, 3):
+        timeseries.record(poll_id, 'a')
+
+    assert timeseries.query(1) is None
+    assert timeseries.query(3)['options']['a']['cumulative'][-1] == 1
+    assert timeseries.get_status()['polls'] == [2, 3]
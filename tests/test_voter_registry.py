@@ -0,0 +1,95 @@
+"""
+Testes do registro de eleitores
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from services.voter_registry import FingerprintSet, VoterRegistry, get_voter_keys
+
+class FakeRequest:
+    """Requisição mínima: cookies, cabeçalhos e IP"""
+
+    def __init__(self, cookies=None, headers=None, remote_addr='10.0.0.1'):
+        self.cookies = cookies or {}
+        self.headers = headers or {}
+        self.remote_addr = remote_addr
+        self.access_route = [remote_addr]
+
+def test_discard_keeps_probe_sequences():
+    rng = random.Random(7)
+    fingerprints = FingerprintSet(capacity=16)
+    expected = set()
+    for _ in range(5000):
+        fingerprint = rng.randrange(1, 200)
+        if rng.random() < 0.5:
+            assert fingerprints.add(fingerprint) == (fingerprint not in expected)
+            expected.add(fingerprint)
+        else:
+            assert fingerprints.discard(fingerprint) == (fingerprint in expected)
+            expected.discard(fingerprint)
+        assert len(fingerprints) == len(expected)
+
+    assert all(fingerprint in fingerprints for fingerprint in expected)
+    assert not any(fingerprint in fingerprints for fingerprint in range(1, 200) if fingerprint not in expected)
+
+def test_cookieless_votes_are_capped_per_client():
+    registry = VoterRegistry()
+    registry.cookieless_limit = 3
+    request = FakeRequest(headers={'User-Agent': 'Mozilla/5.0'})
+
+    # Pessoas diferentes na mesma rede e navegador ainda votam
+    for _ in range(3):
+        keys, new_cookie = get_voter_keys(request)
+        assert new_cookie
+        assert registry.register(1, keys)
+    assert not registry.register(1, get_voter_keys(request)[0])
+    assert registry.get_status()['total_cookieless_rejected'] == 1
+
+    # Outra enquete e outro IP têm contagem própria
+    assert registry.register(2, get_voter_keys(request)[0])
+    other = FakeRequest(headers={'User-Agent': 'Mozilla/5.0'}, remote_addr='10.0.0.2')
+    assert registry.register(1, get_voter_keys(other)[0])
+
+def test_unregister_returns_cookieless_slot():
+    registry = VoterRegistry()
+    registry.cookieless_limit = 1
+    request = FakeRequest()
+    keys = get_voter_keys(request)[0]
+    assert registry.register(1, keys)
+    assert not registry.register(1, get_voter_keys(request)[0])
+    registry.unregister(1, keys)
+    assert registry.register(1, get_voter_keys(request)[0])
+
+def test_issue_voter_cookie_only_when_missing():
+    from flask import Flask
+    from services.voter_registry import issue_voter_cookie
+
+    app = Flask(__name__)
+    with app.test_request_context('/'):
+        from flask import request
+        response = issue_voter_cookie(request, app.response_class())
+        assert 'voter_id=' in response.headers.get('Set-Cookie', '')
+
+    with app.test_request_context('/', headers={'Cookie': 'voter_id=abc'}):
+        from flask import request
+        response = issue_voter_cookie(request, app.response_class())
+        assert 'Set-Cookie' not in response.headers
+
+def test_cookie_holders_are_not_tied_to_ip():
+    registry = VoterRegistry()
+    for voter in ('a', 'b'):
+        keys, new_cookie = get_voter_keys(FakeRequest(cookies={'voter_id': voter}))
+        assert new_cookie is None
+        assert registry.register(1, keys)
+
+def test_unregister_allows_retry():
+    registry = VoterRegistry()
+    keys = ['cookie:abc', 'sid:xyz']
+    assert registry.register(1, keys)
+    registry.unregister(1, keys)
+    assert registry.register(1, keys)
+    assert not registry.register(1, ['sid:xyz'])